@@ -0,0 +1,49 @@
+# -*- coding:utf-8 -*-
+
+'''
+This script is to measure the overhead of BenchmarkAPIView.begin (parsing the request, checking the params and the
+access, and processing the keys) for http get requests, without any query. Run it in the root directory of the project:
+    python -m benchmark_app.prologue_benchmark [number of requests, default 10000] [repeat times, default 5]
+'''
+
+import os
+import sys
+import timeit
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmark_django_rest_framework_demo.settings')
+import django
+django.setup()
+
+from benchmark_app.views import EmployeeView
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+
+def get_request(path):
+    request = RequestFactory().get(path)
+    request._force_auth_user = User(username='benchmark', is_staff=True)
+    request = Request(request)
+    request.user
+    return request
+
+
+def begin(request, uri_params):
+    view = EmployeeView()
+    view.begin(request, dict(uri_params))
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    EmployeeView.as_view()
+    print('%d requests, repeat %d times' % (number, repeat))
+    print('%-50s %16s' % ('request', 'us per request'))
+    for path, uri_params in (
+        ('/employee', {}),
+        ('/employee/1', {'pk': '1'}),
+        ('/employee?limit=10&page=2&order_by=-employee_id', {}),
+    ):
+        request = get_request(path)
+        seconds = min(timeit.repeat(lambda: begin(request, uri_params), number=number, repeat=repeat))
+        print('%-50s %16.2f' % (path, seconds / number * 1000000))
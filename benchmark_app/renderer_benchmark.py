@@ -0,0 +1,49 @@
+# -*- coding:utf-8 -*-
+
+'''
+This script is to compare the json renderers (JSON_RENDERER in benchmark_settings.py) by the time of rendering and the
+size of the response json of a http get response with many employees. Run it in the root directory of the project:
+    python -m benchmark_app.renderer_benchmark [count of employees, default 10000] [repeat times, default 5]
+'''
+
+import os
+import sys
+import timeit
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmark_django_rest_framework_demo.settings')
+import django
+django.setup()
+
+from benchmark_django_rest_framework.benchmark_renderer import JSON_RENDERERS, RawJSON, orjson, render_json
+from benchmark_django_rest_framework.benchmark_settings import *
+import json
+
+
+def get_response(count, raw_json=False):
+    result = []
+    for i in range(count):
+        employee_info = {'sex': 'male' if i % 2 == 0 else 'female', 'age': 20 + i % 40, 'new_employee': i % 3 == 0}
+        if raw_json:
+            employee_info = RawJSON(json.dumps(employee_info))
+        result.append({
+            'employee_id': i + 1,
+            'employee_name': 'Employee%d' % (i + 1),
+            'department': i % 4 + 1,
+            'employee_info': employee_info,
+            'create_time': '2017-03-24 20:05:39',
+            'modify_time': '2017-03-24 20:05:39',
+        })
+    return GET_RESPONSE_BY_CODE(data={RESULT: result, COUNT: count, NEXT: None, PREVIOUS: None})
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print('%d employees, repeat %d times, orjson is %sinstalled' % (count, repeat, '' if orjson else 'not '))
+    print('%-10s %-13s %12s %12s' % ('renderer', 'employee_info', 'seconds', 'bytes'))
+    for raw_json in (False, True):
+        res = get_response(count, raw_json)
+        for renderer in sorted(JSON_RENDERERS.keys()):
+            seconds = min(timeit.repeat(lambda: render_json(res, renderer), number=1, repeat=repeat))
+            size = len(render_json(res, renderer).encode('utf-8'))
+            print('%-10s %-13s %12.4f %12d' % (renderer, 'raw json' if raw_json else 'dict', seconds, size))
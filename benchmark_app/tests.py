@@ -1,7 +1,18 @@
 # -*- coding:utf-8 -*-
 
+if __name__ == '__main__':    # the http test suites against SERVER_URL, the settings are in DJANGO_SETTINGS_MODULE
+    import django
+    django.setup()
+
 from benchmark_app.benchmark_test import *
 from benchmark_app.demo_init_data import *
+from benchmark_app.views import *
+from benchmark_django_rest_framework.benchmark_model import BenchmarkModel, model_metas
+from django.conf.urls import url
+from django.db import connection, models
+from django.test import TestCase, override_settings
+import copy
+import json
 
 
 '''
@@ -88,6 +99,348 @@ def test_all():
     return suite
 
 
+# The test cases as follow are run by "python manage.py test benchmark_app", in the test database without the server.
+# They check the responses and the count of the queries of the batch reads and writes.
+
+
+# the models with the delete flag (MODEL_DELETE_FLAG) and MODEL_MODIFIER, for the tests only
+class TestShop(BenchmarkModel, models.Model):
+    shop_id = models.IntegerField(primary_key=True)
+    shop_name = models.CharField(max_length=64)
+    modifier = models.CharField(max_length=64, null=True)
+    del_flag = models.BooleanField(default=0)
+
+    class Meta:
+        app_label = 'benchmark_app'
+
+
+class TestItem(BenchmarkModel, models.Model):
+    item_id = models.IntegerField(primary_key=True)
+    item_name = models.CharField(max_length=64)
+    shop = models.ForeignKey(TestShop, on_delete=models.CASCADE)
+    modifier = models.CharField(max_length=64, null=True)
+    del_flag = models.BooleanField(default=0)
+
+    class Meta:
+        app_label = 'benchmark_app'
+
+
+urlpatterns = [
+    url(r'^department/?$', DepartmentView.as_view()),
+    url(r'^employee/?$', EmployeeView.as_view()),
+    url(r'^pc/?$', PCView.as_view()),
+]
+
+
+# the same data as InitDataView, the lists of the initial data are not changed for the next test case
+def init_data():
+    User.objects.create_user(username='staff', password='staff', is_staff=True)
+    tuple_model = (Company, Department, Employee, ProjectTeam, PC)
+    tuple_init_data = (init_companies, init_departments, init_employees, init_project_teams, init_pcs)
+    for model, list_data in zip(tuple_model, tuple_init_data):
+        for data in copy.deepcopy(list_data):
+            many_to_many_relations = {}
+            for field_name in tuple(data.keys()):
+                field = getattr(model, field_name)
+                if hasattr(field, 'field'):
+                    if field.field.many_to_many:
+                        many_to_many_relations[field_name] = data.pop(field_name)
+                    else:
+                        data[field.field.attname] = data.pop(field_name)
+            for key, value in data.items():
+                if key in SETTINGS.MODEL_JSON_FIELD_NAMES:
+                    data[key] = json.dumps(value)
+            m = model.objects.create(**data)
+            for field_name, value in many_to_many_relations.items():
+                getattr(m, field_name).add(*value)
+
+
+@override_settings(ROOT_URLCONF='benchmark_app.tests')
+class BenchmarkDjangoTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        init_data()
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(username='staff'))    # 2 queries of every request
+
+    def request(self, method, path, data=None, params=''):
+        if params:
+            path += '?' + params
+        if method == 'get':
+            response = self.client.get(path)
+        else:
+            response = getattr(self.client, method)(path, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode('utf-8'))
+
+    def assertSuccess(self, res):
+        self.assertEqual(res[CODE], SUCCESS_CODE, res[MSG])
+
+
+class GetTestCase(BenchmarkDjangoTestCase):
+    def test_select_related_to_many(self):
+        # session, user, employees joined with departments and companies, project teams of all the employees
+        with self.assertNumQueries(4):
+            res = self.request('get', '/employee', params='select_related=[department__company,projectteam_set]')
+        self.assertSuccess(res)
+        employees = res[DATA][RESULT]
+        self.assertEqual([e['company_name'] for e in employees[::2]], ['CompanyA', 'CompanyA', 'CompanyB', 'CompanyB'])
+        self.assertEqual([[team['team_id'] for team in e['project_teams']] for e in employees],
+                         [[1, 2], [], [1], [2], [1], [2], [], []])
+        # session, user, departments joined with companies, employees joined with pcs of all the departments
+        with self.assertNumQueries(4):
+            res = self.request('get', '/department', params='select_related=[company,employee_set__pc]')
+        self.assertEqual([[e.get('pc_name') for e in d['employee_set']] for d in res[DATA][RESULT]],
+                         [['PC1', 'PC2'], [None, None], [None, None], [None, None]])
+
+    def test_cursor(self):
+        with self.assertNumQueries(4):    # session, user, primary keys of the page, employees, without COUNT
+            res = self.request('get', '/employee', params='limit=3&cursor=')
+        self.assertSuccess(res)
+        self.assertIsNone(res[DATA][COUNT])
+        self.assertEqual([e['employee_id'] for e in res[DATA][RESULT]], [1, 2, 3])
+        next_url = res[DATA][NEXT]
+        with self.assertNumQueries(4):
+            res = self.request('get', next_url[next_url.index('/employee'):])
+        self.assertIsNone(res[DATA][COUNT])
+        self.assertEqual([e['employee_id'] for e in res[DATA][RESULT]], [4, 5, 6])
+        # the params of the next page are the same, such as the list values and the values to be quoted
+        res = self.request('get', '/employee', params='limit=2&cursor=&employee_id__in=[1,2,5]&employee_name__gt=%26')
+        next_url = res[DATA][NEXT]
+        res = self.request('get', next_url[next_url.index('/employee'):])
+        self.assertEqual([e['employee_id'] for e in res[DATA][RESULT]], [5])
+        res = self.request('get', '/employee', params='limit=2&cursor=&order_by=department__department_name')
+        self.assertEqual(res[CODE], 24 + CODE_OFFSET)    # not a field of the model
+
+    def test_count_modes(self):
+        with self.assertNumQueries(3):    # session, user, employees of the page and one more, without COUNT
+            res = self.request('get', '/employee', params='limit=3&page=1&count=has_next')
+        self.assertSuccess(res)
+        self.assertIsNone(res[DATA][COUNT])
+        self.assertIn('page=2', res[DATA][NEXT])
+        res = self.request('get', '/employee', params='limit=3&page=3&count=has_next')
+        self.assertEqual([e['employee_id'] for e in res[DATA][RESULT]], [7, 8])
+        self.assertIsNone(res[DATA][COUNT])
+        self.assertIsNone(res[DATA][NEXT])
+        self.assertIn('page=2', res[DATA][PREVIOUS])
+        res = self.request('get', '/employee', params='limit=3&page=5&count=has_next')    # after the last page
+        self.assertIsNone(res[DATA][RESULT])
+        self.assertIsNone(res[DATA][NEXT])
+        with self.assertNumQueries(3):    # the count of the last page is known from the page
+            res = self.request('get', '/employee', params='limit=3&page=3&count=exact')
+        self.assertEqual(res[DATA][COUNT], 8)
+        self.assertIsNone(res[DATA][NEXT])
+        self.request('get', '/employee', params='limit=3&page=1&count=cached')
+        with self.assertNumQueries(3):    # the count is cached
+            res = self.request('get', '/employee', params='limit=3&page=2&count=cached')
+        self.assertEqual(res[DATA][COUNT], 8)
+        res = self.request('get', '/employee', params='limit=3&page=1&count=all')
+        self.assertEqual(res[CODE], 35 + CODE_OFFSET)
+
+
+class PostTestCase(BenchmarkDjangoTestCase):
+    def test_bulk_create(self):
+        data = [{'department_id': 10 + i, 'department_name': 'D%d' % i, 'company': 1 + i % 2} for i in range(20)]
+        # departments of the primary keys, companies of the foreign keys, one insert in a transaction and a savepoint
+        # (both are savepoints in the test case)
+        with self.assertNumQueries(7):
+            res = Department.post_model(data, user='staff', bulk_create=True)
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][CREATED_COUNT], 20)
+        self.assertEqual(res[DATA][FAILED_ITEMS], [])
+        self.assertEqual(Department.objects.filter(pk__gte=10).count(), 20)
+
+    def test_bulk_create_partial_failure(self):
+        data = [{'department_id': 10 + i, 'department_name': 'D%d' % i, 'company': 1} for i in range(6)]
+        data[3]['department_name'] = None    # not null
+        res = Department.post_model(data, user='staff', bulk_create=True, transaction_mode='chunk',
+                                    transaction_chunk_size=2)
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][TOTAL_COUNT], 6)
+        self.assertEqual(res[DATA][CREATED_COUNT], 5)
+        self.assertEqual(res[DATA][FAILED_ITEMS], [data[3]])
+        self.assertEqual([item['department_id'] for item in res[DATA][CREATED_ITEMS]], [10, 11, 12, 14, 15])
+        self.assertEqual(res[DATA][COMMIT_COUNT], 3)
+        self.assertEqual(sorted(Department.objects.filter(pk__gte=10).values_list('pk', flat=True)),
+                         [10, 11, 12, 14, 15])
+
+    def test_foreign_keys(self):
+        data = [{'department_id': 10 + i, 'department_name': 'D%d' % i, 'company': 1 + i % 2} for i in range(20)]
+        with self.assertNumQueries(2 + 20):    # departments of the primary keys, companies of the foreign keys, inserts
+            res = Department.post_model(data, user='staff')
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][CREATED_COUNT], 20)
+        data = [{'department_id': 30 + i, 'department_name': 'D%d' % i, 'company': 1 + i % 2} for i in range(20)]
+        data[5]['company'] = 99    # does not exist
+        with self.assertNumQueries(3):    # rejected before inserting any item
+            res = Department.post_model(data, user='staff')
+        self.assertEqual(res[CODE], 9 + CODE_OFFSET)
+        self.assertFalse(Department.objects.filter(pk__gte=30).exists())
+
+    def test_many_to_many(self):
+        data = [{'project_team_id': 10 + i, 'project_team_name': 'T%d' % i, 'members': [1, 2, 3]} for i in range(10)]
+        # project teams of the primary keys, inserts, employees of the members, the relations which exist, one insert of
+        # the relations
+        with self.assertNumQueries(1 + 10 + 3):
+            res = ProjectTeam.post_model(data, user='staff')
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][CREATED_COUNT], 10)
+        self.assertEqual(ProjectTeam.members.through.objects.filter(projectteam_id__gte=10).count(), 30)
+
+
+class PutTestCase(BenchmarkDjangoTestCase):
+    def test_batch_put(self):
+        data = [{'pk': pk, 'employee_name': 'E%d' % pk} for pk in range(1, 9)]
+        data[2]['department'] = 99    # does not exist
+        # employees of the primary keys, departments of the foreign keys, the department which does not exist, one
+        # update of all the valid items in a transaction and a savepoint
+        with self.assertNumQueries(8):
+            res = Employee.put_models(data, user='staff', transaction_mode='request')
+        self.assertEqual(res[CODE], 38 + CODE_OFFSET)
+        self.assertEqual(res[DATA][TOTAL_COUNT], 8)
+        self.assertEqual(res[DATA][UPDATED_COUNT], 7)
+        self.assertEqual(res[DATA][FAILED_ITEMS], [data[2]])
+        self.assertEqual(res[DATA][COMMIT_COUNT], 1)
+        self.assertEqual(Employee.objects.get(pk=3).employee_name, 'EmployeeAY1')
+        self.assertEqual(Employee.objects.get(pk=4).employee_name, 'E4')
+
+    def test_batch_put_unique(self):
+        data = [{'pk': 1, 'pc_name': 'P1', 'employee': 1}, {'pk': 2, 'pc_name': 'P2', 'employee': 2}]
+        # session, user, pcs of the primary keys, the employee and the unique check of every item by the serializer,
+        # pcs of the primary keys, employees of the foreign keys, one update
+        with self.assertNumQueries(3 + 2 * 2 + 3):
+            res = self.request('put', '/pc', data)    # the items keep their values of the unique field "employee"
+        self.assertSuccess(res)
+        self.assertEqual(list(PC.objects.order_by('pk').values_list('pc_name', flat=True)), ['P1', 'P2'])
+        data = [{'pk': 1, 'employee': 2}, {'pk': 2, 'pc_name': 'P3'}]
+        res = self.request('put', '/pc', data)
+        self.assertEqual(res[CODE], 20 + CODE_OFFSET)    # the value of the other item
+        self.assertEqual(list(PC.objects.order_by('pk').values_list('pc_name', flat=True)), ['P1', 'P2'])
+
+    def test_put_by_params(self):
+        # session, user, primary keys of the filtered employees and update in one transaction (a savepoint here)
+        with self.assertNumQueries(6):
+            res = self.request('put', '/employee', {'employee_name': 'X'}, params='department=1')
+        self.assertSuccess(res)
+        self.assertEqual(sorted(res[DATA][UPDATED_PKS]), [1, 2])
+        self.assertEqual(Employee.objects.filter(employee_name='X').count(), 2)
+
+    def test_put_without_primary_key(self):
+        for params in ('limit=1', 'page=2&order_by=employee_name', 'select_related=department'):
+            res = self.request('put', '/employee', {'employee_name': 'Y'}, params=params)    # no params to filter
+            self.assertEqual(res[CODE], 2 + CODE_OFFSET)
+        self.assertFalse(Employee.objects.filter(employee_name='Y').exists())
+
+
+class DeleteTestCase(BenchmarkDjangoTestCase):
+    def test_batch_delete(self):
+        res = Employee.delete_model({'pk': [3, 4, 5, 6, 7, 8]}, user='staff')
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][DELETED_PKS], [3, 4, 5, 6, 7, 8])
+        self.assertEqual(Employee.objects.count(), 2)
+        with self.assertNumQueries(1):    # the primary keys are checked by one query before deleting any item
+            res = Employee.delete_model({'pk': [1, 99]}, user='staff')
+        self.assertNotEqual(res[CODE], SUCCESS_CODE)
+        self.assertEqual(Employee.objects.count(), 2)
+
+
+class DeleteFlagTestCase(BenchmarkDjangoTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the tables of the test models are created by syncdb if the migrations of benchmark_app are disabled
+        if TestShop._meta.db_table not in connection.introspection.table_names():
+            with connection.schema_editor() as schema_editor:
+                schema_editor.create_model(TestShop)
+                schema_editor.create_model(TestItem)
+        cls.dict_model_unique = SETTINGS.DICT_MODEL_UNIQUE
+        SETTINGS.DICT_MODEL_UNIQUE = dict(cls.dict_model_unique, TestShop=(('shop_name',),))
+        model_metas.pop(TestShop, None)
+        super(DeleteFlagTestCase, cls).setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super(DeleteFlagTestCase, cls).tearDownClass()
+        SETTINGS.DICT_MODEL_UNIQUE = cls.dict_model_unique
+        model_metas.pop(TestShop, None)
+
+    @classmethod
+    def setUpTestData(cls):
+        super(DeleteFlagTestCase, cls).setUpTestData()
+        for shop_id in (1, 2):
+            TestShop.objects.create(shop_id=shop_id, shop_name='Shop%d' % shop_id)
+            for i in range(3):
+                TestItem.objects.create(item_id=shop_id * 10 + i, item_name='Item%d' % i, shop_id=shop_id)
+        TestItem.objects.filter(pk=10).update(del_flag=1)    # deleted before the shop
+
+    def test_delete_and_restore_cascade(self):
+        # shops of the primary keys, and for every shop: the shop, update of the shop, items of the shop, update of the
+        # items, in a savepoint
+        with self.assertNumQueries(1 + 2 * 6):
+            res = TestShop.delete_model({'pk': [1, 2]}, user='staff')
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][DELETED_PKS], [1, 2])
+        self.assertEqual(res[DATA][AFFECTED_COUNTS], [{'TestShop': 2}, {'TestItem': 5}])
+        self.assertEqual(TestItem.objects.filter(del_flag=0).count(), 0)
+        with self.assertNumQueries(1 + 2 * 6):    # the same as delete, the items are restored by MODEL_MODIFIER
+            res = TestShop.delete_model({'pk': [1, 2], 'delete_flag': False}, user='staff')
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][AFFECTED_COUNTS], [{'TestShop': 2}, {'TestItem': 5}])
+        # the item deleted before the shop is not restored with the shop
+        self.assertEqual(list(TestItem.objects.filter(del_flag=1).values_list('pk', flat=True)), [10])
+
+    def test_put_model(self):
+        res = TestShop.put_model({'pk': 1, 'shop_name': 'Shop3', 'testitem': 20}, user='staff')
+        self.assertSuccess(res)    # the reverse relations in the data are omitted
+        self.assertEqual(TestShop.objects.get(pk=1).shop_name, 'Shop3')
+        self.assertEqual(TestItem.objects.get(pk=20).shop_id, 2)
+        with self.assertNumQueries(2):    # the shop, the unique check, and no update for the same values
+            res = TestShop.put_model({'pk': 1, 'shop_name': 'Shop3'}, user='staff')
+        self.assertSuccess(res)
+
+    def test_unique_in_batch(self):
+        data = [{'shop_id': 3, 'shop_name': 'Shop3'}, {'shop_id': 4, 'shop_name': 'Shop3'}]
+        with self.assertNumQueries(2):    # shops of the primary keys, shops of the values of DICT_MODEL_UNIQUE
+            res = TestShop.post_model(data, user='staff')
+        self.assertEqual(res[CODE], 5 + CODE_OFFSET)
+        self.assertEqual(res[DATA], data[:1])    # the same values as the data before it
+        data = [{'shop_id': 3, 'shop_name': 'Shop3'}, {'shop_id': 4, 'shop_name': 'Shop1'}]
+        res = TestShop.post_model(data, user='staff')
+        self.assertEqual(res[CODE], 5 + CODE_OFFSET)
+        self.assertEqual([item['shop_id'] for item in res[DATA]], [1])    # the same values as the item in database
+        self.assertFalse(TestShop.objects.filter(pk__gte=3).exists())
+        TestShop.objects.filter(pk=2).update(del_flag=1)
+        data = [{'shop_id': 3, 'shop_name': 'Shop3'}, {'shop_id': 4, 'shop_name': 'Shop2'}]
+        res = TestShop.post_model(data, user='staff')    # the values of the deleted item can be used again
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][CREATED_COUNT], 2)
+
+    def test_unique_in_batch_put(self):
+        data = [{'pk': 1, 'shop_name': 'Shop3'}, {'pk': 2, 'shop_name': 'Shop3'}, {'pk': 1, 'shop_name': 'Shop2'}]
+        # shops of the primary keys, shops of the values of DICT_MODEL_UNIQUE, one update of the valid items
+        with self.assertNumQueries(3):
+            res = TestShop.put_models(data[:2], user='staff')
+        self.assertEqual(res[CODE], 38 + CODE_OFFSET)
+        self.assertEqual(res[DATA][UPDATED_COUNT], 1)
+        self.assertEqual(res[DATA][FAILED_ITEMS], [data[1]])    # the same values as the item before it
+        res = TestShop.put_models(data[2:], user='staff')
+        self.assertEqual(res[DATA][FAILED_ITEMS], [data[2]])    # the same values as the item in database
+        self.assertEqual(list(TestShop.objects.order_by('pk').values_list('shop_name', flat=True)), ['Shop3', 'Shop2'])
+
+    def test_unique_put_by_params(self):
+        res = TestShop.put_models({'shop_name': 'Shop3'}, user='staff', params={'shop_name__startswith': 'Shop'})
+        self.assertEqual(res[CODE], 41 + CODE_OFFSET)    # the same values for more than one item
+        res = TestShop.put_models({'shop_name': 'Shop2'}, user='staff', params={'shop_id': 1})
+        self.assertEqual(res[CODE], 5 + CODE_OFFSET)
+        self.assertEqual([item['shop_id'] for item in res[DATA]], [2])    # the same values as the item in database
+        res = TestShop.put_models({'shop_name': 'Shop1'}, user='staff', params={'shop_id': 1})    # its own values
+        self.assertSuccess(res)
+        res = TestShop.put_models({'shop_name': 'Shop3'}, user='staff', params={'shop_id': 1})
+        self.assertSuccess(res)
+        self.assertEqual(res[DATA][UPDATED_PKS], [1])
+        self.assertEqual(list(TestShop.objects.order_by('pk').values_list('shop_name', flat=True)), ['Shop3', 'Shop2'])
+
+
 if __name__ == '__main__':
     unittest.main(defaultTest='test_all')
 
@@ -77,6 +77,7 @@ class InitDataView(BenchmarkAPIView):
         tuple_model = (Company, Department, Employee, ProjectTeam, PC)
         tuple_init_data = (init_companies, init_departments, init_employees, init_project_teams, init_pcs)
         for model, init_data in zip(tuple_model, tuple_init_data):
+            relations = []
             for data in init_data:
                 field_names = tuple(data.keys())
                 many_to_many_relations = {}
@@ -84,13 +85,7 @@ class InitDataView(BenchmarkAPIView):
                     field = getattr(model, field_name)
                     if hasattr(field, 'field'):
                         if field.field.many_to_many:
-                            related_model = field.field.related_model
-                            related_ms = []
-                            for pk in data[field_name]:
-                                related_m = related_model.objects.filter(pk=pk).first()
-                                if related_m is not None:
-                                    related_ms.append(related_m)
-                            many_to_many_relations[field_name] = related_ms
+                            many_to_many_relations[field_name] = data[field_name]
                             del data[field_name]
                         else:
                             data[field.field.attname] = data[field_name]
@@ -100,7 +95,7 @@ class InitDataView(BenchmarkAPIView):
                         data[key] = json.dumps(value)
                 m = model(**data)
                 m.save()
-                for field_name, related_ms in many_to_many_relations.items():
-                    for related_m in related_ms:
-                        getattr(m, field_name).add(related_m)
+                if len(many_to_many_relations) > 0:
+                    relations.append((m, many_to_many_relations))
+            model.add_many_to_many_relations(relations)    # the related items which do not exist are ignored
         return self.get_response_by_code()
@@ -1,15 +1,20 @@
 # -*- coding:utf-8 -*-
 
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from itertools import chain
+from benchmark_django_rest_framework.benchmark_renderer import JSON_RENDERERS, render_json
 from django.db.models import Model
-from django.http import JsonResponse, StreamingHttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.decorators import classonlymethod
 from django_filters import rest_framework as filters
 from rest_framework.generics import GenericAPIView
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField, PrimaryKeyRelatedField
 from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer, Serializer
+from rest_framework.validators import UniqueValidator
 from rest_framework.views import APIView
 from rest_framework.viewsets import ViewSet, ModelViewSet
+from urllib.parse import urlencode
 import copy
 import django
 import json
@@ -18,7 +23,9 @@ import logging
 import redis
 import rest_framework
 import sys
+import threading
 import time
+import types
 
 
 SETTINGS = getattr(django.conf.settings, 'BENCHMARK_SETTINGS', None)
@@ -31,6 +38,72 @@ except KeyError:
     raise Exception('BENCHMARK_SETTINGS defined in django settings.py file is not correct. The benchmark_settings file '
                     'does not exist.')
 
+# the placeholder of the items in the json of the streaming http response
+STREAM_PLACEHOLDER = '__benchmark_stream_items__'
+
+# The compiled transformer of the keys in the response of a view (see process_keys). "rules" are the (values, rename) of
+# the paths in values_fields and rename_fields, "children" are the keys to walk into for the paths which have rules
+# under them, "convert" is whether the keys are converted by python_to_java, then all the nodes are walked.
+ResponseTransformer = namedtuple('ResponseTransformer', ('rules', 'children', 'convert'))
+
+# the cache of the keys converted by python_to_java and java_to_python which are not in the key tables of the views
+converted_keys = {}
+converted_keys_lock = threading.Lock()
+
+
+def get_converted_key(convert, key, *args):
+    cache_key = (convert, key) + args
+    converted_key = converted_keys.get(cache_key)
+    if converted_key is None:
+        converted_key = convert(key, *args)
+        with converted_keys_lock:
+            if len(converted_keys) >= getattr(SETTINGS, 'KEY_CONVERT_CACHE_SIZE', 4096):
+                converted_keys.clear()
+            converted_keys[cache_key] = converted_key
+    return converted_key
+
+
+# The many to many fields of the serializers generated by the views, the related items of the primary keys in the list
+# are queried by one "pk__in" query instead of one query per primary key. The primary keys which are not found are
+# validated one by one by the child relation, so the errors are the same as ManyRelatedField.
+class BenchmarkManyRelatedField(ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, type('')) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child_relation = self.child_relation
+        if child_relation.pk_field is not None:
+            return [child_relation.to_internal_value(item) for item in data]
+        queryset = child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        keys = []
+        for item in data:
+            try:
+                key = pk_field.to_python(item)
+                hash(key)
+            except Exception:
+                key = None
+            keys.append(key)
+        pks = list(set(key for key in keys if key is not None))
+        related_items = {}
+        batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+        for i in range(0, len(pks), batch_size):
+            for related_item in queryset.filter(pk__in=pks[i:i + batch_size]):
+                related_items[related_item.pk] = related_item
+        return [related_items[key] if key in related_items else child_relation.to_internal_value(item)
+                for key, item in zip(keys, data)]
+
+
+class BenchmarkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs.keys():
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BenchmarkManyRelatedField(**list_kwargs)
+
 
 class Logger:
     def __init__(self):
@@ -72,6 +145,18 @@ class BenchmarkAPIView(PARENT_VIEW):
             ('serializer_use_benchmark_code', True),    # whether serializer use benchmark code and return the error response
             ('enable_select_related_in_params', False),
             ('only_enable_select_related_for_get_one', False),
+            ('batch_select_related', True),     # whether load the to-many relations in select_related in batch
+            ('read_by_values_list', True),      # whether read the items of primary_model by values_list
+            ('count_mode', 'exact'),            # how to get the COUNT of the paginated http get response
+            ('stream_response', False),         # whether the http get response of multiple items is streaming
+            ('stream_chunk_size', 500),         # the number of items searched in a chunk for the streaming response
+            ('json_renderer', 'indent'),        # how to render the json of the response
+            ('raw_json_fields', False),         # whether write the json text of MODEL_JSON_FIELD_NAMES as it is
+            ('bulk_create', False),             # whether insert the items of a http post request in list in batch
+            ('transaction_mode', None),         # how the writes of a request are committed
+            ('transaction_chunk_size', 1000),   # the number of rows committed in a transaction in the mode "chunk"
+            ('put_response_data', True),        # whether the response of a http put request has the updated item
+            ('put_conditional_update', False),  # whether update by one conditional "UPDATE" with "If-Match"
             ('redis_ip', 'localhost'),
             ('redis_port', 6379),
             ('redis_db', 0),
@@ -79,6 +164,8 @@ class BenchmarkAPIView(PARENT_VIEW):
             if not hasattr(cls, setting):
                 setattr(cls, setting, getattr(SETTINGS, setting.upper(), default_value))
         cls.queryset = None if cls.primary_model is None else cls.primary_model.objects.all()
+        if hasattr(cls.primary_model, 'init_model_metas'):
+            cls.primary_model.init_model_metas()
         # Each value of settings as follow is got from class variable (in lowercase) in each view firstly. If it is not
         # defined in class variable, then set it as default value.
         for setting, default_value in (
@@ -111,6 +198,13 @@ class BenchmarkAPIView(PARENT_VIEW):
         # more steps for initiate some settings
         for method in {'get', 'post', 'put', 'delete'} - set(cls.access.keys()):
             cls.access[method] = None
+        # the methods which every one can access, begin needn't call check_access for them
+        cls.methods_for_all = frozenset()
+        if cls.check_access is BenchmarkAPIView.check_access:
+            cls.methods_for_all = frozenset(
+                method for method, role in cls.access.items()
+                if role == 'all' or isinstance(role, (tuple, list)) and 'all' in role
+            )
         for check in (cls.check_params, cls.check_data):
             for method in ('get', 'post', 'put', 'delete'):
                 if method not in check.keys():
@@ -125,6 +219,25 @@ class BenchmarkAPIView(PARENT_VIEW):
         for key, value in cls.rename_fields.items():
             cls.rename_fields_in_data['/' + SETTINGS.DATA + key] = value
             cls.rename_fields_in_data_results['/' + SETTINGS.DATA + '/' + SETTINGS.RESULT + key] = value
+        # the fields in MODEL_JSON_FIELD_NAMES whose json text is written into the http get response as it is, they are
+        # the ones which haven't any rule in values_fields or rename_fields or key converting for the keys in the json
+        cls.raw_json_field_names = frozenset()
+        if cls.raw_json_fields and SETTINGS.MODEL_JSON_FIELD_NAMES and \
+                getattr(SETTINGS, 'JSON_RESPONSE_CLASS', None) == 'django.http.JsonResponse' and \
+                not (SETTINGS.CONVERT_KEYS and cls.need_convert('response', 'get')):
+            cls.raw_json_field_names = frozenset(SETTINGS.MODEL_JSON_FIELD_NAMES)
+            for path in chain(cls.values_fields.keys(), cls.rename_fields.keys()):
+                cls.raw_json_field_names -= set(path.split('/'))
+        cls.init_key_tables()
+        cls.rename_inputs = dict(
+            (str_input, getattr(cls, 'rename_' + str_input))
+            for str_input in ('uri_params', 'params', 'data') if len(getattr(cls, 'rename_' + str_input)) > 0
+        )
+        cls.response_transformers = {}
+        for method in ('get', 'post', 'put', 'delete'):
+            for has_result_field in (True, False):
+                for values_white_list in (True, False):
+                    cls.get_response_transformer(method, has_result_field, values_white_list)
         # initiate redis
         if hasattr(cls, 'get_redis'):
             cls.redis = redis.StrictRedis(host=cls.redis_ip, port=cls.redis_port, db=cls.redis_db)
@@ -144,6 +257,8 @@ class BenchmarkAPIView(PARENT_VIEW):
         self.offset = None
         self.limit = None
         self.page = None
+        self.cursor = None
+        self.cursors = (None, None)
         self.file = None
         self.user = None
         self.select_related = getattr(self, 'select_related', None)
@@ -151,6 +266,68 @@ class BenchmarkAPIView(PARENT_VIEW):
         self.values_white_list = getattr(self, 'values_white_list', True)
         self.Qs = getattr(self, 'Qs', None)
         self.pk = None
+        self.put_items = None    # the list of the items of a batch http put request, see pop_put_primary_keys
+
+    # Build the tables of the keys converted between the style of python and java, by the field names of primary_model
+    # and the models can be related by select_related, the rename settings and the keywords.
+    @classmethod
+    def init_key_tables(cls):
+        names = set(SETTINGS.KEYWORDS)
+        for rename in chain((cls.rename_params, cls.rename_uri_params, cls.rename_data), cls.rename_fields.values()):
+            names.update(rename.keys())
+            names.update(rename.values())
+        for values in cls.values_fields.values():
+            names.update(values)
+        if cls.primary_model is not None:
+            if cls.enabled_select_related_in_params == '__all__':
+                max_depth = None
+            else:
+                max_depth = 0
+                for select_related in (cls.select_related, cls.enabled_select_related_in_params):
+                    if isinstance(select_related, str):
+                        select_related = [select_related]
+                    for _select_related in select_related or ():
+                        max_depth = max(max_depth, len(_select_related.strip('[]').split('__')))
+            models = {cls.primary_model}
+            new_models = [cls.primary_model]
+            depth = 0
+            while len(new_models) > 0:
+                related_models = []
+                for model in new_models:
+                    for field in model._meta.get_fields():
+                        names.add(field.name)
+                        if hasattr(field, 'attname'):
+                            names.add(field.attname)
+                        if hasattr(field, 'get_accessor_name'):
+                            names.add(field.get_accessor_name())
+                        if field.related_model is not None and field.related_model not in models:
+                            models.add(field.related_model)
+                            related_models.append(field.related_model)
+                depth += 1
+                new_models = related_models if max_depth is None or depth <= max_depth else []
+        cls.java_keys = {}
+        cls.python_keys = {}
+        for name in names:
+            if isinstance(name, str):
+                java_key = cls.python_to_java(name, cls.omit_underlines)
+                cls.java_keys[name] = java_key
+                cls.python_keys[java_key] = cls.java_to_python(java_key)
+
+    # the key converted by python_to_java, it is searched in the key table of the view firstly
+    @classmethod
+    def get_java_key(cls, key):
+        java_key = cls.java_keys.get(key)
+        if java_key is None:
+            java_key = get_converted_key(cls.python_to_java, key, cls.omit_underlines)
+        return java_key
+
+    # the key converted by java_to_python, it is searched in the key table of the view firstly
+    @classmethod
+    def get_python_key(cls, key):
+        python_key = cls.python_keys.get(key)
+        if python_key is None:
+            python_key = get_converted_key(cls.java_to_python, key)
+        return python_key
 
     @classmethod
     def init_serializer(cls):
@@ -172,6 +349,8 @@ class BenchmarkAPIView(PARENT_VIEW):
                         field_names.append(field_name)
 
                 class BenchmarkSerializer(ModelSerializer):
+                    serializer_related_field = BenchmarkPrimaryKeyRelatedField
+
                     class Meta:
                         model = cls.primary_model
                         fields = field_names
@@ -180,6 +359,24 @@ class BenchmarkAPIView(PARENT_VIEW):
         else:
             cls.serializer_is_custom = True
 
+    # The names of the fields validated by UniqueValidator in the model serializer, which need the item (the instance of
+    # the serializer) of a http put request to exclude it. It is None if the serializer has the validators of the
+    # serializer (such as UniqueTogetherValidator) or the "validate" methods, which may always need the item.
+    @classmethod
+    def get_serializer_unique_field_names(cls):
+        unique_field_names = getattr(cls, 'serializer_unique_field_names', False)
+        if unique_field_names is False:
+            unique_field_names = None
+            serializer = cls.get_serializer()
+            if isinstance(serializer, ModelSerializer) and len(serializer.validators) == 0 and \
+                    type(serializer).validate is Serializer.validate and \
+                    not any(hasattr(serializer, 'validate_' + name) for name in serializer.fields.keys()):
+                unique_field_names = frozenset(
+                    name for name, field in serializer.fields.items()
+                    if any(isinstance(validator, UniqueValidator) for validator in field.validators))
+            cls.serializer_unique_field_names = unique_field_names
+        return unique_field_names
+
     @classmethod
     def get_serializer(cls, *args, **kwargs):
         if not hasattr(cls, 'serializer_class') or cls.serializer_class is None:
@@ -270,6 +467,20 @@ class BenchmarkAPIView(PARENT_VIEW):
             res = {key: value for key, value in post_data.items()}
         return res
 
+    # Flatten the request data (QueryDict or dict of json) into a new dict, the values of the keys with several values
+    # in QueryDict are lists. The lists are copied, so the request data is not changed and needn't be deep copied.
+    @staticmethod
+    def flatten_request_data(request_data):
+        data = {}
+        lists = getattr(request_data, 'lists', None)
+        if lists is not None:
+            for key, value in lists():
+                data[key] = value[0] if len(value) == 1 else list(value)
+        else:
+            for key, value in request_data.items():
+                data[key] = list(value) if isinstance(value, list) else value
+        return data
+
     @staticmethod
     def get_uri_params(uri_params):
         if len(uri_params) == 0:
@@ -279,34 +490,11 @@ class BenchmarkAPIView(PARENT_VIEW):
         raise Exception('too many uri params')
 
     # when using delete flag, you cannot define "unique_together" in models.
-    # "unique_together" should be define in config.py.
-    # "unique_together" function (detect for unique constraint) is processed here.
+    # "unique_together" should be define in benchmark_settings.py.
+    # It is checked by BenchmarkModel.check_unique_together of primary_model.
     @classmethod
     def check_unique_together(cls, data, pk=None):
-        for field_names in cls.unique_together:
-            unique_post_data = {}
-            for field_name in field_names:
-                has_unique_together_fields = False
-                if field_name in data.keys():
-                    has_unique_together_fields = True
-                    unique_post_data[field_name] = data[field_name]
-                else:
-                    unique_together_field = getattr(cls.primary_model, field_name)
-                    if hasattr(unique_together_field, 'field'):
-                        unique_together_field = unique_together_field.field
-                    unique_post_data[field_name] = unique_together_field.get_default()
-                if hasattr(cls.primary_model, SETTINGS.MODEL_DELETE_FLAG):
-                    unique_post_data[SETTINGS.MODEL_DELETE_FLAG] = 0
-                if has_unique_together_fields:
-                    query_set = cls.primary_model.objects.filter(**unique_post_data).using(cls.using)
-                    if query_set.exists():
-                        if pk is None:
-                            return cls.get_response_by_code(5 + SETTINGS.CODE_OFFSET)
-                        else:
-                            for item in query_set:
-                                if pk != item.pk:
-                                    return cls.get_response_by_code(5 + SETTINGS.CODE_OFFSET)
-        return cls.get_response_by_code()
+        return cls.primary_model.check_unique_together(data, pk=pk, using=cls.using)
 
     @classmethod
     def check_primary_model(cls, function_name):
@@ -325,10 +513,14 @@ class BenchmarkAPIView(PARENT_VIEW):
             select_related = None
         else:
             select_related = self.select_related
-        res, self.count = self.primary_model.get_model(
+        stream = self.stream_response and not (self.get_one is None and 'pk' in self.uri_params.keys() or self.get_one)
+        res, self.count, self.cursors = self.primary_model.get_model(
             params=params, select_related=select_related, values=self.values,
             values_white_list=self.values_white_list, Qs=self.Qs, using=self.using,
-            limit=self.limit, page=self.page, offset=self.offset, return_with_count=True
+            limit=self.limit, page=self.page, offset=self.offset, return_with_count=True,
+            batch_select_related=self.batch_select_related, read_by_values_list=self.read_by_values_list,
+            values_fields=self.values_fields, cursor=self.cursor, return_with_cursors=True, count_mode=self.count_mode,
+            stream=stream, stream_chunk_size=self.stream_chunk_size, raw_json_fields=self.raw_json_field_names
         )
         return res
 
@@ -399,14 +591,42 @@ class BenchmarkAPIView(PARENT_VIEW):
         else:
             raise Exception('data should be dict, list or tuple')
         self.data = []
-        for data in list_data:
+        instances = [None] * len(list_data)    # the items of the primary keys, the instances of the serializer
+        if self.primary_model and self.pk is not None:
+            if not isinstance(self.pk, (list, tuple)):
+                pks = [self.pk] * len(list_data)
+            elif self.put_items is not None:    # the primary keys of the items of a batch http put request
+                pks = list(self.pk)
+            else:    # the same data for the items of the primary keys, only one item can keep its unique values
+                pks = list(self.pk) if len(self.pk) == 1 else [None]
+            # the items are read by one query (per LOOKUP_BATCH_SIZE primary keys), except the items of the data which
+            # the serializer doesn't need them for (no field to validate by UniqueValidator)
+            unique_field_names = self.get_serializer_unique_field_names()
+            pk_field = self.primary_model._meta.pk
+            keys = []
+            for pk, data in zip(pks, list_data):
+                key = None
+                if pk is not None and (unique_field_names is None or any(name in unique_field_names for name in data)):
+                    try:
+                        key = pk_field.to_python(pk)
+                        hash(key)
+                    except Exception:
+                        key = None
+                keys.append(key)
+            pks = list(set(key for key in keys if key is not None))
+            items = {}
+            batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+            for i in range(0, len(pks), batch_size):
+                for item in self.primary_model.objects.using(self.using).filter(pk__in=pks[i:i + batch_size]):
+                    items[item.pk] = item
+            instances = [items.get(key) for key in keys]
+        for data, instance in zip(list_data, instances):
             if self.method in ('get', 'put'):
                 partial = True
             else:
                 partial = False
             if self.primary_model:
-                serializer = self.get_serializer(self.primary_model.objects.filter(pk=self.pk).using(self.using).first(),
-                                                 data=data, partial=partial)
+                serializer = self.get_serializer(instance, data=data, partial=partial)
             else:
                 serializer = self.get_serializer(data=data, partial=partial)
             try:
@@ -477,7 +697,9 @@ class BenchmarkAPIView(PARENT_VIEW):
             raise Exception('data should be dict, list or tuple')
         return self.primary_model.post_model(post_data, user=self.user.get_username(), using=self.using,
                                              serializer_is_custom=self.serializer_is_custom,
-                                             return_with_inserted_data=return_with_inserted_data)
+                                             return_with_inserted_data=return_with_inserted_data,
+                                             bulk_create=self.bulk_create, transaction_mode=self.transaction_mode,
+                                             transaction_chunk_size=self.transaction_chunk_size)
 
     def get_uri_params_data(self, data=None):
         post_data = copy.deepcopy(self.data)
@@ -486,14 +708,59 @@ class BenchmarkAPIView(PARENT_VIEW):
         post_data.update(self.uri_params)
         return post_data
 
+    # Pop the primary keys (MODEL_PRIMARY_KEY or the attname of the primary key) from the items of a batch http put
+    # request into self.pk, so that the serializer doesn't validate them as the new values of the primary keys.
+    def pop_put_primary_keys(self):
+        primary_key_name = self.primary_model._meta.pk.attname if self.primary_model else None
+        self.put_items = self.data
+        self.pk = []
+        for item in self.data:
+            if SETTINGS.MODEL_PRIMARY_KEY in item.keys():
+                self.pk.append(item.pop(SETTINGS.MODEL_PRIMARY_KEY))
+                item.pop(primary_key_name, None)
+            elif primary_key_name in item.keys():
+                self.pk.append(item.pop(primary_key_name))
+            else:
+                return self.get_response_by_code(2 + SETTINGS.CODE_OFFSET)
+        return None
+
     # put 请求对应的 model 操作，仅可对 primary_model 进行操作
+    # The batch http put requests (a list of items with their primary keys, a list of primary keys in MODEL_PRIMARY_KEY,
+    # or no primary key but params to filter the items) are processed by put_models.
     def put_model(self, data=None):
         try:
             self.check_primary_model('put_model')
         except ValueError:
             return
+        if self.put_items is not None:
+            list_data = self.data if isinstance(self.data, list) else [self.data]
+            post_data = []
+            for pk, item in zip(self.pk, list_data):
+                item = copy.deepcopy(item)
+                if data:
+                    item.update(data)
+                item.update(self.uri_params)
+                item[SETTINGS.MODEL_PRIMARY_KEY] = pk
+                post_data.append(item)
+            return self.primary_model.put_models(post_data, user=self.user.get_username(), using=self.using,
+                                                 transaction_mode=self.transaction_mode,
+                                                 transaction_chunk_size=self.transaction_chunk_size)
         post_data = self.get_uri_params_data(data)
-        return self.primary_model.put_model(post_data, user=self.user.get_username(), using=self.using)
+        if isinstance(self.pk, (list, tuple)):
+            post_data[SETTINGS.MODEL_PRIMARY_KEY] = list(self.pk)
+            return self.primary_model.put_models(post_data, user=self.user.get_username(), using=self.using,
+                                                 transaction_mode=self.transaction_mode,
+                                                 transaction_chunk_size=self.transaction_chunk_size)
+        if self.pk is None:
+            return self.primary_model.put_models(post_data, user=self.user.get_username(), using=self.using,
+                                                 params=self.params, transaction_mode=self.transaction_mode,
+                                                 transaction_chunk_size=self.transaction_chunk_size)
+        http_request = getattr(self.request, '_request', self.request)
+        return self.primary_model.put_model(post_data, user=self.user.get_username(), using=self.using,
+                                            transaction_mode=self.transaction_mode,
+                                            if_match=http_request.META.get('HTTP_IF_MATCH'),
+                                            conditional_update=self.put_conditional_update,
+                                            response_data=self.put_response_data)
 
     # delete 请求对应的 model 操作
     def delete_model(self):
@@ -503,7 +770,9 @@ class BenchmarkAPIView(PARENT_VIEW):
             return
         data = copy.deepcopy(self.data)
         data.update(self.uri_params)
-        return self.primary_model.delete_model(data, user=self.user.get_username(), using=self.using)
+        return self.primary_model.delete_model(data, user=self.user.get_username(), using=self.using,
+                                               transaction_mode=self.transaction_mode,
+                                               transaction_chunk_size=self.transaction_chunk_size)
 
     def check_access(self, pk=None):
         role = self.access[self.method]
@@ -568,6 +837,16 @@ class BenchmarkAPIView(PARENT_VIEW):
             return self.get_response_by_code(22)
         return res
 
+    # the int value of a param, or the default value if it is not given or not an integer
+    @staticmethod
+    def get_int_param(value, default):
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
     @staticmethod
     def string_to_bool(string):
         try:
@@ -608,24 +887,23 @@ class BenchmarkAPIView(PARENT_VIEW):
                             value = pd[key]
                             if isinstance(value, list):
                                 for i, v in enumerate(value):
-                                    value[i] = self.java_to_python(v)
+                                    value[i] = self.get_python_key(v)
                             else:
-                                pd[key] = self.java_to_python(value)
+                                pd[key] = self.get_python_key(value)
                         else:
-                            pd[self.java_to_python(key)] = pd.pop(key)
+                            pd[self.get_python_key(key)] = pd.pop(key)
             if self.method == 'get' and SETTINGS.ORDER_BY in self.params:
-                self.params[SETTINGS.ORDER_BY] = self.java_to_python(self.params[SETTINGS.ORDER_BY])
+                self.params[SETTINGS.ORDER_BY] = self.get_python_key(self.params[SETTINGS.ORDER_BY])
 
     # rename input keys in http request
     def rename_input_keys(self):
-        for str_input in ('uri_params', 'params', 'data'):
+        for str_input, rename_dict in self.rename_inputs.items():
             input = getattr(self, str_input)
             if isinstance(input, dict):
                 list_input = [input]
             else:
                 list_input = input
             for _input in list_input:
-                rename_dict = getattr(self, 'rename_' + str_input)
                 for key, new_key in rename_dict.items():
                     _input[new_key] = _input.pop(key)
 
@@ -707,17 +985,85 @@ class BenchmarkAPIView(PARENT_VIEW):
                 if key in SETTINGS.MODEL_JSON_FIELD_NAMES:
                     data[key] = json.dumps(data[key])
 
-    def process_keys(self, res, path=None, has_result_field=False):
+    # Process the keys of uri_params, params and data in one pass for each of them, as the same as java_to_python_keys,
+    # rename_input_keys and json_to_string_keys in order. The inputs which have nothing to process are skipped.
+    def process_input_keys(self):
+        convert = SETTINGS.CONVERT_KEYS and self.need_convert('request', self.method)
+        json_field_names = SETTINGS.MODEL_JSON_FIELD_NAMES or ()
+        for str_input in ('uri_params', 'params', 'data'):
+            rename_dict = self.rename_inputs.get(str_input)
+            is_data = str_input == 'data'
+            if not convert and rename_dict is None and not (is_data and len(json_field_names) > 0):
+                continue
+            input = getattr(self, str_input)
+            if isinstance(input, dict):
+                list_input = [input]
+            elif isinstance(input, (tuple, list)):
+                list_input = input
+            else:
+                raise Exception('data should be dict, list or tuple')
+            convert_order_by = convert and self.method == 'get' and str_input == 'params'
+            for _input in list_input:
+                processed_input = {}
+                for key, value in _input.items():
+                    if convert:
+                        if key in SETTINGS.KEYWORDS_WITH_VALUE_NEED_CONVERT:
+                            if isinstance(value, list):
+                                value = [self.get_python_key(v) for v in value]
+                            else:
+                                value = self.get_python_key(value)
+                        else:
+                            key = self.get_python_key(key)
+                        if convert_order_by and key == SETTINGS.ORDER_BY:
+                            value = self.get_python_key(value)
+                    if rename_dict is not None and key in rename_dict:
+                        key = rename_dict[key]
+                    if is_data and key in json_field_names:
+                        value = json.dumps(value)
+                    processed_input[key] = value
+                _input.clear()
+                _input.update(processed_input)
+
+    # compile the ResponseTransformer of the view, it is cached in the view class
+    @classmethod
+    def get_response_transformer(cls, method, has_result_field, values_white_list):
+        key = (method, bool(has_result_field), values_white_list)
+        transformer = cls.response_transformers.get(key)
+        if transformer is not None:
+            return transformer
         if has_result_field:
-            values_fields = self.values_fields_in_data_results
-            rename_fields = self.rename_fields_in_data_results
+            values_fields = cls.values_fields_in_data_results
+            rename_fields = cls.rename_fields_in_data_results
         else:
-            values_fields = self.values_fields_in_data
-            rename_fields = self.rename_fields_in_data
-        if SETTINGS.CONVERT_KEYS and self.need_convert('response', self.method):
-            need_python_to_java = True
+            values_fields = cls.values_fields_in_data
+            rename_fields = cls.rename_fields_in_data
+        rules = {}
+        children = {}
+        for path in set(values_fields.keys()) | set(rename_fields.keys()):
+            values = values_fields.get(path)
+            rules[path] = (None if values is None else frozenset(values), rename_fields.get(path) or None)
+            names = path.split('/')[1:-1]
+            for i, name in enumerate(names):
+                children.setdefault('/' + ''.join(_name + '/' for _name in names[:i]), set()).add(name)
+        transformer = ResponseTransformer(
+            rules=rules, children=dict((path, frozenset(names)) for path, names in children.items()),
+            convert=bool(SETTINGS.CONVERT_KEYS and cls.need_convert('response', method))
+        )
+        cls.response_transformers[key] = transformer
+        return transformer
+
+    # Apply values_fields, rename_fields and python_to_java to the keys of the response in one pass. Only the paths
+    # which have rules under them are walked, unless the keys are converted.
+    def process_keys(self, res, path=None, has_result_field=False):
+        transformer = self.get_response_transformer(self.method, has_result_field, self.values_white_list)
+        convert = transformer.convert
+        if path is None:
+            rules = children = {}
         else:
-            need_python_to_java = False
+            rules = transformer.rules
+            children = transformer.children
+        if not convert and len(rules) == 0:
+            return
         stack = [(res, path)]
         while len(stack) > 0:
             node, node_path = stack.pop()
@@ -725,38 +1071,40 @@ class BenchmarkAPIView(PARENT_VIEW):
                 for item in node:
                     stack.append((item, node_path))
             elif isinstance(node, dict):
-                keys = list(node.keys())
-                for key in keys:
-                    if isinstance(node[key], (dict, list)):
-                        if node_path is None:
-                            stack.append((node[key], None))
-                        else:
+                rule = rules.get(node_path)
+                if rule is None and not convert:
+                    for key in children.get(node_path, ()):
+                        if isinstance(node.get(key), (dict, list)):
                             stack.append((node[key], node_path + key + '/'))
-                    if node_path in values_fields and (
-                            (self.values_white_list and key not in values_fields[node_path]) or
-                            (not self.values_white_list and key in values_fields[node_path])
-                    ):
+                    continue
+                values, rename = (None, None) if rule is None else rule
+                keys_to_walk = None if convert else children.get(node_path, ())
+                for key in list(node.keys()):
+                    if isinstance(node[key], (dict, list)) and (keys_to_walk is None or key in keys_to_walk):
+                        stack.append((node[key], None if node_path is None else node_path + key + '/'))
+                    if values is not None and (key in values) != self.values_white_list:
                         del node[key]
-                    else:
-                        if node_path in rename_fields and key in rename_fields[node_path]:
-                            new_key = rename_fields[node_path][key]
-                            node[new_key] = node.pop(key)
-                            key = new_key
-                        if need_python_to_java:
-                            new_key = self.python_to_java(key, self.omit_underlines)
-                            if key != new_key:
-                                node[new_key] = node.pop(key)
+                        continue
+                    new_key = key
+                    if rename is not None and key in rename:
+                        new_key = rename[key]
+                    if convert:
+                        new_key = self.get_java_key(new_key)
+                    if new_key != key:
+                        node[new_key] = node.pop(key)
 
     # 处理各种请求的入口，解析各字段并进行处理
     def begin(self, request, uri_params={}):
         self.request = request
+        # the attributes of django http request are read from it directly, rather than by the proxy of drf request
+        http_request = getattr(request, '_request', request)
         self.user = request.user
-        self.host = request.get_host()
-        self.path = request.path
-        self.method = request.method.lower()
+        self.host = http_request.get_host()
+        self.path = http_request.path
+        self.method = http_request.method.lower()
         self.file = request.FILES.get(SETTINGS.FILE, None)
         self.params = {}
-        for key, value in request.GET.items():
+        for key, value in http_request.GET.items():
             len_value = len(value)
             if len_value >= 2 and value[0] == '[' and value[len_value - 1] == ']':
                 value = value[1:-1].split(',')
@@ -792,76 +1140,67 @@ class BenchmarkAPIView(PARENT_VIEW):
                         return self.get_response_by_code(27 + SETTINGS.CODE_OFFSET)
                 self.params[key] = value
         self.uri_params = uri_params
+        renderer = self.params.pop(SETTINGS.RENDERER, None)
+        if renderer is None:
+            for media_type in http_request.META.get('HTTP_ACCEPT', '').split(','):
+                for media_type_param in media_type.split(';')[1:]:
+                    name, _, value = media_type_param.partition('=')
+                    if name.strip() == SETTINGS.RENDERER:
+                        renderer = value.strip()
+        if renderer is not None:
+            if renderer not in JSON_RENDERERS:
+                return self.get_response_by_code(36 + SETTINGS.CODE_OFFSET)
+            self.json_renderer = renderer
         if self.method == 'get':
-            self.limit = self.params.pop(SETTINGS.LIMIT, None)
-            self.page = self.params.pop(SETTINGS.PAGE, None)
-            self.offset = self.params.pop(SETTINGS.OFFSET, None)
-            try:
-                self.limit = int(self.limit)
-            except:
-                self.limit = 0
+            self.limit = self.get_int_param(self.params.pop(SETTINGS.LIMIT, None), 0)
+            self.page = self.get_int_param(self.params.pop(SETTINGS.PAGE, None), 1)
+            self.offset = self.get_int_param(self.params.pop(SETTINGS.OFFSET, None), 0)
+            self.cursor = self.params.pop(SETTINGS.CURSOR, None)
+            count_mode = self.params.pop(SETTINGS.COUNT, None)
+            if count_mode is not None:
+                if count_mode not in ('exact', 'cached', 'estimated', 'has_next'):
+                    return self.get_response_by_code(35 + SETTINGS.CODE_OFFSET)
+                self.count_mode = count_mode
             if self.limit < 0:
                 self.limit = 0
-            try:
-                self.page = int(self.page)
-            except:
-                self.page = 1
             if self.page < 1:
                 self.page = 1
-            try:
-                self.offset = int(self.offset)
-            except:
-                self.offset = 0
             if self.offset < 0:
                 self.offset = 0
         elif self.method in ('post', 'put', 'delete'):
-            request_data = copy.deepcopy(request.data)
+            request_data = request.data
             if isinstance(request_data, dict):
-                self.data = {}
-                try:
-                    for key, value in request_data.lists():
-                        if len(value) == 1:
-                            self.data[key] = value[0]
-                        else:
-                            self.data[key] = value
-                except:
-                    for key, value in request_data.items():
-                        self.data[key] = value
-            elif self.method == 'post' and isinstance(request_data, (list, tuple)):
-                self.data = []
-                for one_request_data in request_data:
-                    one_data = {}
-                    try:
-                        for key, value in one_request_data.lists():
-                            if len(value) == 1:
-                                one_data[key] = value[0]
-                            else:
-                                one_data[key] = value
-                    except:
-                        for key, value in one_request_data.items():
-                            one_data[key] = value
-                    self.data.append(one_data)
+                self.data = self.flatten_request_data(request_data)
+            elif self.method in ('post', 'put') and isinstance(request_data, (list, tuple)):
+                self.data = [self.flatten_request_data(one_request_data) for one_request_data in request_data]
             elif self.method == 'delete' and isinstance(request_data, (list, tuple)):
-                self.data = {'pk': request_data}
+                self.data = {'pk': list(request_data)}
             else:
                 self.get_response_by_code(25 + SETTINGS.CODE_OFFSET)
-        res = self.check_request_param_data()
-        if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
-            return res
+        if len(self.check_params[self.method]) > 0 or len(self.check_data[self.method]) > 0:
+            res = self.check_request_param_data()
+            if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
+                return res
         pk = None
         if self.method in ('get', 'put', 'delete'):
             pk = self.uri_params.get('pk')
             if pk is None and isinstance(self.data, dict):
                 pk = self.data.get('pk')
-            if self.method in ('put', 'delete') and pk is None:
+            if self.method == 'put' and pk is None and \
+                    (isinstance(self.data, list) or any(key not in SETTINGS.KEYWORDS for key in self.params)):
+                pass    # batch put of the items in data, or of the items filtered by params (except the keywords)
+            elif self.method in ('put', 'delete') and pk is None:
                 return self.get_response_by_code(2 + SETTINGS.CODE_OFFSET)
             self.pk = pk
-        res = self.check_access(pk=pk)
-        if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
-            return res
-        self.java_to_python_keys()
-        self.rename_input_keys()
-        self.json_to_string_keys()
+        if self.method not in self.methods_for_all:
+            res = self.check_access(pk=pk)
+            if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
+                return res
+        self.process_input_keys()
+        if self.method == 'put' and isinstance(self.data, list):
+            res = self.pop_put_primary_keys()
+            if res is not None:
+                return res
         if self.method in ('post', 'put') or (self.method == 'get' and self.http_get_check_params):
             if self.method == 'get':
                 data = self.params
@@ -883,9 +1222,41 @@ class BenchmarkAPIView(PARENT_VIEW):
                     )
         return self.get_response_by_code()
 
+    # write the json of the response item by item for the streaming http response, the json is the same as the not
+    # streaming response
+    def stream_json(self, res, items, path, has_result_field):
+        content = render_json(res, self.json_renderer)
+        placeholder = json.dumps(STREAM_PLACEHOLDER)
+        index = content.index(placeholder)
+        if self.json_renderer == 'indent':
+            line = content[content.rfind('\n', 0, index) + 1:index]
+            indent = ' ' * (len(line) - len(line.lstrip(' ')) + 2)
+            begin, separator, end = '[\n' + indent, ',\n' + indent, '\n' + indent[:-2] + ']'
+        else:
+            indent = None
+            begin, separator, end = '[', ',', ']'
+        yield content[:index]
+        is_first = True
+        for item in items:
+            self.process_keys(item, path, has_result_field)
+            item = render_json(item, self.json_renderer)
+            if indent is not None:
+                item = item.replace('\n', '\n' + indent)
+            yield (begin if is_first else separator) + item
+            is_first = False
+        yield 'null' if is_first else end
+        yield content[index + len(placeholder):]
+
     # 处理各种类型的返回
     def process_response(self, res):
         data = res.get(SETTINGS.DATA, None)
+        stream_items = None
+        if isinstance(data, dict) and isinstance(data.get(SETTINGS.RESULT), types.GeneratorType):
+            stream_items = data[SETTINGS.RESULT]
+            data[SETTINGS.RESULT] = STREAM_PLACEHOLDER
+        elif isinstance(data, types.GeneratorType):
+            stream_items = data
+            res[SETTINGS.DATA] = data = STREAM_PLACEHOLDER
         if isinstance(res, dict):    # dict 转 json 返回
             if SETTINGS.DATA_STYLE == 'dict':
                 if data is not None:
@@ -914,14 +1285,21 @@ class BenchmarkAPIView(PARENT_VIEW):
             additional_data = getattr(self, 'additional_data', None)
             if isinstance(additional_data, dict):
                 for key, value in additional_data.items():
-                    res[SETTINGS.DATA][self.python_to_java(key, self.omit_underlines)] = value
+                    res[SETTINGS.DATA][self.get_java_key(key)] = value
 
             # process json response class
             json_response_class = getattr(SETTINGS, 'JSON_RESPONSE_CLASS', None)
-            if json_response_class == 'rest_framework.response.Response':
+            if stream_items is not None:
+                if self.method == 'get' and SETTINGS.RESULT in res[SETTINGS.DATA]:
+                    path = '/' + SETTINGS.DATA + '/' + SETTINGS.RESULT + '/'
+                else:
+                    path = '/' + SETTINGS.DATA + '/'
+                res = StreamingHttpResponse(self.stream_json(res, stream_items, path, SETTINGS.RESULT in path),
+                                            content_type='application/json')
+            elif json_response_class == 'rest_framework.response.Response':
                 res = Response(res)
             elif json_response_class == 'django.http.JsonResponse':
-                res = JsonResponse(res, json_dumps_params={"indent": 2})
+                res = HttpResponse(render_json(res, self.json_renderer), content_type='application/json')
             else:
                 raise Exception('JSON_RESPONSE_CLASS in the benchmark_settings is not defined or not correct. The value of it should be "rest_framework.response.Response", or "django.http.JsonResponse"')
         if isinstance(res, (StreamingHttpResponse, django.http.response.HttpResponse)):    # 流文件, 或已处理好的 http 响应
@@ -939,20 +1317,49 @@ class BenchmarkAPIView(PARENT_VIEW):
                     res[SETTINGS.DATA] = None
                 else:
                     res[SETTINGS.DATA] = res[SETTINGS.DATA][0]
+            # get many by cursors
+            elif self.cursor is not None:
+                basic_url = 'http://' + self.host + self.path
+                urls = []
+                for cursor in self.cursors:
+                    if cursor is None:
+                        urls.append(None)
+                        continue
+                    params = OrderedDict()
+                    for key, value in self.params.items():    # the list values are written as they are read, "[a,b]"
+                        params[key] = '[' + ','.join(str(v) for v in value) + ']' if isinstance(value, list) else value
+                    params[SETTINGS.LIMIT] = self.limit
+                    params[SETTINGS.CURSOR] = cursor
+                    urls.append(basic_url + '?' + urlencode(params, doseq=True))
+                res[SETTINGS.DATA] = {SETTINGS.RESULT: res[SETTINGS.DATA],
+                                      SETTINGS.COUNT: None if self.count_mode == 'has_next' else self.count,
+                                      SETTINGS.NEXT: urls[1], SETTINGS.PREVIOUS: urls[0]}
             # get many in pages
             elif self.page is not None:
-                if self.limit == 0:
-                    page_count = 0 if self.count == 0 else 1
-                else:
-                    page_count = math.ceil(self.count / self.limit)
-                if 1 <= self.page <= page_count:
-                    result = res[SETTINGS.DATA]
+                if self.count_mode == 'has_next':
+                    # self.count is not the real count, it only tells whether there is a next page, so the pages are
+                    # not counted
+                    if self.page >= 1 and len(res[SETTINGS.DATA]) > 0:
+                        result = res[SETTINGS.DATA]
+                    else:
+                        result = None
+                    if self.page < 1:
+                        self.page = 0
+                    is_last_page = self.limit == 0 or self.count is None or self.count <= self.page * self.limit
                 else:
-                    result = None
-                if self.page < 1:
-                    self.page = 0
-                elif self.page > page_count:
-                    self.page = page_count + 1
+                    if self.limit == 0:
+                        page_count = 0 if self.count == 0 else 1
+                    else:
+                        page_count = math.ceil(self.count / self.limit)
+                    if 1 <= self.page <= page_count:
+                        result = res[SETTINGS.DATA]
+                    else:
+                        result = None
+                    if self.page < 1:
+                        self.page = 0
+                    elif self.page > page_count:
+                        self.page = page_count + 1
+                    is_last_page = self.page >= page_count
                 basic_url = 'http://' + self.host + self.path
                 previous_param_url = None
                 next_param_url = None
@@ -970,7 +1377,7 @@ class BenchmarkAPIView(PARENT_VIEW):
                         else:
                             previous_param_url += '&' + key + '=' + str(value)
                     previous_url = basic_url + previous_param_url
-                if self.page >= page_count:
+                if is_last_page:
                     next_url = None
                 else:
                     for key, value in params.items():
@@ -981,7 +1388,8 @@ class BenchmarkAPIView(PARENT_VIEW):
                         else:
                             next_param_url += '&' + key + '=' + str(value)
                     next_url = basic_url + next_param_url
-                res[SETTINGS.DATA] = {SETTINGS.RESULT: result, SETTINGS.COUNT: self.count,
+                res[SETTINGS.DATA] = {SETTINGS.RESULT: result,
+                                      SETTINGS.COUNT: None if self.count_mode == 'has_next' else self.count,
                                       SETTINGS.NEXT: next_url, SETTINGS.PREVIOUS: previous_url}
             # get many not in pages
             else:
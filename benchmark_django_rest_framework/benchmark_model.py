@@ -1,16 +1,27 @@
 # -*- coding:utf-8 -*-
 
-from collections import OrderedDict
+from benchmark_django_rest_framework.benchmark_renderer import RawJSON, is_valid_json
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from django.apps import apps
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db import connections, transaction
+from django.db.models import Case, Prefetch, Q, Value, When, prefetch_related_objects
+from django.db.models.signals import m2m_changed, post_delete, post_save
 # from django.db.models.sql.constants import QUERY_TERMS
-from django.db.models.sql.query import LOOKUP_SEP, Query
-from itertools import chain
+from django.db.models.sql.query import LOOKUP_SEP
+from django.utils import timezone
+from itertools import chain, islice, product
+import base64
 import copy
 import datetime
 import django
+import hashlib
 import json
+import logging
 import sys
+import threading
+import time
 import traceback
 
 
@@ -25,6 +36,133 @@ except KeyError:
                     'haven\'t import the benchmark_settings file. For example '
                     '"import benchmark_django_rest_framework.benchmark_settings"')
 
+logger = logging.getLogger(__name__)
+
+# The compiled select_related relations of a model for http get requests. It is immutable, so it is cached and shared
+# by every request and every thread. "level_relates" are the to-many relations (RelationRoot) in each level after the
+# level 0, "select_related_fields" are the to-one relations of level 0, "invalid_relate" is the invalid relation name.
+RelationPlan = namedtuple('RelationPlan', ('level_relates', 'select_related_fields', 'invalid_relate'))
+RelationRoot = namedtuple('RelationRoot', ('full_name', 'field_name', 'field_name_from_pre_root', 'related_model',
+                                           'pre_root', 'select_related_fields'))
+# the LRU cache of the relation plans, keys are (model, sorted select_related without duplicates), so the same
+# relations in any order share one plan
+relation_plans = OrderedDict()
+relation_plans_lock = threading.Lock()
+
+# The precomputed reader for the rows of a model fetched by "values_list". "names" are the field names in the dict of a
+# row, "columns" are the field attnames for "values_list", "converters" are the (index, function) of the columns which
+# should be converted, such as DateTimeField to str and the json string in MODEL_JSON_FIELD_NAMES to python object.
+RowReader = namedtuple('RowReader', ('names', 'columns', 'converters'))
+# the cache of the row readers, keys are (model, SETTINGS.OMIT_UN_EDITABLE_FIELDS, raw_json_fields)
+row_readers = {}
+
+# The projection of "values" and "values_fields" for a level of dicts in the http get response, which is pushed down to
+# the query by "only". "filters" and "values_white_list" decide whether a key is kept (see is_key_kept), "dict_names"
+# are all the field names in the dict of the model, "names" are the kept ones of them, "related_names" are the field
+# names to read for every select_related relation, "only_fields" are the arguments of "only" for the query set.
+Projection = namedtuple('Projection', ('filters', 'values_white_list', 'dict_names', 'names', 'related_names',
+                                       'only_fields'))
+
+# The accessor of a field of a select_related relation, which is compiled by compile_related_accessors. "index" is the
+# index of the relation, "field_name" is the name of the field in the related model, "name" is the key in the dict
+# (which is renamed if it collides with the other keys), "is_relation" is whether the field is a relation field,
+# "converter" is the function to convert the json field, or None.
+RelatedAccessor = namedtuple('RelatedAccessor', ('index', 'field_name', 'name', 'is_relation', 'converter'))
+
+# the LRU cache of the counts for the "cached" count mode, keys are (database, sql, sql params), values are
+# (count, expire time). It is cleared by every write of models, since a filter may across relations.
+count_caches = OrderedDict()
+count_caches_lock = threading.Lock()
+
+
+def clear_count_caches(*args, **kwargs):
+    with count_caches_lock:
+        count_caches.clear()
+
+
+post_save.connect(clear_count_caches, dispatch_uid='benchmark_clear_count_caches_post_save')
+post_delete.connect(clear_count_caches, dispatch_uid='benchmark_clear_count_caches_post_delete')
+m2m_changed.connect(clear_count_caches, dispatch_uid='benchmark_clear_count_caches_m2m_changed')
+
+
+# The transaction of the writes of a request by TRANSACTION_MODE (see benchmark_settings.py). In the mode "request", all
+# the rows are written in one transaction. In the mode "chunk", the transaction is committed every "chunk_size" rows
+# (by commit when is_chunk_full). In both modes, a row which may fail is written in a savepoint, so it is rolled back
+# alone and reported in the response as before. In the mode None, the rows are written in the autocommit mode of django
+# and the savepoints are nothing. "commit_count" is the count of the committed transactions which have rows.
+class BatchTransaction(object):
+    def __init__(self, mode=None, using='default', chunk_size=None):
+        if mode not in (None, 'request', 'chunk'):
+            raise Exception('TRANSACTION_MODE should be None, "request" or "chunk"')
+        self.mode = mode
+        self.using = using
+        self.chunk_size = chunk_size if chunk_size else getattr(SETTINGS, 'TRANSACTION_CHUNK_SIZE', 1000)
+        self.atomic = None
+        self.chunk_row_count = 0
+        self.commit_count = 0
+
+    def __enter__(self):
+        if self.mode is not None:
+            self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.atomic is not None:
+            atomic = self.atomic
+            self.atomic = None
+            atomic.__exit__(exc_type, exc_value, traceback)
+            if exc_type is None and self.chunk_row_count > 0:
+                self.commit_count += 1
+        return False
+
+    def begin(self):
+        self.atomic = transaction.atomic(using=self.using)
+        self.atomic.__enter__()
+        self.chunk_row_count = 0
+
+    def commit(self):
+        self.__exit__(None, None, None)
+        self.begin()
+
+    def add_row(self, count=1):
+        self.chunk_row_count += count
+
+    # whether the rows of the transaction should be committed in the mode "chunk"
+    def is_chunk_full(self):
+        return self.mode == 'chunk' and self.chunk_row_count >= self.chunk_size
+
+    @contextmanager
+    def savepoint(self):
+        if self.atomic is None:
+            yield
+        else:
+            with transaction.atomic(using=self.using):
+                yield
+
+
+# The metadata of a model, which is computed once for every model when the views are initiated (see get_model_meta).
+# "field_names" are the names of the fields (including the reverse relations) except MODEL_DELETE_FLAG, "fields" are
+# the dict of them to the fields (with "pk"), which is walked by the lookup paths of the params in http get requests.
+# "relation_fields" are the dict of the names to the relation fields of the ones which are accessed by the descriptors
+# of the model (the forward foreign keys, one to one and many to many relations). "pk_attname" is the attname of the
+# primary key, "many_to_many_names" are the names of the many to many fields, "json_field_names" are the ones in
+# MODEL_JSON_FIELD_NAMES. "has_delete_flag", "has_creator",
+# "has_modifier" and "has_modify_time" are whether the model has the fields in the settings, "creator_is_relation" and
+# "modifier_is_relation" are whether they are foreign keys (to the user model). "unique_together" are the tuples of
+# field names in DICT_MODEL_UNIQUE, "one_to_many_fields" are the (related model, attname of the remote field) of the
+# reverse foreign keys.
+ModelMeta = namedtuple('ModelMeta', ('field_names', 'fields', 'relation_fields', 'pk_attname', 'many_to_many_names',
+                                     'json_field_names', 'has_delete_flag', 'has_creator', 'has_modifier',
+                                     'has_modify_time',
+                                     'creator_is_relation', 'modifier_is_relation', 'unique_together',
+                                     'one_to_many_fields'))
+# the registry of the metadata, keys are models
+model_metas = {}
+# the cache of the results of the validated lookup paths, keys are (model, path), it is bounded by
+# LOOKUP_PATH_CACHE_SIZE and cleared when it is full
+validated_paths = {}
+validated_paths_lock = threading.Lock()
+
 
 class BenchmarkModel(object):
     @staticmethod
@@ -35,46 +173,100 @@ class BenchmarkModel(object):
     def get_http_response_by_code(code=SETTINGS.SUCCESS_CODE, msg=None, data=None):
         return SETTINGS.GET_HTTP_RESPONSE_BY_CODE(code, msg, data)
 
+    # the ModelMeta of the model (cls by default), it is computed at the first time
+    @classmethod
+    def get_model_meta(cls, model=None):
+        if model is None:
+            model = cls
+        meta = model_metas.get(model)
+        if meta is not None:
+            return meta
+        field_names = []
+        fields = {}
+        relation_fields = {}
+        one_to_many_fields = []
+        for field in model._meta.get_fields():
+            if field.one_to_many:
+                one_to_many_fields.append((field.related_model, field.remote_field.attname))
+            if SETTINGS.MODEL_DELETE_FLAG is not None and field.name == SETTINGS.MODEL_DELETE_FLAG:
+                continue
+            field_names.append(field.name)
+            fields[field.name] = field
+            descriptor = getattr(model, field.name, None)
+            if hasattr(descriptor, 'field'):
+                relation_fields[field.name] = descriptor.field
+        fields['pk'] = model._meta.pk
+        has_field = {}
+        is_relation = {}
+        for name in (SETTINGS.MODEL_DELETE_FLAG, SETTINGS.MODEL_CREATOR, SETTINGS.MODEL_MODIFIER,
+                     SETTINGS.MODEL_MODIFY_TIME):
+            has_field[name] = name is not None and hasattr(model, name)
+            is_relation[name] = has_field[name] and isinstance(
+                getattr(model, name), django.db.models.fields.related_descriptors.ForwardManyToOneDescriptor)
+        meta = ModelMeta(
+            field_names=tuple(field_names),
+            fields=fields,
+            relation_fields=relation_fields,
+            pk_attname=model._meta.pk.attname,
+            many_to_many_names=tuple(field.name for field in model._meta.many_to_many),
+            json_field_names=frozenset(SETTINGS.MODEL_JSON_FIELD_NAMES or ()) & frozenset(field_names),
+            has_delete_flag=has_field[SETTINGS.MODEL_DELETE_FLAG],
+            has_creator=has_field[SETTINGS.MODEL_CREATOR],
+            has_modifier=has_field[SETTINGS.MODEL_MODIFIER],
+            has_modify_time=has_field[SETTINGS.MODEL_MODIFY_TIME],
+            creator_is_relation=is_relation[SETTINGS.MODEL_CREATOR],
+            modifier_is_relation=is_relation[SETTINGS.MODEL_MODIFIER],
+            unique_together=tuple(tuple(names) for names in SETTINGS.DICT_MODEL_UNIQUE.get(model.__name__, ())),
+            one_to_many_fields=tuple(one_to_many_fields),
+        )
+        model_metas[model] = meta
+        return meta
+
+    # compute the ModelMeta of all the installed models
+    @classmethod
+    def init_model_metas(cls):
+        for model in apps.get_models():
+            cls.get_model_meta(model)
+
     @classmethod
     def model_has_delete_flag(cls):
-        return SETTINGS.MODEL_DELETE_FLAG is not None and hasattr(cls, SETTINGS.MODEL_DELETE_FLAG)
+        return cls.get_model_meta().has_delete_flag
 
     @classmethod
     def model_get_delete_flag(cls, m):
-        if SETTINGS.MODEL_DELETE_FLAG is not None and hasattr(cls, SETTINGS.MODEL_DELETE_FLAG):
+        if cls.get_model_meta().has_delete_flag:
             return getattr(m, SETTINGS.MODEL_DELETE_FLAG)
         return None
 
     @classmethod
     def model_has_modifier(cls):
-        return SETTINGS.MODEL_MODIFIER is not None and hasattr(cls, SETTINGS.MODEL_MODIFIER)
+        return cls.get_model_meta().has_modifier
 
     @classmethod
     def model_get_modifier(cls, m):
-        if SETTINGS.MODEL_MODIFIER is not None and hasattr(cls, SETTINGS.MODEL_MODIFIER):
+        if cls.get_model_meta().has_modifier:
             return getattr(m, SETTINGS.MODEL_MODIFIER)
         return None
 
     @classmethod
     def model_has_modify_time(cls):
-        return SETTINGS.MODEL_MODIFY_TIME is not None and hasattr(cls, SETTINGS.MODEL_MODIFY_TIME)
+        return cls.get_model_meta().has_modify_time
 
     @classmethod
     def model_get_modify_time(cls, m):
-        if SETTINGS.MODEL_MODIFY_TIME is not None and hasattr(cls, SETTINGS.MODEL_MODIFY_TIME):
+        if cls.get_model_meta().has_modify_time:
             return getattr(m, SETTINGS.MODEL_MODIFY_TIME)
         return None
 
     @classmethod
     def get_unique_together(cls):
-        model_name = cls.__name__
-        if model_name in SETTINGS.DICT_MODEL_UNIQUE.keys():
-            return SETTINGS.DICT_MODEL_UNIQUE[model_name]
-        return []
+        return cls.get_model_meta().unique_together
 
     @classmethod
-    def get_json(cls, key, value):
-        if SETTINGS.MODEL_JSON_FIELD_NAMES is not None and key in SETTINGS.MODEL_JSON_FIELD_NAMES:
+    def get_json(cls, key, value, raw_json_fields=()):
+        if key in raw_json_fields:
+            value = cls.get_raw_json(value)
+        elif SETTINGS.MODEL_JSON_FIELD_NAMES is not None and key in SETTINGS.MODEL_JSON_FIELD_NAMES:
             try:
                 value = json.loads(value)
             except:
@@ -100,11 +292,12 @@ class BenchmarkModel(object):
     def filter_model(cls, params=None, query_set=None, select_related=None, Qs=None, using='default', first=False,
                      last=False, order_by=None):
         model_filter = {}
-        if SETTINGS.MODEL_DELETE_FLAG is not None:
+        if cls.get_model_meta().has_delete_flag:
             model_filter[SETTINGS.MODEL_DELETE_FLAG] = 0
         if params is not None:
             for key, value in params.items():
-                if key not in [SETTINGS.ORDER_BY, SETTINGS.OFFSET, SETTINGS.LIMIT, SETTINGS.PAGE]:
+                if key not in [SETTINGS.ORDER_BY, SETTINGS.OFFSET, SETTINGS.LIMIT, SETTINGS.PAGE,
+                               getattr(SETTINGS, 'CURSOR', 'cursor')]:
                     model_filter[key] = value
         if query_set is None and len(model_filter) == 0:
             query_set = cls.objects.using(using).filter(**model_filter)
@@ -189,10 +382,13 @@ class BenchmarkModel(object):
         return data
 
     @classmethod
-    def model_to_dict_process_json(cls, instance, fields=None, exclude=None):
+    def model_to_dict_process_json(cls, instance, fields=None, exclude=None, raw_json_fields=()):
         data = cls.model_to_dict(instance, fields, exclude)
+        json_field_names = cls.get_model_meta(instance.__class__).json_field_names
         for key, value in data.items():
-            if SETTINGS.MODEL_JSON_FIELD_NAMES is not None and key in SETTINGS.MODEL_JSON_FIELD_NAMES:
+            if key in raw_json_fields:
+                data[key] = cls.get_raw_json(value)
+            elif key in json_field_names:
                 try:
                     data[key] = json.loads(value)
                 except:
@@ -202,17 +398,111 @@ class BenchmarkModel(object):
     @classmethod
     def model_to_dict_process_many_to_many_and_json(cls, instance, fields=None, exclude=None):
         data = cls.model_to_dict(instance, fields, exclude)
+        json_field_names = cls.get_model_meta(instance.__class__).json_field_names
         for key, value in data.items():
             if isinstance(value, django.db.models.query.QuerySet):
                 many = value.all()
                 data[key] = [one.pk for one in many]
-            elif SETTINGS.MODEL_JSON_FIELD_NAMES is not None and key in SETTINGS.MODEL_JSON_FIELD_NAMES:
+            elif key in json_field_names:
                 try:
                     data[key] = json.loads(value)
                 except:
                     pass
         return data
 
+    # The many to many relations of the inserted items are empty in the response, because they are added after all the
+    # items are inserted, so they are not read item by item.
+    @classmethod
+    def inserted_model_to_dict(cls, instance):
+        many_to_many_names = cls.get_model_meta(instance.__class__).many_to_many_names
+        data = cls.model_to_dict_process_many_to_many_and_json(instance, exclude=many_to_many_names)
+        for name in many_to_many_names:
+            data[name] = []
+        return data
+
+    @staticmethod
+    def load_json(value):
+        try:
+            return json.loads(value)
+        except:
+            return value
+
+    # Keep the json text of MODEL_JSON_FIELD_NAMES as it is, it is written into the response by the json renderer
+    # without being loaded and dumped again. The text which is not a valid json object or array is loaded as before, so
+    # the rendered json is always valid.
+    @classmethod
+    def get_raw_json(cls, value):
+        if isinstance(value, str):
+            text = value.strip()
+            if len(text) >= 2 and (text[0], text[-1]) in (('{', '}'), ('[', ']')) and is_valid_json(text):
+                return RawJSON(text)
+        return cls.load_json(value)
+
+    # Get the RowReader of the model, which reads the same dict as model_to_dict_process_json from "values_list". The
+    # many to many fields are not read, because they are not in the response of http get requests. If the model has
+    # private fields (such as GenericForeignKey), it returns None, and the rows should be read from model instances.
+    # The json text of the fields in raw_json_fields is kept as it is (see get_raw_json).
+    @classmethod
+    def get_row_reader(cls, model, raw_json_fields=()):
+        omit = getattr(SETTINGS, 'OMIT_UN_EDITABLE_FIELDS', False)
+        key = (model, omit, frozenset(raw_json_fields))
+        if key in row_readers:
+            return row_readers[key]
+        opts = model._meta
+        if len(opts.private_fields) > 0:
+            reader = None
+        else:
+            names = []
+            columns = []
+            converters = []
+            for f in opts.concrete_fields:
+                if omit and not getattr(f, 'editable', False):
+                    continue
+                functions = []
+                if f.get_internal_type() == 'DateTimeField':
+                    functions.append(str)
+                if f.name in raw_json_fields:
+                    functions.append(cls.get_raw_json)
+                elif SETTINGS.MODEL_JSON_FIELD_NAMES is not None and f.name in SETTINGS.MODEL_JSON_FIELD_NAMES:
+                    functions.append(cls.load_json)
+                if len(functions) == 1:
+                    converters.append((len(columns), functions[0]))
+                elif len(functions) == 2:
+                    converters.append((len(columns), lambda value, function=functions[1]: function(str(value))))
+                names.append(f.name)
+                columns.append(f.attname)
+            reader = RowReader(names=tuple(names), columns=tuple(columns), converters=tuple(converters))
+        row_readers[key] = reader
+        return reader
+
+    # the RowReader which only reads the columns kept by the filters of "values" and "values_fields"
+    @classmethod
+    def get_projected_row_reader(cls, reader, filters, values_white_list=True):
+        indexes = [i for i, name in enumerate(reader.names) if cls.is_key_kept(name, filters, values_white_list)]
+        converters = dict(reader.converters)
+        return RowReader(names=tuple(reader.names[i] for i in indexes),
+                         columns=tuple(reader.columns[i] for i in indexes),
+                         converters=tuple((j, converters[i]) for j, i in enumerate(indexes) if i in converters))
+
+    # read the rows of the query set by "values_list" into dicts, without instantiating the models
+    @classmethod
+    def query_set_to_list_by_values_list(cls, query_set, list_data, reader):
+        names = reader.names
+        converters = reader.converters
+        if len(names) == 0:
+            for _ in query_set.values_list('pk'):
+                list_data.append({})
+        elif len(converters) == 0:
+            for row in query_set.values_list(*reader.columns):
+                list_data.append(dict(zip(names, row)))
+        else:
+            for row in query_set.values_list(*reader.columns):
+                row = list(row)
+                for index, convert in converters:
+                    row[index] = convert(row[index])
+                list_data.append(dict(zip(names, row)))
+        return list_data
+
     @classmethod
     def query_set_to_list_process_many_to_many_and_json(cls, query_set, fields=None, exclude=None):
         list_data = []
@@ -221,76 +511,231 @@ class BenchmarkModel(object):
             list_data.append(data)
         return list_data
 
+    # the filters of "values" (only for the first level) and "values_fields" for the dicts in the path of the response
+    @staticmethod
+    def get_values_filters(path, values=None, values_fields=None):
+        filters = []
+        if path == '/' and isinstance(values, list):
+            filters.append(values)
+        if values_fields and path in values_fields:
+            filters.append(values_fields[path])
+        return filters
+
+    # whether the key is kept by filter_fields and BenchmarkAPIView.process_keys
+    @staticmethod
+    def is_key_kept(key, filters, values_white_list=True):
+        for values in filters:
+            if (key in values) != values_white_list:
+                return False
+        return True
+
+    # the field names in the dict of model_to_dict
+    @staticmethod
+    def get_dict_field_names(model):
+        omit = getattr(SETTINGS, 'OMIT_UN_EDITABLE_FIELDS', False)
+        opts = model._meta
+        return [f.name for f in chain(opts.concrete_fields, opts.private_fields, opts.many_to_many)
+                if not omit or getattr(f, 'editable', False)]
+
+    # the fields of the related model which get_select_related reads into the dicts
+    @staticmethod
+    def get_select_related_model_fields(model, select_related_fields):
+        model_fields = []
+        for relate_model_field in model._meta.get_fields():
+            name = relate_model_field.name
+            if name in (SETTINGS.MODEL_CREATE_TIME, SETTINGS.MODEL_MODIFY_TIME,
+                        SETTINGS.MODEL_CREATOR, SETTINGS.MODEL_MODIFIER):
+                continue
+            if relate_model_field.is_relation and name not in select_related_fields.keys():
+                continue
+            model_fields.append(relate_model_field)
+        return model_fields
+
+    # Get the Projection of the dicts of the model with its select_related relations, or None if all the fields are
+    # needed. A field of a related model is renamed in the dict when its name collides with an existing key, so it is
+    # read if any of its possible names may be kept.
     @classmethod
-    def get_select_related(cls, query_set, select_related_fields, list_data):
-        for related_field in select_related_fields.keys():
-            query_set = query_set.select_related(related_field)
-        for i, m in enumerate(query_set):
-            dict_m = cls.model_to_dict_process_json(m)
-            for relate_name, model in select_related_fields.items():
-                for relate_model_field in model._meta.get_fields():
-                    name = relate_model_field.name
-                    if name in (SETTINGS.MODEL_CREATE_TIME, SETTINGS.MODEL_MODIFY_TIME,
-                                SETTINGS.MODEL_CREATOR, SETTINGS.MODEL_MODIFIER):
-                        continue
-                    if relate_model_field.is_relation and name not in select_related_fields.keys():
-                        continue
-                    related_field = None
-                    for _relate_name in relate_name.split('__'):
-                        if related_field is None:
-                            if not hasattr(m, _relate_name):
-                                break
-                            related_field = getattr(m, _relate_name)
-                        else:
-                            if not hasattr(related_field, _relate_name):
-                                related_field = None
-                                break
-                            related_field = getattr(related_field, _relate_name)
-                    if related_field is not None and hasattr(related_field, name):
-                        value = getattr(related_field, name)
-                        value = cls.get_json(name, value)
-                        if isinstance(value, datetime.datetime):
-                            value = str(value)
-                        if name in dict_m.keys():
-                            name = relate_name + '__' + name
-                        while name in dict_m.keys():
-                            name = name + '__'
-                        dict_m[name] = value
+    def get_projection(cls, model, select_related_fields, filters, values_white_list=True):
+        if len(filters) == 0:
+            return None
+        select_related_fields = OrderedDict(select_related_fields)
+        dict_names = cls.get_dict_field_names(model)
+        names = tuple(name for name in dict_names if cls.is_key_kept(name, filters, values_white_list))
+        only_fields = []
+        for f in model._meta.concrete_fields:
+            # the foreign keys are always loaded, for select_related and the relations of prefetch
+            if f.name in names or f.is_relation:
+                only_fields.append(f.name)
+        possible_names = set(dict_names)
+        related_names = {}
+        for relate_name, related_model in select_related_fields.items():
+            related_names[relate_name] = set()
+            relate_names = []
+            for relate_model_field in cls.get_select_related_model_fields(related_model, select_related_fields):
+                name = relate_model_field.name
+                renamed = relate_name + '__' + name
+                needed = cls.is_key_kept(name, filters, values_white_list)
+                if not needed and name in possible_names:
+                    if values_white_list:
+                        needed = any(value == renamed or value.startswith(renamed + '__') for value in filters[0])
+                    else:
+                        needed = True
+                if needed:
+                    related_names[relate_name].add(name)
+                    if relate_model_field.concrete:
+                        only_fields.append(relate_name + '__' + name)
+                relate_names.extend((name, renamed))
+            possible_names.update(relate_names)
+            # the primary key keeps the foreign keys of the relation loaded for select_related
+            only_fields.append(relate_name + '__' + related_model._meta.pk.name)
+        return Projection(filters=filters, values_white_list=values_white_list, dict_names=tuple(dict_names),
+                          names=names, related_names=related_names, only_fields=tuple(only_fields))
+
+    @classmethod
+    def model_to_dict_by_projection(cls, instance, projection, raw_json_fields=()):
+        # the many to many fields are not in the response of http get requests, needn't get their query sets
+        many_to_many = cls.get_model_meta(instance.__class__).many_to_many_names
+        if projection is None:
+            return cls.model_to_dict_process_json(instance, exclude=many_to_many, raw_json_fields=raw_json_fields)
+        if len(projection.names) == 0:
+            return {}
+        return cls.model_to_dict_process_json(instance, fields=projection.names, exclude=many_to_many,
+                                              raw_json_fields=raw_json_fields)
+
+    @classmethod
+    def get_select_related(cls, query_set, select_related_fields, list_data, projection=None, raw_json_fields=()):
+        select_related_fields = OrderedDict(select_related_fields)
+        # the items loaded in batch are already a list with their to-one relations joined
+        if isinstance(query_set, django.db.models.query.QuerySet):
+            for related_field in select_related_fields.keys():
+                query_set = query_set.select_related(related_field)
+            if projection is not None:
+                query_set = query_set.only(*projection.only_fields)
+        if projection is None:
+            dict_names_of_model = None
+        else:
+            dict_names_of_model = projection.dict_names
+        # the relations are (relate_name, names of the relation path, fields), the fields are (field name, whether it
+        # is a relation field, converter) of the related model
+        relations = []
+        for relate_name, model in select_related_fields.items():
+            fields = []
+            for relate_model_field in cls.get_select_related_model_fields(model, select_related_fields):
+                name = relate_model_field.name
+                if name in raw_json_fields:
+                    converter = cls.get_raw_json
+                elif SETTINGS.MODEL_JSON_FIELD_NAMES is not None and name in SETTINGS.MODEL_JSON_FIELD_NAMES:
+                    converter = cls.load_json
+                else:
+                    converter = None
+                fields.append((name, relate_model_field.is_relation, converter))
+            relations.append((relate_name, relate_name.split(LOOKUP_SEP), fields))
+        # The accessors depend on which related items exist and which relation fields they have, since the missing ones
+        # are not in the dict and don't take the names. They are compiled once for every case.
+        accessors_of_cases = {}
+        for m in query_set:
+            dict_m = cls.model_to_dict_by_projection(m, projection, raw_json_fields)
+            # the keys for the collision of names, the ones not in the dict (the many to many fields and the ones not
+            # kept by the projection) are also included
+            if dict_names_of_model is None:
+                dict_names_of_model = cls.get_dict_field_names(m.__class__)
+            related_items = []
+            case = []
+            for relate_name, relate_names, fields in relations:
+                related_item = m
+                for _relate_name in relate_names:
+                    related_item = getattr(related_item, _relate_name, None)
+                    if related_item is None:
+                        break
+                related_items.append(related_item)
+                if related_item is None:
+                    case.append(None)
+                else:
+                    case.append(tuple(hasattr(related_item, name) for name, is_relation, _ in fields if is_relation))
+            case = tuple(case)
+            accessors = accessors_of_cases.get(case)
+            if accessors is None:
+                accessors = cls.compile_related_accessors(relations, case, dict_names_of_model, projection)
+                accessors_of_cases[case] = accessors
+            for index, field_name, name, is_relation, converter in accessors:
+                value = getattr(related_items[index], field_name)
+                if is_relation and isinstance(type(value), django.db.models.base.ModelBase):
+                    continue    # the related model instance is not in the response
+                if converter is not None:
+                    value = converter(value)
+                if isinstance(value, datetime.datetime):
+                    value = str(value)
+                dict_m[name] = value
             list_data.append(dict_m)
         return query_set
 
+    # Compile the RelatedAccessors of the relations (see get_select_related) for the case of an item, the case is None
+    # for the relations whose related items don't exist, otherwise it is whether the related item has the relation
+    # fields. The names of the fields which collide with the names in the dict are prefixed by the relate_name.
+    @classmethod
+    def compile_related_accessors(cls, relations, case, dict_names_of_model, projection):
+        accessors = []
+        dict_names = set(dict_names_of_model)
+        for index, ((relate_name, _, fields), has_relation_fields) in enumerate(zip(relations, case)):
+            if has_relation_fields is None:
+                continue
+            has_relation_fields = iter(has_relation_fields)
+            for field_name, is_relation, converter in fields:
+                if is_relation and not next(has_relation_fields):
+                    continue
+                name = field_name
+                if name in dict_names:
+                    name = relate_name + '__' + name
+                while name in dict_names:
+                    name = name + '__'
+                dict_names.add(name)
+                if projection is not None:
+                    if field_name not in projection.related_names[relate_name] or \
+                            not cls.is_key_kept(name, projection.filters, projection.values_white_list):
+                        continue
+                accessors.append(RelatedAccessor(index=index, field_name=field_name, name=name,
+                                                 is_relation=is_relation, converter=converter))
+        return tuple(accessors)
+
     # for http post / put method, get model field names
     @staticmethod
     def get_model_field_names(model):
-        field_names = []
-        for field in model._meta.get_fields():
-            if SETTINGS.MODEL_DELETE_FLAG is None or field.name != SETTINGS.MODEL_DELETE_FLAG:
-                field_names.append(field.name)
-        return field_names
+        return list(BenchmarkModel.get_model_meta(model).field_names)
 
-    # for http get method, get model field names and keywords, and then delete error keys in params
+    # Whether the names of a lookup path are the relations and a field of the model, followed by the transforms and the
+    # lookup of the field, for example "department__company__company_name__icontains".
+    @classmethod
+    def is_lookup_path(cls, model, names):
+        field = None
+        for i, name in enumerate(names):
+            if model is not None:
+                fields = cls.get_model_meta(model).fields
+                if name in fields:
+                    field = fields[name]
+                    model = field.related_model if field.is_relation else None
+                    continue
+            if field is None or not hasattr(field, 'get_lookup'):
+                return False
+            for lookup_name in names[i:-1]:
+                if field.get_transform(lookup_name) is None:
+                    return False
+            return field.get_lookup(names[-1]) is not None or field.get_transform(names[-1]) is not None
+        return field is not None
+
+    # for http get method, whether the key of params is a keyword or a lookup path of the model
     @classmethod
     def validate_key(cls, model, key, is_first_model=True):
         if is_first_model and key in SETTINGS.KEYWORDS:
             return True
-        field_names = cls.get_model_field_names(model)
-        field_names.append('pk')
-        if key in field_names:
-            return True
-        if '__' not in key:
-            return False
-        split_keys = key.split('__')
-        if len(split_keys) == 2 and split_keys[0] in field_names and split_keys[1] in Query:
-            return True
-        if split_keys[0] in field_names:
-            field = getattr(model, split_keys[0], None)
-            if field is None:
-                return False
-            if hasattr(field, 'field'):
-                field = field.field
-            if getattr(field, 'is_relation', False):
-                return cls.validate_key(field.related_model, '__'.join(split_keys[1:]), False)
-        return False
+        path = (model, key)
+        is_valid = validated_paths.get(path)
+        if is_valid is None:
+            is_valid = cls.is_lookup_path(model, key.split(LOOKUP_SEP))
+            with validated_paths_lock:
+                if len(validated_paths) >= getattr(SETTINGS, 'LOOKUP_PATH_CACHE_SIZE', 4096):
+                    validated_paths.clear()
+                validated_paths[path] = is_valid
+        return is_valid
 
     # for http get method, get model field names and keywords, and then delete error keys in params
     @classmethod
@@ -301,205 +746,500 @@ class BenchmarkModel(object):
                 return cls.get_response_by_code(24 + SETTINGS.CODE_OFFSET, msg_append=key)
         return None
 
+    # Compile the select_related relations of the model into an immutable RelationPlan. The to-one relations from the
+    # model are joined by the query of the model (level 0). Every to-many relation starts a new level, which is loaded
+    # from the items of the upper level (pre_root), and the to-one relations after it are joined by its query.
+    @classmethod
+    def compile_relation_plan(cls, select_related):
+        relates = {}
+        relates_keys = []    # relates, 为避免重复的统计进去
+        level_relates = []
+        num_select_related = []
+        for relate in select_related:
+            num = relate.count('__')
+            while len(num_select_related) <= num:
+                num_select_related.append([])
+            num_select_related[num].append(relate)
+        for i, num_related in enumerate(num_select_related[1:][::-1]):
+            for relate in num_related:
+                index = relate.rfind('__')
+                prefix_field_name = relate[:index]
+                if prefix_field_name not in num_select_related[i - 1]:
+                    if prefix_field_name not in num_select_related[len(num_select_related) - i - 2]:
+                        num_select_related[len(num_select_related) - i - 2].append(prefix_field_name)
+        for num_related in num_select_related:
+            for relate in num_related:
+                index = relate.rfind('__')
+                if index != -1:
+                    field_name = relate[index + 2:]
+                    prefix_field_name = relate[:index]
+                    model = relates[prefix_field_name]['related_model']
+                    pre_relate = relates[prefix_field_name]
+                    _pre_relate = pre_relate
+                    while _pre_relate is not None and _pre_relate['level_root'] is not None:
+                        _pre_relate = _pre_relate['pre_relate']
+                    else:
+                        pre_root = _pre_relate
+                else:
+                    model = cls
+                    field_name = relate
+                    pre_relate = None
+                    pre_root = None
+                field = getattr(model, field_name, None)
+                # many to one / one to one
+                if isinstance(field, django.db.models.fields.related_descriptors.ForwardManyToOneDescriptor):
+                    relate_type = 'to_one'    # many to one / one to one
+                    related_model = field.field.related_model
+                # reverse one to one
+                elif isinstance(field, django.db.models.fields.related_descriptors.ReverseOneToOneDescriptor):
+                    relate_type = 'to_one'    # reverse one to one
+                    related_model = field.related.related_model
+                # reverse many to one / many to many / reverse many to many
+                elif isinstance(field, django.db.models.fields.related_descriptors.ReverseManyToOneDescriptor):
+                    if isinstance(getattr(field, 'field', None), django.db.models.fields.related.ManyToManyField):
+                        if field.reverse:
+                            relate_type = 'to_many'    # reverse many to many
+                            related_model = field.rel.related_model
+                        else:
+                            relate_type = 'to_many'    # many to many
+                            related_model = field.field.related_model
+                    else:
+                        relate_type = 'to_many'    # reverse many to one
+                        related_model = field.rel.related_model
+                else:
+                    return RelationPlan(level_relates=(), select_related_fields=(), invalid_relate=relate)
+                if pre_relate is None:
+                    level = 0
+                    level_root = None
+                else:
+                    level = pre_relate['level']
+                    if level == 0:
+                        level_root = None
+                    else:
+                        root = pre_relate
+                        while root['level_root'] is not None:
+                            root = root['pre_relate']
+                        else:
+                            level_root = root
+                if relate_type == 'to_many':
+                    level += 1
+                    level_root = None
+                if level > 0:
+                    if level_root is None:
+                        if pre_relate is not None:
+                            if pre_relate['level_root'] is None:
+                                location = cls.get_location(pre_relate)
+                            else:
+                                location = cls.get_location(pre_relate['level_root'])
+                        else:
+                            location = None
+                    else:
+                        location = cls.get_location(level_root)
+                else:
+                    location = None
+                if pre_root is None or pre_root['level'] == 0:
+                    field_name_from_pre_root = relate
+                else:
+                    field_name_from_pre_root = relate[len(pre_root['full_name']) + 2:]
+                relates[relate] = {
+                    'full_name': relate,
+                    'field_name': field_name,
+                    'field_name_from_pre_root': field_name_from_pre_root,
+                    'model': model,
+                    'related_model': related_model,
+                    'relate_type': relate_type,
+                    'level': level,
+                    'pre_relate': pre_relate,
+                    'pre_root': pre_root,
+                    'level_root': level_root,
+                    'level_nodes': [],
+                    'location': location
+                }
+                if level_root is not None and (level, relate) not in relates_keys:
+                    level_root['level_nodes'].append(relates[relate])
+                    relates_keys.append((level, relate))
+                while level >= len(level_relates):
+                    level_relates.append([])
+                if level_root is None and (level, relate) not in relates_keys:
+                    level_relates[level].append(relates[relate])
+                    relates_keys.append((level, relate))
+        select_related_fields = ()
+        level_roots = []
+        for level, level_relate in enumerate(level_relates):
+            if level == 0:
+                select_related_fields = tuple((root['full_name'], root['related_model']) for root in level_relate)
+                continue
+            roots = []
+            for root in level_relate:
+                roots.append(RelationRoot(
+                    full_name=root['full_name'],
+                    field_name=root['field_name'],
+                    field_name_from_pre_root=root['field_name_from_pre_root'],
+                    related_model=root['related_model'],
+                    pre_root=None if root['pre_root'] is None else root['pre_root']['full_name'],
+                    select_related_fields=tuple((node['full_name'][len(root['full_name']) + 2:], node['related_model'])
+                                                for node in root['level_nodes'])
+                ))
+            level_roots.append(tuple(roots))
+        return RelationPlan(level_relates=tuple(level_roots), select_related_fields=select_related_fields,
+                            invalid_relate=None)
+
+    # get the compiled relation plan from the LRU cache, which is shared by every request and every thread. The key is
+    # normalized by sorting, since the order of select_related doesn't change the relations to load
+    @classmethod
+    def get_relation_plan(cls, select_related):
+        key = (cls, tuple(sorted(set(select_related))))
+        with relation_plans_lock:
+            plan = relation_plans.get(key)
+            if plan is not None:
+                relation_plans.move_to_end(key)
+                return plan
+        plan = cls.compile_relation_plan(key[1])
+        with relation_plans_lock:
+            relation_plans[key] = plan
+            while len(relation_plans) > getattr(SETTINGS, 'RELATION_PLAN_CACHE_SIZE', 256):
+                relation_plans.popitem(last=False)
+        return plan
+
+    # load the to-many relation of the root for all the items of its upper level by only one query, after that the
+    # related managers of these items read from the prefetched cache
+    @classmethod
+    def prefetch_to_many(cls, root, list_pre_root_objects, using='default', projection=None):
+        pre_root_objects = [obj for objects in list_pre_root_objects for obj in objects if obj is not None]
+        if len(pre_root_objects) == 0:
+            return
+        query_set = root.related_model.objects.using(using).all()
+        for related_field, _ in root.select_related_fields:
+            query_set = query_set.select_related(related_field)
+        if projection is not None:
+            query_set = query_set.only(*projection.only_fields)
+        prefetch_related_objects(pre_root_objects, Prefetch(root.field_name_from_pre_root, queryset=query_set))
+
+    # the cursor is the url safe base64 of json [direction, order_by value, pk], direction is SETTINGS.NEXT or
+    # SETTINGS.PREVIOUS
+    @staticmethod
+    def encode_cursor(direction, value, pk):
+        cursor = json.dumps([direction, value, pk], default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        cursor = base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode('ascii'))
+        direction, value, pk = json.loads(cursor.decode('utf-8'))
+        if direction not in (SETTINGS.NEXT, SETTINGS.PREVIOUS) or pk is None:
+            raise ValueError(cursor)
+        return direction, value, pk
+
+    # keyset pagination: seek the page after (or before) the cursor by the condition on (order_by value, pk) instead of
+    # OFFSET, return the query set of the page and the (previous, next) cursors of it, an empty cursor is the first
+    # page. order_by should be a concrete field of the model, not a field of the related models.
+    @classmethod
+    def seek_by_cursor(cls, query_set, cursor, limit=0, order_by=None):
+        descending = order_by is not None and order_by.startswith('-')
+        field_name = order_by[1:] if descending else order_by
+        if field_name in ('', 'pk', cls._meta.pk.name):
+            field_name = None
+        if field_name is not None:
+            try:
+                field = cls._meta.get_field(field_name)
+            except django.core.exceptions.FieldDoesNotExist:
+                field = None
+            if not isinstance(field, django.db.models.Field) or not field.concrete or field.many_to_many:
+                return cls.get_response_by_code(24 + SETTINGS.CODE_OFFSET, msg_append=order_by), (None, None)
+        if cursor:
+            try:
+                direction, value, pk = cls.decode_cursor(cursor)
+            except Exception:
+                return cls.get_response_by_code(34 + SETTINGS.CODE_OFFSET), (None, None)
+        else:
+            direction, value, pk = SETTINGS.NEXT, None, None
+        backward = direction == SETTINGS.PREVIOUS
+        key_names = ['pk'] if field_name is None else [field_name, 'pk']
+        ordering = [name if descending == backward else '-' + name for name in key_names]
+        page_query_set = query_set.order_by(*[name if not descending else '-' + name for name in key_names])
+        query_set = query_set.order_by(*ordering)
+        if pk is not None:
+            lookup = '__lt' if descending != backward else '__gt'
+            q = Q(**{'pk' + lookup: pk})
+            if field_name is not None:
+                try:
+                    q = Q(**{field_name + lookup: value}) | Q(**{field_name: value}) & q
+                    query_set = query_set.filter(q)
+                except Exception:
+                    return cls.get_response_by_code(34 + SETTINGS.CODE_OFFSET), (None, None)
+            else:
+                query_set = query_set.filter(q)
+        if limit <= 0:
+            if backward:
+                return page_query_set.filter(pk__in=query_set.values('pk')), (None, None)
+            return query_set, (None, None)
+        # only the keys of the page are searched by the seek condition, then the page is searched by them
+        keys = list(query_set.values_list(*key_names)[:limit + 1])
+        has_more = len(keys) > limit
+        keys = keys[:limit]
+        if backward:
+            keys.reverse()
+        previous_cursor = next_cursor = None
+        if len(keys) > 0:
+            if (backward and has_more) or (not backward and pk is not None):
+                previous_cursor = cls.encode_cursor(SETTINGS.PREVIOUS, keys[0][0], keys[0][-1])
+            if (not backward and has_more) or (backward and pk is not None):
+                next_cursor = cls.encode_cursor(SETTINGS.NEXT, keys[-1][0], keys[-1][-1])
+        return page_query_set.filter(pk__in=[key[-1] for key in keys]), (previous_cursor, next_cursor)
+
+    # count the query set by the count mode, "cached" and "estimated" are the same as "exact" if they are not supported
+    @classmethod
+    def count_model(cls, query_set, count_mode='exact'):
+        if count_mode not in ('cached', 'estimated'):
+            return query_set.count()
+        try:
+            sql, sql_params = query_set.query.get_compiler(query_set.db).as_sql()
+            key = (query_set.db, sql, tuple(sql_params))
+            hash(key)
+        except Exception:    # such as an empty "IN" condition
+            return query_set.count()
+        if count_mode == 'cached':
+            now = time.time()
+            with count_caches_lock:
+                value = count_caches.get(key)
+                if value is not None and value[1] > now:
+                    count_caches.move_to_end(key)
+                    return value[0]
+            count = query_set.count()
+            with count_caches_lock:
+                count_caches[key] = (count, now + getattr(SETTINGS, 'COUNT_CACHE_TIMEOUT', 60))
+                while len(count_caches) > getattr(SETTINGS, 'COUNT_CACHE_SIZE', 1024):
+                    count_caches.popitem(last=False)
+            return count
+        # the estimated number of rows by the query planner of the database
+        connection = connections[query_set.db]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, sql_params)
+                    plan = cursor.fetchone()[0]
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    return int(plan[0]['Plan']['Plan Rows'])
+                elif connection.vendor == 'mysql':
+                    cursor.execute('EXPLAIN ' + sql, sql_params)
+                    column_names = [column[0] for column in cursor.description]
+                    return int(cursor.fetchone()[column_names.index('rows')])
+        except Exception:
+            pass
+        return query_set.count()
+
+    # convert the items of the query set to the dicts in the response, with the relations in the relation plan
+    @classmethod
+    def get_list_data(cls, query_set, plan=None, values=None, values_white_list=True, values_fields=None,
+                      using='default', batch_select_related=True, read_by_values_list=True, raw_json_fields=()):
+        list_data = []
+        if plan is not None:
+            # process model relations
+            projection = cls.get_projection(query_set.model, plan.select_related_fields,
+                                            cls.get_values_filters('/', values, values_fields), values_white_list)
+            if len(plan.select_related_fields) > 0:
+                query_set = cls.get_select_related(query_set, plan.select_related_fields, list_data, projection,
+                                                   raw_json_fields)
+            else:
+                if projection is not None:
+                    query_set = query_set.only(*projection.only_fields)
+                for item in query_set:
+                    if item is None:
+                        continue
+                    dict_item = cls.model_to_dict_by_projection(item, projection, raw_json_fields)
+                    list_data.append(dict_item)
+            list_object_roots = {}    # the loaded items of each level root in this request
+            list_dict_roots = {}
+            root_paths = {}    # the paths of the dicts of each level root in the response, for values_fields
+            for level_relate in plan.level_relates:
+                for root in level_relate:
+                    pre_root_path = root_paths.get(root.pre_root, '/')
+                    root_paths[root.full_name] = pre_root_path + root.field_name + '/'
+                    if root.pre_root in root_paths and root.pre_root not in list_object_roots:
+                        continue    # the upper level is not in the response
+                    values_filters = cls.get_values_filters(pre_root_path, values, values_fields)
+                    if not cls.is_key_kept(root.field_name, values_filters, values_white_list):
+                        continue    # the relation is not in the response, needn't load it
+                    if root.pre_root not in list_object_roots:
+                        list_pre_root_objects = [query_set]
+                        list_pre_root_dicts = [list_data]
+                    else:
+                        list_pre_root_objects = list_object_roots[root.pre_root]
+                        list_pre_root_dicts = list_dict_roots[root.pre_root]
+                    list_object_roots[root.full_name] = []
+                    list_dict_roots[root.full_name] = []
+                    projection = cls.get_projection(root.related_model, root.select_related_fields,
+                                                    cls.get_values_filters(root_paths[root.full_name],
+                                                                           values_fields=values_fields),
+                                                    values_white_list)
+                    if batch_select_related:
+                        cls.prefetch_to_many(root, list_pre_root_objects, using, projection)
+                    field_names_from_pre_root = root.field_name_from_pre_root.split('__')
+                    for pre_root_objects, pre_root_dicts in zip(list_pre_root_objects, list_pre_root_dicts):
+                        for pre_root_object, pre_root_dict in zip(pre_root_objects, pre_root_dicts):
+                            obj = pre_root_object
+                            for name in field_names_from_pre_root:
+                                obj = getattr(obj, name)
+                            if batch_select_related:    # read from the prefetched cache, without any query
+                                objects = list(obj.all())
+                            else:
+                                objects = obj.all()
+                            pre_root_dict[root.field_name] = []
+                            if len(root.select_related_fields) == 0:
+                                if projection is not None and not batch_select_related:
+                                    objects = objects.only(*projection.only_fields)
+                                for item in objects:
+                                    dict_item = cls.model_to_dict_by_projection(item, projection, raw_json_fields)
+                                    pre_root_dict[root.field_name].append(dict_item)
+                            else:
+                                objects = cls.get_select_related(objects, root.select_related_fields,
+                                                                 pre_root_dict[root.field_name], projection,
+                                                                 raw_json_fields)
+                            list_object_roots[root.full_name].append(objects)
+                            list_dict_roots[root.full_name].append(pre_root_dict[root.field_name])
+        else:
+            filters = cls.get_values_filters('/', values, values_fields)
+            reader = cls.get_row_reader(query_set.model, raw_json_fields) if read_by_values_list else None
+            if reader is not None:
+                if len(filters) > 0:    # only read the columns in the response
+                    reader = cls.get_projected_row_reader(reader, filters, values_white_list)
+                cls.query_set_to_list_by_values_list(query_set, list_data, reader)
+            else:
+                projection = cls.get_projection(query_set.model, (), filters, values_white_list)
+                if projection is not None:
+                    query_set = query_set.only(*projection.only_fields)
+                for item in query_set:
+                    dict_item = cls.model_to_dict_by_projection(item, projection, raw_json_fields)
+                    list_data.append(dict_item)
+        # The dicts have neither query sets nor model instances (see delete_query_set), and "values" is already applied
+        # by the projection (see filter_fields), so they needn't be walked again.
+        return list_data
+
+    # the generator of the dicts in the response, for the streaming http response. Only the primary keys of the query
+    # set are searched at first, then the items are searched and converted by get_list_data chunk by chunk, so the
+    # memory doesn't grow with the number of items.
+    @classmethod
+    def stream_list_data(cls, query_set, query_set_for_chunk, plan=None, values=None, values_white_list=True,
+                         values_fields=None, using='default', batch_select_related=True, read_by_values_list=True,
+                         chunk_size=None, raw_json_fields=()):
+        if chunk_size is None:
+            chunk_size = getattr(SETTINGS, 'STREAM_CHUNK_SIZE', 500)
+        if query_set.query.can_filter():    # not sliced, such as the page of the cursor
+            query_set_for_chunk = query_set
+        elif not query_set_for_chunk.query.can_filter():    # sliced by "first" or "last"
+            for item in cls.get_list_data(query_set, plan, values, values_white_list, values_fields, using,
+                                          batch_select_related, read_by_values_list, raw_json_fields):
+                yield item
+            return
+        pks = query_set.values_list('pk', flat=True).iterator()
+        while True:
+            chunk = list(islice(pks, chunk_size))
+            if len(chunk) == 0:
+                break
+            for item in cls.get_list_data(query_set_for_chunk.filter(pk__in=chunk), plan, values, values_white_list,
+                                          values_fields, using, batch_select_related, read_by_values_list,
+                                          raw_json_fields):
+                yield item
+
     @classmethod
     def get_model(cls, params=None, query_set=None, select_related=None, values=None, values_white_list=True, Qs=None,
                   using='default', first=False, last=False, order_by=None, limit=0, page=0, offset=0,
-                  return_with_count=False):
+                  return_with_count=False, batch_select_related=None, read_by_values_list=None, values_fields=None,
+                  cursor=None, return_with_cursors=False, count_mode=None, stream=False, stream_chunk_size=None,
+                  raw_json_fields=()):
+        if count_mode is None:
+            count_mode = getattr(SETTINGS, 'COUNT_MODE', 'exact')
+        if batch_select_related is None:
+            batch_select_related = getattr(SETTINGS, 'BATCH_SELECT_RELATED', True)
+        if read_by_values_list is None:
+            read_by_values_list = getattr(SETTINGS, 'READ_BY_VALUES_LIST', True)
         res = cls.check_params(params)
         if res is not None:
+            if return_with_cursors:
+                return res, None, (None, None)
             if return_with_count:
                 return res, None
             return res
-        relates = {}
-        relates_keys = []    # relates, 为避免重复的统计进去
-        level_relates = []
-        list_data = []
         query_set = cls.filter_model(params, query_set, Qs=Qs, using=using, first=first, last=last, order_by=order_by)
         if isinstance(query_set, dict):
+            if return_with_cursors:
+                return query_set, None, (None, None)
             if return_with_count:
                 return query_set, None
             return query_set
         query_set_for_count = query_set
-        if SETTINGS.PAGE not in params.keys():
+        cursors = (None, None)
+        start = None    # the index of the first item of the page in the query set, if it is sliced
+        more = 0    # except the "exact" count mode, search one more item to know whether there is a next page
+        if cursor is not None:
+            if order_by is None and params is not None:
+                order_by = params.get(SETTINGS.ORDER_BY)
+            query_set, cursors = cls.seek_by_cursor(query_set, cursor, limit, order_by)
+            if isinstance(query_set, dict):
+                if return_with_cursors:
+                    return query_set, None, (None, None)
+                if return_with_count:
+                    return query_set, None
+                return query_set
+        elif SETTINGS.PAGE not in params.keys():
             if limit == 0:
+                start = offset
                 query_set = query_set[offset:]
             elif limit > 0:
-                if page > 0:
-                    query_set = query_set[(page - 1) * limit: page * limit]
-                else:
-                    query_set = query_set[offset:offset + limit]
+                start = (page - 1) * limit if page > 0 else offset
+                more = 0 if count_mode == 'exact' or stream else 1
+                query_set = query_set[start:start + limit + more]
+        plan = None
         if select_related is not None and len(select_related) > 0:
-            # create data structures of model relations
-            num_select_related = []
-            for relate in select_related:
-                num = relate.count('__')
-                while len(num_select_related) <= num:
-                    num_select_related.append([])
-                num_select_related[num].append(relate)
-            for i, num_related in enumerate(num_select_related[1:][::-1]):
-                for relate in num_related:
-                    index = relate.rfind('__')
-                    prefix_field_name = relate[:index]
-                    if prefix_field_name not in num_select_related[i - 1]:
-                        if prefix_field_name not in num_select_related[len(num_select_related) - i - 2]:
-                            num_select_related[len(num_select_related) - i - 2].append(prefix_field_name)
-            for num_related in num_select_related:
-                for relate in num_related:
-                    index = relate.rfind('__')
-                    if index != -1:
-                        field_name = relate[index + 2:]
-                        prefix_field_name = relate[:index]
-                        model = relates[prefix_field_name]['related_model']
-                        pre_relate = relates[prefix_field_name]
-                        _pre_relate = pre_relate
-                        while _pre_relate is not None and _pre_relate['level_root'] is not None:
-                            _pre_relate = _pre_relate['pre_relate']
-                        else:
-                            pre_root = _pre_relate
-                    else:
-                        model = cls
-                        field_name = relate
-                        pre_relate = None
-                        pre_root = None
-                    field = getattr(model, field_name, None)
-                    # many to one / one to one
-                    if isinstance(field, django.db.models.fields.related_descriptors.ForwardManyToOneDescriptor):
-                        relate_type = 'to_one'    # many to one / one to one
-                        related_model = field.field.related_model
-                    # reverse one to one
-                    elif isinstance(field, django.db.models.fields.related_descriptors.ReverseOneToOneDescriptor):
-                        relate_type = 'to_one'    # reverse one to one
-                        related_model = field.related.related_model
-                    # reverse many to one / many to many / reverse many to many
-                    elif isinstance(field, django.db.models.fields.related_descriptors.ReverseManyToOneDescriptor):
-                        if isinstance(getattr(field, 'field', None), django.db.models.fields.related.ManyToManyField):
-                            if field.reverse:
-                                relate_type = 'to_many'    # reverse many to many
-                                related_model = field.rel.related_model
-                            else:
-                                relate_type = 'to_many'    # many to many
-                                related_model = field.field.related_model
-                        else:
-                            relate_type = 'to_many'    # reverse many to one
-                            related_model = field.rel.related_model
-                    else:
-                        res = cls.get_response_by_code(14 + SETTINGS.CODE_OFFSET, msg_append=relate)
-                        if return_with_count:
-                            return res, None
-                        return res
-                    if pre_relate is None:
-                        level = 0
-                        level_root = None
-                    else:
-                        level = pre_relate['level']
-                        if level == 0:
-                            level_root = None
-                        else:
-                            root = pre_relate
-                            while root['level_root'] is not None:
-                                root = root['pre_relate']
-                            else:
-                                level_root = root
-                    if relate_type == 'to_many':
-                        level += 1
-                        level_root = None
-                    if level > 0:
-                        if level_root is None:
-                            if pre_relate is not None:
-                                if pre_relate['level_root'] is None:
-                                    location = cls.get_location(pre_relate)
-                                else:
-                                    location = cls.get_location(pre_relate['level_root'])
-                            else:
-                                location = None
-                        else:
-                            location = cls.get_location(level_root)
-                    else:
-                        location = None
-                    if pre_root is None or pre_root['level'] == 0:
-                        field_name_from_pre_root = relate
-                    else:
-                        field_name_from_pre_root = relate[len(pre_root['field_name']) + 2:]
-                    relates[relate] = {
-                        'full_name': relate,
-                        'field_name': field_name,
-                        'field_name_from_pre_root': field_name_from_pre_root,
-                        'model': model,
-                        'related_model': related_model,
-                        'relate_type': relate_type,
-                        'level': level,
-                        'pre_relate': pre_relate,
-                        'pre_root': pre_root,
-                        'level_root': level_root,
-                        'level_nodes': [],
-                        'location': location
-                    }
-                    if level_root is not None and (level, relate) not in relates_keys:
-                        level_root['level_nodes'].append(relates[relate])
-                        relates_keys.append((level, relate))
-                    while level >= len(level_relates):
-                        level_relates.append([])
-                    if level_root is None and (level, relate) not in relates_keys:
-                        level_relates[level].append(relates[relate])
-                        relates_keys.append((level, relate))
-            # process model relations
-            for level, level_relate in enumerate(level_relates):
-                if level == 0:
-                    if len(level_relate) > 0:
-                        select_related_fields = OrderedDict()
-                        for root in level_relate:
-                            select_related_fields[root['full_name']] = root['related_model']
-                        query_set = cls.get_select_related(query_set, select_related_fields, list_data)
-                    else:
-                        for item in query_set:
-                            if item is None:
-                                continue
-                            dict_item = cls.model_to_dict_process_json(item)
-                            list_data.append(dict_item)
-                else:
-                    for root in level_relate:
-                        if root['pre_root'] is None or 'list_object_roots' not in root['pre_root']:
-                            list_pre_root_objects = [query_set]
-                            list_pre_root_dicts = [list_data]
-                        else:
-                            list_pre_root_objects = root['pre_root']['list_object_roots']
-                            list_pre_root_dicts = root['pre_root']['list_dict_roots']
-                        root['list_object_roots'] = []
-                        root['list_dict_roots'] = []
-                        for pre_root_objects, pre_root_dicts in zip(list_pre_root_objects, list_pre_root_dicts):
-                            for pre_root_object, pre_root_dict in zip(pre_root_objects, pre_root_dicts):
-                                field_name = root['field_name']
-                                field_names_from_pre_root = root['field_name_from_pre_root'].split('__')
-                                field_name_objects = field_name + '__objects__'
-                                obj = pre_root_object
-                                for name in field_names_from_pre_root:
-                                    obj = getattr(obj, name)
-                                pre_root_dict[field_name_objects] = obj.all()
-                                pre_root_dict[field_name] = []
-                                if len(root['level_nodes']) == 0:
-                                    for item in pre_root_dict[field_name_objects]:
-                                        dict_item = cls.model_to_dict_process_json(item)
-                                        pre_root_dict[field_name].append(dict_item)
-                                else:
-                                    select_related_fields = OrderedDict()
-                                    for node in root['level_nodes']:
-                                        select_related_fields[node['full_name'][len(root['full_name']) + 2:]] = node['related_model']
-                                    pre_root_dict[field_name_objects] = cls.get_select_related(
-                                        pre_root_dict[field_name_objects],
-                                        select_related_fields,
-                                        pre_root_dict[field_name]
-                                    )
-                                root['list_object_roots'].append(pre_root_dict[field_name_objects])
-                                root['list_dict_roots'].append(pre_root_dict[field_name])
-        else:
-            for item in query_set:
-                dict_item = cls.model_to_dict_process_json(item)
-                list_data.append(dict_item)
-        cls.delete_query_set(list_data)
-        list_data = cls.filter_fields(data=list_data, values=values, values_white_list=values_white_list)
+            plan = cls.get_relation_plan(select_related)
+            if plan.invalid_relate is not None:
+                res = cls.get_response_by_code(14 + SETTINGS.CODE_OFFSET, msg_append=plan.invalid_relate)
+                if return_with_cursors:
+                    return res, None, (None, None)
+                if return_with_count:
+                    return res, None
+                return res
+        if stream:
+            data = cls.stream_list_data(query_set, query_set_for_count, plan, values, values_white_list, values_fields,
+                                        using, batch_select_related, read_by_values_list, stream_chunk_size,
+                                        raw_json_fields)
+            res = cls.get_response_by_code(data=data)
+            count = None
+            if return_with_count and cursor is None:    # the pages of cursors are not counted, see below
+                if count_mode != 'has_next':
+                    count = cls.count_model(query_set_for_count, count_mode)
+                elif start is not None and limit > 0:
+                    count = start + limit + query_set_for_count[start + limit:start + limit + 1].exists()
+            if return_with_cursors:
+                return res, count, cursors
+            if return_with_count:
+                return res, count
+            return res
+        list_data = cls.get_list_data(query_set, plan, values, values_white_list, values_fields, using,
+                                      batch_select_related, read_by_values_list, raw_json_fields)
+        has_next = more > 0 and len(list_data) > limit
+        if has_next:
+            list_data = list_data[:limit]
         res = cls.get_response_by_code(data=list_data)
+        count = None
+        # the pages of cursors are not counted in any count mode, the cursors searched by one more key than LIMIT tell
+        # whether there are the next and previous pages, and a COUNT(*) of every page would cost more than the seek
+        if return_with_count and cursor is None:
+            if start is not None and (len(list_data) > 0 or start == 0) and \
+                    (limit == 0 or len(list_data) < limit or (more > 0 and not has_next)):
+                count = start + len(list_data)    # the page is the last one, needn't count
+            elif count_mode == 'has_next':
+                # not the real count, but enough to know whether there is a next page
+                count = None if start is None else start + len(list_data) + has_next
+            else:
+                count = cls.count_model(query_set_for_count, count_mode)
+                if start is not None:    # the estimated or cached count may be less than the searched items
+                    count = max(count, start + len(list_data) + has_next)
+        if return_with_cursors:
+            return res, count, cursors
         if return_with_count:
-            return res, query_set_for_count.count()
+            return res, count
         return res
 
     @classmethod
@@ -515,54 +1255,416 @@ class BenchmarkModel(object):
             return res
         return data
 
+    # The count of the dicts to insert for the data of a http post request, which are expanded by expand_list_values.
+    @staticmethod
+    def count_list_values(data):
+        count = 0
+        for value in data.values():
+            if not isinstance(value, list):
+                count = max(count, 1)
+            elif len(value) > 0:
+                count = max(count, 1) * len(value)
+        return count
+
+    # The dicts to insert for the data of a http post request, the values in lists are expanded into the dicts of all
+    # the combinations of them, for example {'a': [1, 2], 'b': 3} is expanded into {'a': 1, 'b': 3} and
+    # {'a': 2, 'b': 3}. The keys with empty lists are omitted. The dicts are generated lazily, the values of the first
+    # key change fastest.
+    @staticmethod
+    def expand_list_values(data):
+        keys = []
+        list_values = []
+        for key, value in data.items():
+            if not isinstance(value, list):
+                value = [value]
+            if len(value) > 0:
+                keys.append(key)
+                list_values.append(value)
+        if len(keys) == 0:
+            return
+        keys.reverse()
+        for values in product(*reversed(list_values)):
+            yield dict(zip(keys, values))
+
+    # the values of MODEL_CREATOR and MODEL_MODIFIER of the items inserted by the user
+    @classmethod
+    def get_creator_and_modifier(cls, user):
+        meta = cls.get_model_meta()
+        creator = None
+        modifier = None
+        if user is not None and user != '':
+            if meta.has_creator:
+                if meta.creator_is_relation:
+                    creator = get_user_model().objects.get(username=user)
+                else:
+                    creator = user
+            if meta.has_modifier:
+                if meta.modifier_is_relation:
+                    modifier = get_user_model().objects.get(username=user)
+                else:
+                    modifier = user
+        return creator, modifier
+
+    # Insert the items of a http post request in batch by "bulk_create" in one transaction, which are checked by
+    # post_model before. The instances are built and inserted chunk by chunk (BULK_CREATE_BATCH_SIZE instances in a
+    # chunk), a chunk is rolled back to its savepoint if it fails, then its items are left to be inserted one by one by
+    # post_model, which reports the failed items. The items without the primary key when the database cannot return the
+    # primary keys of "bulk_create" are also left. It returns the dict of the indexes of the inserted items to the lists
+    # of their model instances, whose many to many relations are added by post_model. If the BatchTransaction of
+    # post_model is given and in a transaction, the chunks are inserted in it, so they are committed by the mode "chunk"
+    # of it as the items inserted one by one.
+    @classmethod
+    def bulk_create_items(cls, post_data, user=None, using='default', batch=None):
+        meta = cls.get_model_meta()
+        if cls._meta.parents:    # "bulk_create" doesn't support the multi-table inheritance
+            return {}
+        can_return_ids = connections[using].features.can_return_ids_from_bulk_insert
+        creator, modifier = cls.get_creator_and_modifier(user)
+
+        def get_items():    # the indexes and the instances of the items, generated lazily
+            for i, data in enumerate(post_data):
+                if meta.pk_attname not in data and not can_return_ids:
+                    continue
+                instances = []
+                try:
+                    for pd in cls.expand_list_values(data):
+                        instance = cls(**pd)
+                        if creator is not None:
+                            setattr(instance, SETTINGS.MODEL_CREATOR, creator)
+                        if modifier is not None:
+                            setattr(instance, SETTINGS.MODEL_MODIFIER, modifier)
+                        instances.append(instance)
+                except Exception:
+                    continue
+                if len(instances) > 0:
+                    yield i, instances
+
+        def insert(chunk):
+            if batch is not None and batch.is_chunk_full():    # commit the items before in the mode "chunk"
+                batch.commit()
+            try:
+                with transaction.atomic(using=using):
+                    cls.objects.using(using).bulk_create(
+                        [instance for _, instances in chunk for instance in instances], batch_size=batch_size)
+            except django.db.utils.DatabaseError:
+                return
+            bulk_created_items.update(chunk)
+            if batch is not None:
+                batch.add_row(len(chunk))
+
+        def insert_chunks():
+            chunk = []
+            count = 0
+            for i, instances in get_items():
+                if count > 0 and count + len(instances) > batch_size:
+                    insert(chunk)
+                    chunk = []
+                    count = 0
+                chunk.append((i, instances))
+                count += len(instances)
+            if count > 0:
+                insert(chunk)
+
+        bulk_created_items = {}
+        batch_size = getattr(SETTINGS, 'BULK_CREATE_BATCH_SIZE', 1000)
+        if batch is not None and batch.atomic is not None:
+            insert_chunks()
+        else:
+            with transaction.atomic(using=using):
+                insert_chunks()
+        if len(bulk_created_items) > 0:
+            clear_count_caches()    # "bulk_create" doesn't send the post_save signals
+        return bulk_created_items
+
+    # the value of a field converted to look up the items queried in batch, None if it cannot be converted
+    @staticmethod
+    def get_lookup_key(field, value):
+        try:
+            value = field.to_python(value)
+            hash(value)
+        except Exception:
+            return None
+        return value
+
+    # Query the items of the primary keys and the related items of the foreign keys in the data of a http post request
+    # in batch for post_model, by one query per model (per LOOKUP_BATCH_SIZE values) instead of the queries per item.
+    # It returns the dict of {primary key: item} and the dict of {field name: {value of the target field: related
+    # item}}, whose keys are converted by get_lookup_key. The values which cannot be converted are not queried.
+    @classmethod
+    def get_post_lookup_items(cls, post_data, check_pk=True, check_foreign_keys=True, using='default'):
+        meta = cls.get_model_meta()
+        pks = set()
+        foreign_key_values = {}
+        for data in post_data:
+            for key, value in data.items():
+                if key not in meta.fields or key == 'pk':
+                    continue
+                field = meta.relation_fields.get(key)
+                if check_pk and key == meta.pk_attname:
+                    lookup_key = cls.get_lookup_key(cls._meta.pk, value)
+                    if lookup_key is not None:
+                        pks.add(lookup_key)
+                if check_foreign_keys and field is not None and (field.many_to_one or field.one_to_one):
+                    values = foreign_key_values.setdefault(key, set())
+                    for _value in (value if isinstance(value, list) else [value]):
+                        lookup_key = cls.get_lookup_key(field.target_field, _value)
+                        if lookup_key is not None:
+                            values.add(lookup_key)
+        batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+
+        def query(model, field_name, values):
+            items = {}
+            values = list(values)
+            for i in range(0, len(values), batch_size):
+                for item in model.objects.using(using).filter(**{field_name + '__in': values[i:i + batch_size]}):
+                    items[getattr(item, field_name)] = item
+            return items
+
+        exist_items = query(cls, 'pk', pks)
+        related_items = {}
+        for key, values in foreign_key_values.items():
+            field = meta.relation_fields[key]
+            related_items[key] = query(field.related_model, field.target_field.attname, values)
+        return exist_items, related_items
+
+    # Add the many to many relations of the items of the model in batch, instead of "add" value by value. The related
+    # items are checked by one "pk__in" query per many to many field, the existing relations are queried once, then the
+    # new relations are inserted into the auto-created through model by one "bulk_create" per field, and the
+    # m2m_changed signals are sent for every item as "add". "relations" is a list of (item, {field name: value or list
+    # of values}). It returns the list of (field name, value) whose related items do not exist, which are not added.
+    @classmethod
+    def add_many_to_many_relations(cls, relations, using='default'):
+        batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+        fields = OrderedDict()
+        for _, many_to_many_relations in relations:
+            for key in many_to_many_relations.keys():
+                if key not in fields:
+                    fields[key] = cls._meta.get_field(key)
+        list_relations = [(item, OrderedDict((key, value if isinstance(value, list) else [value])
+                                             for key, value in many_to_many_relations.items()))
+                          for item, many_to_many_relations in relations]
+        # the related items which exist
+        exist_targets = {}
+        for key, field in fields.items():
+            through = field.remote_field.through
+            if not through._meta.auto_created:    # "add" is not supported by the through model defined manually
+                continue
+            target_field = through._meta.get_field(field.m2m_reverse_field_name()).target_field
+            values = set()
+            for _, many_to_many_relations in list_relations:
+                for v in many_to_many_relations.get(key, ()):
+                    if isinstance(v, django.db.models.Model):
+                        v = getattr(v, target_field.attname)
+                    lookup_key = cls.get_lookup_key(target_field, v)
+                    if lookup_key is not None:
+                        values.add(lookup_key)
+            values = list(values)
+            exist_targets[key] = set()
+            for i in range(0, len(values), batch_size):
+                exist_targets[key].update(field.related_model._default_manager.using(using).filter(
+                    **{target_field.attname + '__in': values[i:i + batch_size]}).values_list(target_field.attname,
+                                                                                           flat=True))
+        does_not_exist = []
+        pk_sets = OrderedDict((key, []) for key in fields.keys())
+        for item, many_to_many_relations in list_relations:
+            for key, values in many_to_many_relations.items():
+                field = fields[key]
+                if key not in exist_targets:
+                    for v in values:
+                        try:
+                            getattr(item, key).add(v)
+                        except django.db.utils.IntegrityError:
+                            does_not_exist.append((key, v))
+                    continue
+                target_field = field.remote_field.through._meta.get_field(field.m2m_reverse_field_name()).target_field
+                pk_set = OrderedDict()
+                for v in values:
+                    if isinstance(v, django.db.models.Model):
+                        v = getattr(v, target_field.attname)
+                    lookup_key = cls.get_lookup_key(target_field, v)
+                    if lookup_key in exist_targets[key]:
+                        pk_set[lookup_key] = None
+                    else:
+                        does_not_exist.append((key, v))
+                pk_sets[key].append((item, pk_set))
+        # insert the new relations
+        for key, item_pk_sets in pk_sets.items():
+            if len(item_pk_sets) == 0:
+                continue
+            field = fields[key]
+            through = field.remote_field.through
+            source_fk = through._meta.get_field(field.m2m_field_name())
+            target_fk = through._meta.get_field(field.m2m_reverse_field_name())
+            source_values = list(set(getattr(item, source_fk.target_field.attname) for item, _ in item_pk_sets))
+            exist_relations = set()
+            for i in range(0, len(source_values), batch_size):
+                exist_relations.update(through._default_manager.using(using).filter(
+                    **{source_fk.attname + '__in': source_values[i:i + batch_size]}).values_list(
+                    source_fk.attname, target_fk.attname))
+            through_items = []
+            for item, pk_set in item_pk_sets:
+                source_value = getattr(item, source_fk.target_field.attname)
+                for target_value in list(pk_set.keys()):
+                    if (source_value, target_value) in exist_relations:
+                        del pk_set[target_value]
+                    else:
+                        exist_relations.add((source_value, target_value))
+                        through_items.append(through(**{source_fk.attname: source_value,
+                                                        target_fk.attname: target_value}))
+            for item, pk_set in item_pk_sets:
+                m2m_changed.send(sender=through, action='pre_add', instance=item, reverse=False,
+                                 model=field.related_model, pk_set=set(pk_set), using=using)
+            through._default_manager.using(using).bulk_create(through_items, batch_size=batch_size)
+            for item, pk_set in item_pk_sets:
+                m2m_changed.send(sender=through, action='post_add', instance=item, reverse=False,
+                                 model=field.related_model, pk_set=set(pk_set), using=using)
+        return does_not_exist
+
     # when using delete flag, you cannot define "unique_together" in models.
     # "unique_together" should be define in benchmark_settings.py.
     # "unique_together" function (detect for unique constraint) is processed here.
     @classmethod
     def check_unique_together(cls, data, pk=None, using='default'):
-        unique_together = cls.get_unique_together()
-        for field_names in unique_together:
-            unique_data = {}
-            has_unique_together_fields = False
-            for field_name in field_names:
-                if field_name in data.keys():
-                    has_unique_together_fields = True
-                    unique_data[field_name] = data[field_name]
-                else:
-                    unique_together_field = getattr(cls, field_name)
-                    if hasattr(unique_together_field, 'field'):
-                        unique_together_field = unique_together_field.field
-                    unique_data[field_name] = unique_together_field.get_default()
-            if cls.model_has_delete_flag():
-                unique_data[SETTINGS.MODEL_DELETE_FLAG] = 0
-            if has_unique_together_fields:    # check whether has conflicted data by unique constraint in model
+        res = cls.check_unique_together_in_batch([data], pks=None if pk is None else [pk], using=using)[0]
+        return cls.get_response_by_code() if res is None else res
+
+    # Check DICT_MODEL_UNIQUE for the list of the data of a http post request ("pks" is None) or put request ("pks" are
+    # the primary keys of the items) at once. For every constraint, the items (not deleted by delete flag) with the same
+    # values as any of the data are queried by one query (the OR of the ANDs of the values of the data) per
+    # LOOKUP_BATCH_SIZE data, and the data with the same values as the data before it in the list fail too. The values
+    # of the fields in list (batch insert by values of fields in request data in list) are checked by their
+    # combinations. The fields not in the data are checked by their default values for post, and by their values of
+    # the items in database for put (queried in the same way). It returns the list of the error responses of the data,
+    # or None for the valid ones.
+    @classmethod
+    def check_unique_together_in_batch(cls, list_data, pks=None, using='default'):
+        meta = cls.get_model_meta()
+        batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+        responses = [None] * len(list_data)
+        for field_names in meta.unique_together:
+            fields = [meta.fields[field_name] for field_name in field_names]
+            exist_values = {}    # for put, the primary keys to the values of the fields of the items in database
+            if pks is not None:
+                missing_pks = list(set(pks[index] for index, data in enumerate(list_data)
+                                       if any(field_name in data for field_name in field_names) and
+                                       not all(field_name in data for field_name in field_names)))
+                for i in range(0, len(missing_pks), batch_size):
+                    for values in cls.objects.using(using).filter(pk__in=missing_pks[i:i + batch_size]).values_list(
+                            'pk', *field_names):
+                        exist_values[values[0]] = dict(zip(field_names, values[1:]))
+            list_unique_data = []    # (index of the data, the field names to the values)
+            for index, data in enumerate(list_data):
+                if responses[index] is not None or not any(field_name in data for field_name in field_names):
+                    continue
+                unique_data = OrderedDict()
                 list_keys = []
-                query_set = cls.objects.using(using).all()
-                for unique_key, unique_value in unique_data.items():
-                    if type(unique_value) is list:
-                        list_keys.append(unique_key)
-                        q = None
-                        for _unique_value in unique_value:
-                            if q is None:
-                                q = Q(**{unique_key: _unique_value})
-                            else:
-                                q = q | Q(**{unique_key: _unique_value})
-                        query_set = query_set.using(using).filter(q)
+                for field_name, field in zip(field_names, fields):
+                    if field_name in data.keys():
+                        unique_data[field_name] = data[field_name]
+                        if type(data[field_name]) is list:
+                            list_keys.append(field_name)
+                    elif pks is not None and pks[index] in exist_values:
+                        unique_data[field_name] = exist_values[pks[index]][field_name]
                     else:
-                        query_set = query_set.using(using).filter(**{unique_key: unique_value})
-                if pk is not None and len(list_keys) > 0:    # put
-                    return cls.get_response_by_code(10 + SETTINGS.CODE_OFFSET, msg=(list_keys,))
-                if query_set.exists():
-                    if pk is None:    # post
-                        return cls.get_response_by_code(5 + SETTINGS.CODE_OFFSET, data=[cls.model_to_dict(_) for _ in query_set])
-                    else:             # put
-                        for item in query_set:
-                            if pk != item.pk:
-                                return cls.get_response_by_code(5 + SETTINGS.CODE_OFFSET, data=[cls.model_to_dict(_) for _ in query_set])
-        return cls.get_response_by_code()
-
-    @classmethod
-    def post_model(cls, data, user=None, using='default', serializer_is_custom=True, return_with_inserted_data=False):
+                        unique_data[field_name] = field.get_default()
+                if pks is not None and len(list_keys) > 0:    # put
+                    responses[index] = cls.get_response_by_code(10 + SETTINGS.CODE_OFFSET, msg=(list_keys,))
+                    continue
+                list_unique_data.append((index, unique_data))
+            indexes_of_unique_keys = {}    # the values of the fields of the data to the index of the first data
+            for i in range(0, len(list_unique_data), batch_size):
+                chunk = list_unique_data[i:i + batch_size]
+                q = None
+                for _, unique_data in chunk:
+                    and_q = Q(**dict((field_name + '__in' if type(value) is list else field_name, value)
+                                     for field_name, value in unique_data.items()))
+                    q = and_q if q is None else q | and_q
+                query_set = cls.objects.using(using).filter(q)
+                if meta.has_delete_flag:
+                    query_set = query_set.filter(**{SETTINGS.MODEL_DELETE_FLAG: 0})
+                exist_items = {}    # the values of the fields to the items in database
+                for item in query_set:
+                    unique_key = cls.get_unique_key(fields, [getattr(item, field.attname) for field in fields])
+                    exist_items.setdefault(unique_key, []).append(item)
+                for index, unique_data in chunk:
+                    unique_keys = [cls.get_unique_key(fields, values) for values in
+                                   product(*[value if type(value) is list else [value]
+                                             for value in unique_data.values()])]
+                    items = [item for unique_key in unique_keys for item in exist_items.get(unique_key, ())]
+                    if len(items) > 0 and (pks is None or any(pks[index] != item.pk for item in items)):
+                        responses[index] = cls.get_response_by_code(
+                            5 + SETTINGS.CODE_OFFSET, data=[cls.model_to_dict(item) for item in items])
+                        continue
+                    for unique_key in unique_keys:
+                        if unique_key in indexes_of_unique_keys:    # the same values as the data before it
+                            responses[index] = cls.get_response_by_code(
+                                5 + SETTINGS.CODE_OFFSET, data=[list_data[indexes_of_unique_keys[unique_key]]])
+                            break
+                    else:
+                        for unique_key in unique_keys:
+                            indexes_of_unique_keys[unique_key] = index
+        return responses
+
+    # the tuple of the values of the fields converted by the fields (the target fields of the foreign keys), to compare
+    # the values of the data of requests with the ones of the items in database
+    @staticmethod
+    def get_unique_key(fields, values):
+        unique_key = []
+        for field, value in zip(fields, values):
+            if field.many_to_one or field.one_to_one:
+                field = field.target_field
+            try:
+                value = field.to_python(value)
+            except django.core.exceptions.ValidationError:
+                pass
+            unique_key.append(value)
+        return tuple(unique_key)
+
+    # Create the partial unique indexes of DICT_MODEL_UNIQUE on the items which are not deleted by delete flag, for the
+    # models (all the models by default) with delete flag, so that the constraints are also kept by the database when
+    # the items are written concurrently. It is for the databases which support partial indexes (postgresql and sqlite),
+    # the others are skipped. It can be run in a migration by "RunPython". It returns the names of the indexes.
+    @classmethod
+    def create_unique_together_indexes(cls, models=None, using='default'):
+        connection = connections[using]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            return []
+        if models is None:
+            models = apps.get_models()
+        quote_name = connection.ops.quote_name
+        index_names = []
+        with connection.cursor() as cursor:
+            for model in models:
+                meta = cls.get_model_meta(model)
+                if not meta.has_delete_flag:
+                    continue
+                delete_flag_field = model._meta.get_field(SETTINGS.MODEL_DELETE_FLAG)
+                if connection.vendor == 'postgresql' and \
+                        delete_flag_field.get_internal_type() in ('BooleanField', 'NullBooleanField'):
+                    not_deleted = 'false'
+                else:
+                    not_deleted = '0'
+                for field_names in meta.unique_together:
+                    columns = [model._meta.get_field(field_name).column for field_name in field_names]
+                    index_name = '%s_%s_uniq' % (model._meta.db_table, '_'.join(columns))
+                    max_name_length = connection.ops.max_name_length()
+                    if max_name_length is not None and len(index_name) > max_name_length:
+                        index_name = '%s_%s_uniq' % (model._meta.db_table[:max_name_length - 14],
+                                                     hashlib.md5(index_name.encode('utf-8')).hexdigest()[:8])
+                    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS %s ON %s (%s) WHERE %s = %s' % (
+                        quote_name(index_name), quote_name(model._meta.db_table),
+                        ', '.join(quote_name(column) for column in columns), quote_name(delete_flag_field.column),
+                        not_deleted))
+                    index_names.append(index_name)
+        return index_names
+
+    @classmethod
+    def post_model(cls, data, user=None, using='default', serializer_is_custom=True, return_with_inserted_data=False,
+                   bulk_create=None, transaction_mode=None, transaction_chunk_size=None):
+        if bulk_create is None:
+            bulk_create = getattr(SETTINGS, 'BULK_CREATE', False)
+        if transaction_mode is None:
+            transaction_mode = getattr(SETTINGS, 'TRANSACTION_MODE', None)
         if isinstance(data, dict):
             post_data = [data]
             insert_multiple_data = False
@@ -572,36 +1674,47 @@ class BenchmarkModel(object):
         else:
             raise Exception('data should be dict, list or tuple')
         list_many_to_many_relations = []
+        meta = cls.get_model_meta()
         # check and process before insert data to database
         exist_items = [None] * len(post_data)
+        # the items of the primary keys and the related items of the foreign keys are queried in batch
+        pk_is_relation = meta.pk_attname in meta.relation_fields
+        check_pk = SETTINGS.MODEL_DELETE_FLAG is not None or (serializer_is_custom and not pk_is_relation)
+        lookup_exist_items, lookup_related_items = cls.get_post_lookup_items(
+            post_data, check_pk=check_pk, check_foreign_keys=bool(SETTINGS.MODEL_DELETE_FLAG), using=using)
+        pks_in_data = set()
+        unique_together_data = []    # the data to check DICT_MODEL_UNIQUE in batch
         for data, exist_item in zip(post_data, exist_items):
             many_to_many_relations = {}
             del_keys = []
             foreign_key_add = {}
             foreign_key_del = []
-            field_names = cls.get_model_field_names(cls)
-            primary_key_name = cls._meta.pk.attname
             for key, value in data.items():
-                if key in field_names:
-                    is_relationship_field = False
-                    field = getattr(cls, key)
-                    if hasattr(field, 'field'):
-                        is_relationship_field = True
-                        field = getattr(cls, key).field
-                    if not is_relationship_field and field.field_name == primary_key_name \
-                            or is_relationship_field and field.name == primary_key_name:
+                if key in meta.fields and key != 'pk':
+                    field = meta.relation_fields.get(key)
+                    is_relationship_field = field is not None
+                    if key == meta.pk_attname:
+                        lookup_key = cls.get_lookup_key(cls._meta.pk, value)
+                        if lookup_key is not None:
+                            if lookup_key in pks_in_data:    # the primary key is duplicated in the data
+                                res = cls.get_response_by_code(4 + SETTINGS.CODE_OFFSET)
+                                if return_with_inserted_data:
+                                    return res, None
+                                return res
+                            pks_in_data.add(lookup_key)
+                        if check_pk:
+                            if lookup_key is None:
+                                exist_item = cls.objects.using(using).filter(pk=value).first()
+                            else:
+                                exist_item = lookup_exist_items.get(lookup_key)
                         if SETTINGS.MODEL_DELETE_FLAG is None:
-                            if serializer_is_custom:    # whether pk exists may be not has checked by custom serializer
-                                field_name = getattr(field, 'field_name', None)
-                                if field_name == cls._meta.pk.attname:
-                                    exist_item = cls.objects.using(using).filter(pk=value).first()
-                                    if exist_item is not None:
-                                        res = cls.get_response_by_code(4 + SETTINGS.CODE_OFFSET)
-                                        if return_with_inserted_data:
-                                            return res, None
-                                        return res
+                            if check_pk:    # whether pk exists may be not has checked by custom serializer
+                                if exist_item is not None:
+                                    res = cls.get_response_by_code(4 + SETTINGS.CODE_OFFSET)
+                                    if return_with_inserted_data:
+                                        return res, None
+                                    return res
                         else:
-                            exist_item = cls.objects.using(using).filter(pk=value).first()
                             if exist_item is not None:
                                 if getattr(exist_item, SETTINGS.MODEL_DELETE_FLAG):
                                     setattr(exist_item, SETTINGS.MODEL_DELETE_FLAG, 0)
@@ -617,9 +1730,13 @@ class BenchmarkModel(object):
                                     values = value
                                 else:
                                     values = [value]
+                                related_items = lookup_related_items.get(key, {})
                                 for _value in values:
-                                    if field.related_model.objects.using(using).filter(**{field.target_field.name: _value}).exists():
-                                        related_item = field.related_model.objects.using(using).get(**{field.target_field.name: _value})
+                                    related_item = related_items.get(cls.get_lookup_key(field.target_field, _value))
+                                    if related_item is None:    # not queried in batch, or does not exist
+                                        related_item = field.related_model.objects.using(using).filter(
+                                            **{field.target_field.name: _value}).first()
+                                    if related_item is not None:
                                         if hasattr(related_item, SETTINGS.MODEL_DELETE_FLAG):
                                             if getattr(related_item, SETTINGS.MODEL_DELETE_FLAG):
                                                 res = cls.get_response_by_code(8 + SETTINGS.CODE_OFFSET, msg=(key, _value))
@@ -646,13 +1763,23 @@ class BenchmarkModel(object):
                 del data[key]
             for key, value in foreign_key_add.items():
                 data[key] = value
-            if SETTINGS.MODEL_DELETE_FLAG is not None and exist_item is None:
-                res = cls.check_unique_together(data_before_foreign_key_process, using=using)
-                if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
+            max_combinations = getattr(SETTINGS, 'MAX_LIST_VALUES_COMBINATIONS', None)
+            if max_combinations and exist_item is None:
+                combinations = cls.count_list_values(data)
+                if combinations > max_combinations:
+                    res = cls.get_response_by_code(37 + SETTINGS.CODE_OFFSET, msg=(combinations, max_combinations))
                     if return_with_inserted_data:
                         return res, None
                     return res
+            if SETTINGS.MODEL_DELETE_FLAG is not None and exist_item is None:
+                unique_together_data.append(data_before_foreign_key_process)
             list_many_to_many_relations.append(many_to_many_relations)
+        if len(meta.unique_together) > 0 and len(unique_together_data) > 0:
+            for res in cls.check_unique_together_in_batch(unique_together_data, using=using):
+                if res is not None:
+                    if return_with_inserted_data:
+                        return res, None
+                    return res
         # insert data to database
         total_count = len(post_data)
         created_count = 0
@@ -661,71 +1788,83 @@ class BenchmarkModel(object):
         msgs = []
         foreign_key_does_not_exist_msg = ''
         inserted_data = []
-        for data, many_to_many_relations, exist_item in zip(post_data, list_many_to_many_relations, exist_items):
-            if exist_item is None:
-                list_data = []    # to support batch insert by values of fields in request data in list
-                for key, _value in data.items():
-                    if isinstance(_value, list):
-                        values = _value
-                    else:
-                        values = [_value]
-                    if len(list_data) == 0:
-                        for v in values:
-                            list_data.append({key: v})
-                    else:
-                        last_loop_list_data = copy.deepcopy(list_data)
-                        first_loop = True
-                        for v in values:
-                            if first_loop:
-                                for d in list_data:
-                                    d[key] = v
-                                first_loop = False
-                            else:
-                                for d in last_loop_list_data:
-                                    _d = copy.deepcopy(d)
-                                    _d[key] = v
-                                    list_data.append(_d)
-                if len(list_data) == 0:
-                    res = cls.get_response_by_code(13 + SETTINGS.CODE_OFFSET)
-                    if not insert_multiple_data:
-                        if return_with_inserted_data:
-                            if not insert_multiple_data:
-                                inserted_data = inserted_data[0] if len(inserted_data) == 1 else None
-                            return res, inserted_data
-                        return res
-                    failed_items.append(data)
-                    if res[SETTINGS.MSG] not in msgs:
-                        msgs.append(res[SETTINGS.MSG])
-                creator = None
-                modifier = None
-                if user is not None and user != '':
-                    if SETTINGS.MODEL_CREATOR is not None and hasattr(cls, SETTINGS.MODEL_CREATOR):
-                        if isinstance(getattr(cls, SETTINGS.MODEL_CREATOR),
-                                      django.db.models.fields.related_descriptors.ForwardManyToOneDescriptor):
-                            creator = get_user_model().objects.get(username=user)
-                        else:
-                            creator = user
-                    if SETTINGS.MODEL_MODIFIER is not None and hasattr(cls, SETTINGS.MODEL_MODIFIER):
-                        if isinstance(getattr(cls, SETTINGS.MODEL_MODIFIER),
-                                      django.db.models.fields.related_descriptors.ForwardManyToOneDescriptor):
-                            modifier = get_user_model().objects.get(username=user)
-                        else:
-                            modifier = user
-                try:
-                    for pd in list_data:
-                        exist_item = cls(**pd)
-                        if creator is not None:
-                            setattr(exist_item, SETTINGS.MODEL_CREATOR, creator)
-                        if modifier is not None:
-                            setattr(exist_item, SETTINGS.MODEL_MODIFIER, modifier)
-                        exist_item.save(using=using)
+        batch = BatchTransaction(transaction_mode, using, transaction_chunk_size)
+        with batch:
+            bulk_created_items = {}
+            many_to_many_writes = []    # the many to many relations of the inserted items, which are added in batch
+            if bulk_create and insert_multiple_data:
+                bulk_created_items = cls.bulk_create_items(post_data, user=user, using=using, batch=batch)
+            for i, (data, many_to_many_relations, exist_item) in enumerate(
+                    zip(post_data, list_many_to_many_relations, exist_items)):
+                if batch.is_chunk_full():    # commit the items before in the mode "chunk"
+                    cls.add_many_to_many_relations(many_to_many_writes, using=using)
+                    many_to_many_writes = []
+                    batch.commit()
+                if i in bulk_created_items:    # the rows are added to the transaction by bulk_create_items
+                    for exist_item in bulk_created_items[i]:
                         if return_with_inserted_data:
                             inserted_data.append(exist_item)
                         created_count += 1
-                        created_items.append(cls.model_to_dict_process_many_to_many_and_json(exist_item))
-                except django.db.utils.IntegrityError as e:
-                    if hasattr(e, 'args'):
-                        if e.args[0] == 1048 or e.args[0].startswith('NOT NULL constraint failed: '):    # field cannot be None (很可能还有其他类型的错误, 待增加)
+                        created_items.append(cls.inserted_model_to_dict(exist_item))
+                    if len(many_to_many_relations) > 0:
+                        many_to_many_writes.append((exist_item, many_to_many_relations))
+                    continue
+                batch.add_row()
+                if exist_item is None:
+                    # to support batch insert by values of fields in request data in list
+                    if cls.count_list_values(data) == 0:
+                        res = cls.get_response_by_code(13 + SETTINGS.CODE_OFFSET)
+                        if not insert_multiple_data:
+                            if return_with_inserted_data:
+                                if not insert_multiple_data:
+                                    inserted_data = inserted_data[0] if len(inserted_data) == 1 else None
+                                return res, inserted_data
+                            return res
+                        failed_items.append(data)
+                        if res[SETTINGS.MSG] not in msgs:
+                            msgs.append(res[SETTINGS.MSG])
+                    creator, modifier = cls.get_creator_and_modifier(user)
+                    # the primary key is looked up before and does not exist, so the item is inserted by "INSERT"
+                    # without trying "UPDATE" first
+                    force_insert = check_pk and 'pk' not in data and type(data.get(meta.pk_attname)) is not list
+                    try:
+                        for pd in cls.expand_list_values(data):
+                            exist_item = cls(**pd)
+                            if creator is not None:
+                                setattr(exist_item, SETTINGS.MODEL_CREATOR, creator)
+                            if modifier is not None:
+                                setattr(exist_item, SETTINGS.MODEL_MODIFIER, modifier)
+                            with batch.savepoint():
+                                exist_item.save(using=using, force_insert=force_insert)
+                            if return_with_inserted_data:
+                                inserted_data.append(exist_item)
+                            created_count += 1
+                            created_items.append(cls.inserted_model_to_dict(exist_item))
+                    except django.db.utils.IntegrityError as e:
+                        if hasattr(e, 'args'):
+                            # field cannot be None (很可能还有其他类型的错误, 待增加)
+                            if e.args[0] == 1048 or e.args[0].startswith('NOT NULL constraint failed: '):
+                                res = cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e))
+                                if not insert_multiple_data:
+                                    if return_with_inserted_data:
+                                        if not insert_multiple_data:
+                                            inserted_data = inserted_data[0] if len(inserted_data) == 1 else None
+                                        return res, inserted_data
+                                    return res
+                                failed_items.append(data)
+                                if res[SETTINGS.MSG] not in msgs:
+                                    msgs.append(res[SETTINGS.MSG])
+                                continue    # the item is not inserted
+                        data_ = {}
+                        for key, value in data.items():
+                            if isinstance(value, list):
+                                data_[key + '__in'] = value
+                            else:
+                                data_[key] = value
+                        exist_item = cls.objects.using(using).get(**data_)
+                        # duplicate entry for unique
+                        if SETTINGS.MODEL_DELETE_FLAG is not None and \
+                                not getattr(exist_item, SETTINGS.MODEL_DELETE_FLAG):
                             res = cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e))
                             if not insert_multiple_data:
                                 if return_with_inserted_data:
@@ -736,14 +1875,33 @@ class BenchmarkModel(object):
                             failed_items.append(data)
                             if res[SETTINGS.MSG] not in msgs:
                                 msgs.append(res[SETTINGS.MSG])
-                    data_ = {}
-                    for key, value in data.items():
-                        if isinstance(value, list):
-                            data_[key + '__in'] = value
-                        else:
-                            data_[key] = value
-                    exist_item = cls.objects.using(using).get(**data_)
-                    if SETTINGS.MODEL_DELETE_FLAG is not None and not getattr(exist_item, SETTINGS.MODEL_DELETE_FLAG):    # duplicate entry for unique
+                        if SETTINGS.MODEL_DELETE_FLAG is not None and hasattr(exist_item, SETTINGS.MODEL_DELETE_FLAG):
+                            setattr(exist_item, SETTINGS.MODEL_DELETE_FLAG, 1)
+                        if user is not None and SETTINGS.MODEL_MODIFIER is not None and \
+                                hasattr(exist_item, SETTINGS.MODEL_MODIFIER):
+                            setattr(exist_item, SETTINGS.MODEL_MODIFIER, user)
+                        exist_item.save(using=using)
+                        if return_with_inserted_data:
+                            inserted_data.append(exist_item)
+                        created_count += 1
+                        created_items.append(cls.model_to_dict_process_many_to_many_and_json(exist_item))
+                    if len(many_to_many_relations) > 0 and exist_item is not None:
+                        many_to_many_writes.append((exist_item, many_to_many_relations))
+                else:
+                    try:
+                        for key, value in data.items():
+                            setattr(exist_item, key, value)
+                        if user is not None and SETTINGS.MODEL_MODIFIER is not None and \
+                                hasattr(exist_item, SETTINGS.MODEL_MODIFIER):
+                            setattr(exist_item, SETTINGS.MODEL_MODIFIER, user)
+                        with batch.savepoint():
+                            exist_item.save(using=using)
+                        if return_with_inserted_data:
+                            inserted_data.append(exist_item)
+                        created_count += 1
+                        created_items.append(cls.model_to_dict_process_many_to_many_and_json(exist_item))
+                    except Exception as e:
+                        print(traceback.format_exc())
                         res = cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e))
                         if not insert_multiple_data:
                             if return_with_inserted_data:
@@ -754,67 +1912,45 @@ class BenchmarkModel(object):
                         failed_items.append(data)
                         if res[SETTINGS.MSG] not in msgs:
                             msgs.append(res[SETTINGS.MSG])
-                    if SETTINGS.MODEL_DELETE_FLAG is not None and hasattr(exist_item, SETTINGS.MODEL_DELETE_FLAG):
-                        setattr(exist_item, SETTINGS.MODEL_DELETE_FLAG, 1)
-                    if user is not None and SETTINGS.MODEL_MODIFIER is not None and hasattr(exist_item, SETTINGS.MODEL_MODIFIER):
-                        setattr(exist_item, SETTINGS.MODEL_MODIFIER, user)
-                    exist_item.save(using=using)
-                    if return_with_inserted_data:
-                        inserted_data.append(exist_item)
-                    created_count += 1
-                    created_items.append(cls.model_to_dict_process_many_to_many_and_json(exist_item))
-                for key, value in many_to_many_relations.items():
-                    if isinstance(value, list):
-                        values = value
-                    else:
-                        values = [value]
-                    for v in values:
-                        try:
-                            getattr(exist_item, key).add(v)
-                        except django.db.utils.IntegrityError:
-                            foreign_key_does_not_exist_msg += '    ' + key + '=' + str(v) + ' does not exist'
-            else:
-                try:
-                    for key, value in data.items():
-                        setattr(exist_item, key, value)
-                    if user is not None and SETTINGS.MODEL_MODIFIER is not None and hasattr(exist_item, SETTINGS.MODEL_MODIFIER):
-                        setattr(exist_item, SETTINGS.MODEL_MODIFIER, user)
-                    exist_item.save(using=using)
+                if not insert_multiple_data:
+                    for key, v in cls.add_many_to_many_relations(many_to_many_writes, using=using):
+                        foreign_key_does_not_exist_msg += '    ' + key + '=' + str(v) + ' does not exist'
+                    res = cls.get_response_by_code(SETTINGS.SUCCESS_CODE, msg_append=foreign_key_does_not_exist_msg,
+                                                   data=cls.model_to_dict_process_many_to_many_and_json(exist_item))
                     if return_with_inserted_data:
-                        inserted_data.append(exist_item)
-                    created_count += 1
-                    created_items.append(cls.model_to_dict_process_many_to_many_and_json(exist_item))
-                except Exception as e:
-                    print(traceback.format_exc())
-                    res = cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e))
-                    if not insert_multiple_data:
-                        if return_with_inserted_data:
-                            if not insert_multiple_data:
-                                inserted_data = inserted_data[0] if len(inserted_data) == 1 else None
-                            return res, inserted_data
-                        return res
-                    failed_items.append(data)
-                    if res[SETTINGS.MSG] not in msgs:
-                        msgs.append(res[SETTINGS.MSG])
-            if not insert_multiple_data:
-                res = cls.get_response_by_code(SETTINGS.SUCCESS_CODE, msg_append=foreign_key_does_not_exist_msg,
-                                               data=cls.model_to_dict_process_many_to_many_and_json(exist_item))
-                if return_with_inserted_data:
-                    if not insert_multiple_data:
-                        inserted_data = inserted_data[0] if len(inserted_data) == 1 else None
-                    return res, inserted_data
-                return res
+                        if not insert_multiple_data:
+                            inserted_data = inserted_data[0] if len(inserted_data) == 1 else None
+                        return res, inserted_data
+                    return res
+            cls.add_many_to_many_relations(many_to_many_writes, using=using)
         data = {SETTINGS.TOTAL_COUNT: total_count, SETTINGS.CREATED_COUNT: created_count,
                 SETTINGS.FAILED_ITEMS: failed_items, SETTINGS.CREATED_ITEMS: created_items}
+        if batch.mode is not None:
+            data[SETTINGS.COMMIT_COUNT] = batch.commit_count
         if return_with_inserted_data:
             if not insert_multiple_data:
                 inserted_data = inserted_data[0] if len(inserted_data) == 1 else None
             return cls.get_response_by_code(data=data), inserted_data
         return cls.get_response_by_code(data=data)
 
+    # Update the item of the primary key in the data of a http put request. Only the fields whose values are changed are
+    # written (with the fields with "auto_now" and MODEL_MODIFIER), and nothing is written if no value is changed.
+    # "if_match" is the header "If-Match" of the request, which is the MODEL_MODIFY_TIME of the item read by the client
+    # before. The item is not updated if it has been modified since then. If "conditional_update" is True, the item is
+    # updated by one "UPDATE ... WHERE pk = ... AND MODEL_MODIFY_TIME = ..." without reading it first (see
+    # put_model_conditionally). If "response_data" is False, DATA of the response is only the primary key and
+    # MODEL_MODIFY_TIME of the item instead of the whole item.
     @classmethod
-    def put_model(cls, data, user=None, using='default'):
-        primary_key_name = cls._meta.pk.attname
+    def put_model(cls, data, user=None, using='default', transaction_mode=None, if_match=None, conditional_update=None,
+                  response_data=None):
+        if transaction_mode is None:
+            transaction_mode = getattr(SETTINGS, 'TRANSACTION_MODE', None)
+        if conditional_update is None:
+            conditional_update = getattr(SETTINGS, 'PUT_CONDITIONAL_UPDATE', False)
+        if response_data is None:
+            response_data = getattr(SETTINGS, 'PUT_RESPONSE_DATA', True)
+        meta = cls.get_model_meta()
+        primary_key_name = meta.pk_attname
         if primary_key_name in data.keys():
             if SETTINGS.MODEL_PRIMARY_KEY in data.keys():
                 data.pop(primary_key_name)
@@ -826,18 +1962,19 @@ class BenchmarkModel(object):
         del_keys = []
         foreign_key_add = {}
         foreign_key_del = []
-        field_names = cls.get_model_field_names(cls)
+        many_to_many_names = []
         for key in data.keys():
-            if key in field_names:
-                field = getattr(cls, key)
-                if hasattr(field, 'field'):
-                    field = field.field
-                else:
+            if key in meta.fields and key != 'pk' and \
+                    isinstance(meta.fields[key], django.db.models.Field):    # not the reverse relations
+                field = meta.relation_fields.get(key)
+                if field is None:
                     continue
                 if field.many_to_one or field.one_to_one:
                     foreign_key = field.attname
                     foreign_key_add[foreign_key] = data[key]
                     foreign_key_del.append(key)
+                elif field.many_to_many:
+                    many_to_many_names.append(key)
             else:
                 del_keys.append(key)
         for key in del_keys:
@@ -847,33 +1984,419 @@ class BenchmarkModel(object):
             del data[key]
         for key, value in foreign_key_add.items():
             data[key] = value
+        modify_time = None
+        if if_match is not None and meta.has_modify_time:
+            modify_time = cls.get_if_match_modify_time(if_match)
+            if modify_time is None:
+                return cls.get_response_by_code(40 + SETTINGS.CODE_OFFSET, msg=(if_match,))
+        with BatchTransaction(transaction_mode, using) as batch:
+            if conditional_update and modify_time is not None and len(many_to_many_names) == 0 and \
+                    not (SETTINGS.MODEL_DELETE_FLAG is not None and len(meta.unique_together) > 0):
+                return cls.put_model_conditionally(pk, data, modify_time, user=user, using=using, batch=batch,
+                                                   response_data=response_data, if_match=if_match)
+            try:
+                m = cls.objects.using(using).get(pk=pk)
+            except:
+                return cls.get_response_by_code(6 + SETTINGS.CODE_OFFSET)
+            # when using delete flag, you cannot define "unique_together" in models.
+            # "unique_together" should be define in config.py.
+            # "unique_together" function (detect for unique constraint) is processed here.
+            if SETTINGS.MODEL_DELETE_FLAG is not None:
+                res = cls.check_unique_together(data_before_foreign_key_process, pk=m.pk, using=using)
+                if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
+                    return res
+            if SETTINGS.MODEL_DELETE_FLAG is not None:
+                if getattr(m, SETTINGS.MODEL_DELETE_FLAG, None):
+                    return cls.get_response_by_code(7 + SETTINGS.CODE_OFFSET)
+            if modify_time is not None and getattr(m, SETTINGS.MODEL_MODIFY_TIME) != modify_time:
+                return cls.get_response_by_code(39 + SETTINGS.CODE_OFFSET, msg=(if_match,))
+            update_fields = []    # the names of the changed fields
+            for key, value in data.items():
+                if key in many_to_many_names:    # the many to many relations are set immediately
+                    setattr(m, key, value)
+                    update_fields.append(key)
+                elif cls.is_value_changed(m, key, value):
+                    setattr(m, key, value)
+                    update_fields.append(key)
+            if len(update_fields) > 0:
+                update_fields = [key for key in update_fields if key not in many_to_many_names]
+                update_fields.extend(field.name for field in cls._meta.concrete_fields
+                                     if getattr(field, 'auto_now', False))
+                if user is not None and meta.has_modifier:
+                    setattr(m, SETTINGS.MODEL_MODIFIER, user)
+                    update_fields.append(SETTINGS.MODEL_MODIFIER)
+                batch.add_row()
+                try:
+                    with batch.savepoint():
+                        m.save(using=using, update_fields=update_fields)
+                except Exception as e:
+                    logger.exception('update failed: %s (pk = %s)', cls.__name__, pk)
+                    return cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e))
+            if not response_data:
+                return cls.get_response_by_code(data=cls.get_put_response_data(m.pk, m))
+            return cls.get_response_by_code(data=cls.model_to_dict_process_many_to_many_and_json(m))
+
+    # Update the item of the primary key by one "UPDATE ... WHERE pk = ... AND MODEL_MODIFY_TIME = ..." without reading
+    # it first, after its foreign keys are checked by check_put_foreign_keys. Only when no item is updated, the item is
+    # read to tell whether it doesn't exist, is deleted, or has been modified since "if_match" (the header "If-Match").
+    @classmethod
+    def put_model_conditionally(cls, pk, data, modify_time, user=None, using='default', batch=None,
+                                response_data=True, if_match=None):
+        meta = cls.get_model_meta()
+        res = cls.check_put_foreign_keys([data], using=using)[0]
+        if res is not None:
+            return res
+        fields = dict(data)
+        fields.update(cls.get_put_auto_fields(user))
+        query_set = cls.objects.using(using).filter(pk=pk, **{SETTINGS.MODEL_MODIFY_TIME: modify_time})
+        if meta.has_delete_flag:
+            query_set = query_set.filter(**{SETTINGS.MODEL_DELETE_FLAG: 0})
+        batch.add_row()
         try:
-            m = cls.objects.using(using).get(pk=pk)
-        except:
-            return cls.get_response_by_code(6 + SETTINGS.CODE_OFFSET)
-        # when using delete flag, you cannot define "unique_together" in models.
-        # "unique_together" should be define in config.py.
-        # "unique_together" function (detect for unique constraint) is processed here.
-        if SETTINGS.MODEL_DELETE_FLAG is not None:
-            update_data = cls.model_to_dict(m)
-            update_data.update(data)
-            res = cls.check_unique_together(data_before_foreign_key_process, pk=m.pk, using=using)
-            if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
-                return res
-        if SETTINGS.MODEL_DELETE_FLAG is not None:
-            if getattr(m, SETTINGS.MODEL_DELETE_FLAG, None):
-                return cls.get_response_by_code(7 + SETTINGS.CODE_OFFSET)
-        for key, value in data.items():
-            setattr(m, key, value)
-        if user is not None and SETTINGS.MODEL_MODIFIER is not None and hasattr(m, SETTINGS.MODEL_MODIFIER):
-            setattr(m, SETTINGS.MODEL_MODIFIER, user)
-        try:
-            m.save(using=using)
+            with batch.savepoint():
+                updated_count = query_set.update(**fields)
         except Exception as e:
-            print(traceback.format_exc())
+            logger.exception('update failed: %s (pk = %s)', cls.__name__, pk)
             return cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e))
-        return cls.get_response_by_code(data=cls.model_to_dict_process_many_to_many_and_json(m))
+        if updated_count == 0:
+            values = cls.objects.using(using).filter(pk=pk).values_list(
+                SETTINGS.MODEL_DELETE_FLAG if meta.has_delete_flag else 'pk', flat=True).first()
+            if values is None:
+                return cls.get_response_by_code(6 + SETTINGS.CODE_OFFSET)
+            if meta.has_delete_flag and values:
+                return cls.get_response_by_code(7 + SETTINGS.CODE_OFFSET)
+            return cls.get_response_by_code(39 + SETTINGS.CODE_OFFSET, msg=(if_match,))
+        clear_count_caches()    # "update" doesn't send the post_save signals
+        if not response_data:
+            return cls.get_response_by_code(data=cls.get_put_response_data(pk, modify_time=fields.get(
+                SETTINGS.MODEL_MODIFY_TIME)))
+        return cls.get_response_by_code(data=cls.model_to_dict_process_many_to_many_and_json(
+            cls.objects.using(using).get(pk=pk)))
+
+    # DATA of the response of http put requests when PUT_RESPONSE_DATA is False: the primary key and MODEL_MODIFY_TIME
+    # (for the header "If-Match" of the next http put request) of the item.
+    @classmethod
+    def get_put_response_data(cls, pk, instance=None, modify_time=None):
+        meta = cls.get_model_meta()
+        data = {meta.pk_attname: cls._meta.pk.to_python(pk)}
+        if meta.has_modify_time:
+            if instance is not None:
+                modify_time = getattr(instance, SETTINGS.MODEL_MODIFY_TIME)
+            data[SETTINGS.MODEL_MODIFY_TIME] = str(modify_time)    # the same as model_to_dict
+        return data
+
+    # MODEL_MODIFY_TIME in the header "If-Match" of a http put request, the quotes of the entity tag are omitted. It
+    # returns None if the header is not a valid time.
+    @classmethod
+    def get_if_match_modify_time(cls, if_match):
+        value = if_match.strip()
+        if value.startswith('W/'):
+            value = value[2:]
+        value = value.strip('"')
+        try:
+            modify_time = cls._meta.get_field(SETTINGS.MODEL_MODIFY_TIME).to_python(value)
+        except django.core.exceptions.ValidationError:
+            return None
+        if modify_time is not None and django.conf.settings.USE_TZ and timezone.is_naive(modify_time):
+            modify_time = timezone.make_aware(modify_time)
+        return modify_time
+
+    # whether the value of the field (the name or attname) of the item is changed, the value is converted by the field
+    # before compared
+    @classmethod
+    def is_value_changed(cls, instance, key, value):
+        try:
+            field = cls._meta.get_field(key)
+        except django.core.exceptions.FieldDoesNotExist:
+            return True
+        if field.many_to_one or field.one_to_one:
+            old_value = getattr(instance, field.attname)
+            field = field.target_field
+        else:
+            old_value = getattr(instance, key)
+        try:
+            value = field.to_python(value)
+        except django.core.exceptions.ValidationError:
+            return True
+        return type(old_value) is not type(value) or old_value != value
+
+    # The fields of the data of a http put request to update, the keys which are not the fields of the model are
+    # omitted, and the foreign keys are renamed to their attnames. It returns the fields, the data before the foreign
+    # keys are renamed (for check_unique_together), and the names of the many to many fields in the data.
+    @classmethod
+    def get_put_fields(cls, data):
+        meta = cls.get_model_meta()
+        fields = OrderedDict()
+        many_to_many_names = []
+        for key, value in data.items():
+            if key in meta.fields and key != 'pk' and key != meta.pk_attname and \
+                    isinstance(meta.fields[key], django.db.models.Field):    # not the reverse relations
+                field = meta.relation_fields.get(key)
+                if field is not None and field.many_to_many:
+                    many_to_many_names.append(key)
+                elif field is not None and (field.many_to_one or field.one_to_one):
+                    fields[field.attname] = value
+                else:
+                    fields[key] = value
+        data_before_foreign_key_process = dict((key, value) for key, value in data.items()
+                                               if key in fields or key in meta.relation_fields)
+        return fields, data_before_foreign_key_process, many_to_many_names
+
+    # The values of the fields which are updated by every update statement of put_models: the fields with "auto_now"
+    # (which are set by "save" otherwise) and MODEL_MODIFIER.
+    @classmethod
+    def get_put_auto_fields(cls, user=None):
+        auto_fields = cls.get_auto_now_values()
+        if user is not None and cls.get_model_meta().has_modifier:
+            auto_fields[SETTINGS.MODEL_MODIFIER] = cls.get_creator_and_modifier(user)[1]
+        return auto_fields
+
+    # the dict of the attnames of the fields with "auto_now" of the model (cls by default) to their values now
+    @classmethod
+    def get_auto_now_values(cls, model=None):
+        if model is None:
+            model = cls
+        values = OrderedDict()
+        instance = model()
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                values[field.attname] = field.pre_save(instance, False)
+        return values
+
+    # Update the items of a http put request in batch. "data" is a list of the dicts of the items with their primary
+    # keys (MODEL_PRIMARY_KEY or the attname of the primary key), or a dict of the fields to update for the primary keys
+    # in the list of its MODEL_PRIMARY_KEY, or a dict of the fields to update for the items filtered by "params" (the
+    # same as the params of http get requests, the items deleted by delete flag are not updated, and DICT_MODEL_UNIQUE
+    # fields can be updated only if one item is filtered). The items are checked by one query, and the foreign keys by
+    # get_post_lookup_items. Then the items with the same fields to update are updated by one "UPDATE" statement per
+    # LOOKUP_BATCH_SIZE items, whose different values are set by "Case" and "When". The "save" method of the models is
+    # not called, and the post_save signals are not sent. The items with many to many fields are updated one by one by
+    # put_model. The response is like batch delete, the failed items are in FAILED_ITEMS and their reasons are in the
+    # message.
+    @classmethod
+    def put_models(cls, data, user=None, using='default', params=None, transaction_mode=None,
+                   transaction_chunk_size=None):
+        if transaction_mode is None:
+            transaction_mode = getattr(SETTINGS, 'TRANSACTION_MODE', None)
+        meta = cls.get_model_meta()
+        batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+        if params is not None:    # update the items filtered by the params
+            res = cls.check_params(params)
+            if res is not None:
+                return res
+            query_set = cls.filter_model(params, using=using)
+            if isinstance(query_set, dict):
+                return query_set
+            fields, data_before_foreign_key_process, many_to_many_names = cls.get_put_fields(data)
+            if len(many_to_many_names) > 0:
+                return cls.get_response_by_code(10 + SETTINGS.CODE_OFFSET, msg=(many_to_many_names,))
+            res = cls.check_put_foreign_keys([fields], using=using)[0]
+            if res is not None:
+                return res
+            fields.update(cls.get_put_auto_fields(user))
+            unique_field_names = [field_name for field_name in data_before_foreign_key_process
+                                  if any(field_name in field_names for field_names in meta.unique_together)] \
+                if SETTINGS.MODEL_DELETE_FLAG is not None else []
+            with BatchTransaction(transaction_mode, using, transaction_chunk_size) as batch:
+                # the items are locked from reading their primary keys to updating them, and only the items of the
+                # primary keys are updated, so UPDATED_PKS are the updated items even without TRANSACTION_MODE
+                with transaction.atomic(using=using):
+                    pks = list(query_set.select_for_update().values_list('pk', flat=True))
+                    if len(unique_field_names) > 0 and len(pks) > 1:
+                        return cls.get_response_by_code(41 + SETTINGS.CODE_OFFSET, msg=(unique_field_names, len(pks)))
+                    if len(unique_field_names) > 0 and len(pks) == 1:
+                        res = cls.check_unique_together_in_batch([data_before_foreign_key_process], pks=pks,
+                                                                 using=using)[0]
+                        if res is not None:
+                            return res
+                    batch.add_row(len(pks))
+                    updated_count = 0 if len(fields) > 0 else len(pks)
+                    try:
+                        with batch.savepoint():
+                            for i in range(0, len(pks) if len(fields) > 0 else 0, batch_size):
+                                updated_count += cls.objects.using(using).filter(
+                                    pk__in=pks[i:i + batch_size]).update(**fields)
+                    except django.db.utils.DatabaseError as e:
+                        return cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e))
+            clear_count_caches()
+            data = {SETTINGS.TOTAL_COUNT: len(pks), SETTINGS.UPDATED_COUNT: updated_count, SETTINGS.FAILED_ITEMS: [],
+                    SETTINGS.UPDATED_PKS: pks}
+            if batch.mode is not None:
+                data[SETTINGS.COMMIT_COUNT] = batch.commit_count
+            return cls.get_response_by_code(data=data)
+        if isinstance(data, dict):    # update the same fields of the items of the primary keys
+            pks = data.get(SETTINGS.MODEL_PRIMARY_KEY)
+            if not isinstance(pks, (list, tuple)):
+                return cls.get_response_by_code(2 + SETTINGS.CODE_OFFSET)
+            items = [(pk, data) for pk in pks]
+        else:
+            items = []
+            for item in data:
+                item = dict(item)
+                if SETTINGS.MODEL_PRIMARY_KEY in item:
+                    pk = item.pop(SETTINGS.MODEL_PRIMARY_KEY)
+                    item.pop(meta.pk_attname, None)
+                elif meta.pk_attname in item:
+                    pk = item.pop(meta.pk_attname)
+                else:
+                    return cls.get_response_by_code(2 + SETTINGS.CODE_OFFSET)
+                items.append((pk, item))
+        # the items of the same primary key are merged, the values of the latter items win
+        merged_items = OrderedDict()
+        for pk, item in items:
+            lookup_key = cls.get_lookup_key(cls._meta.pk, pk)
+            if lookup_key is not None and lookup_key in merged_items:
+                merged_items[lookup_key][1].update(item)
+            else:
+                merged_items[lookup_key if lookup_key is not None else len(merged_items)] = (pk, dict(item))
+        items = list(merged_items.values())
+        total_count = len(items)
+        failed_items = []
+        msgs = []
+        updated_pks = []
+
+        def fail(pk, item, res):
+            failed_items.append(dict(item, **{SETTINGS.MODEL_PRIMARY_KEY: pk}))
+            if res[SETTINGS.MSG] not in msgs:
+                msgs.append(res[SETTINGS.MSG])
+
+        # check the items of the primary keys (whether they exist and are deleted by delete flag) by one query per
+        # LOOKUP_BATCH_SIZE primary keys
+        lookup_keys = [cls.get_lookup_key(cls._meta.pk, pk) for pk, _ in items]
+        exist_pks = cls.get_delete_flags([key for key in lookup_keys if key is not None], using=using)
+
+        # update the items of the chunk by one "UPDATE" statement, the values of the fields which are not the same for
+        # all the items are set by "Case" and "When"
+        def update(chunk, names, auto_fields, batch):
+            update_fields = OrderedDict()
+            for name in names:
+                values = [fields[name] for _, _, _, fields in chunk]
+                if all(value == values[0] and type(value) is type(values[0]) for value in values):
+                    update_fields[name] = values[0]
+                else:
+                    field = cls._meta.get_field(name)
+                    update_fields[name] = Case(*[When(pk=lookup_key, then=Value(fields[name], output_field=field))
+                                                for _, lookup_key, _, fields in chunk], output_field=field)
+            update_fields.update(auto_fields)
+            if len(update_fields) > 0:
+                with batch.savepoint():
+                    cls.objects.using(using).filter(
+                        pk__in=[lookup_key for _, lookup_key, _, _ in chunk]).update(**update_fields)
+
+        list_put_fields = [cls.get_put_fields(item) for _, item in items]
+        foreign_key_responses = cls.check_put_foreign_keys([put_fields[0] for put_fields in list_put_fields],
+                                                           using=using)
+        unique_together_responses = [None] * len(items)
+        if SETTINGS.MODEL_DELETE_FLAG is not None and len(meta.unique_together) > 0:
+            indexes = [index for index, lookup_key in enumerate(lookup_keys) if lookup_key in exist_pks]
+            for index, res in zip(indexes, cls.check_unique_together_in_batch(
+                    [list_put_fields[index][1] for index in indexes], pks=[lookup_keys[index] for index in indexes],
+                    using=using)):
+                unique_together_responses[index] = res
+        updates = OrderedDict()    # the names of the fields to the list of (primary key, lookup key, item, fields)
+        with BatchTransaction(transaction_mode, using, transaction_chunk_size) as batch:
+            for (pk, item), lookup_key, put_fields, res, res_unique in zip(
+                    items, lookup_keys, list_put_fields, foreign_key_responses, unique_together_responses):
+                fields, data_before_foreign_key_process, many_to_many_names = put_fields
+                if lookup_key not in exist_pks:
+                    fail(pk, item, cls.get_response_by_code(6 + SETTINGS.CODE_OFFSET))
+                    continue
+                if SETTINGS.MODEL_DELETE_FLAG is not None:
+                    if res_unique is not None:
+                        fail(pk, item, res_unique)
+                        continue
+                    if exist_pks[lookup_key]:
+                        fail(pk, item, cls.get_response_by_code(7 + SETTINGS.CODE_OFFSET))
+                        continue
+                if res is not None:
+                    fail(pk, item, res)
+                    continue
+                list_keys = [key for key, value in fields.items() if isinstance(value, list)]
+                if len(list_keys) > 0:
+                    fail(pk, item, cls.get_response_by_code(10 + SETTINGS.CODE_OFFSET, msg=(list_keys,)))
+                    continue
+                if len(many_to_many_names) > 0:    # the many to many relations cannot be updated by "UPDATE"
+                    res = cls.put_model(dict(item, **{SETTINGS.MODEL_PRIMARY_KEY: pk}), user=user, using=using,
+                                        transaction_mode=transaction_mode)
+                    if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
+                        fail(pk, item, res)
+                    else:
+                        updated_pks.append(pk)
+                    continue
+                updates.setdefault(tuple(fields.keys()), []).append((pk, lookup_key, item, fields))
+            auto_fields = cls.get_put_auto_fields(user)
+            for names, group in updates.items():
+                for i in range(0, len(group), batch_size):
+                    chunk = group[i:i + batch_size]
+                    if batch.is_chunk_full():    # commit the items before in the mode "chunk"
+                        batch.commit()
+                    batch.add_row(len(chunk))
+                    try:
+                        update(chunk, names, auto_fields, batch)
+                    except django.db.utils.DatabaseError as e:
+                        if len(chunk) == 1:
+                            fail(chunk[0][0], chunk[0][2], cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e)))
+                            continue
+                        for one in chunk:    # find the failed items by updating them one by one
+                            try:
+                                update([one], names, auto_fields, batch)
+                            except django.db.utils.DatabaseError as e:
+                                fail(one[0], one[2], cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e)))
+                            else:
+                                updated_pks.append(one[0])
+                        continue
+                    updated_pks.extend(pk for pk, _, _, _ in chunk)
+        if len(updated_pks) > 0:
+            clear_count_caches()    # "update" doesn't send the post_save signals
+        data = {SETTINGS.TOTAL_COUNT: total_count, SETTINGS.UPDATED_COUNT: len(updated_pks),
+                SETTINGS.FAILED_ITEMS: failed_items, SETTINGS.UPDATED_PKS: updated_pks}
+        if batch.mode is not None:
+            data[SETTINGS.COMMIT_COUNT] = batch.commit_count
+        if len(msgs) > 0:
+            return cls.get_response_by_code(38 + SETTINGS.CODE_OFFSET, data=data, msg_append=str(msgs))
+        return cls.get_response_by_code(data=data)
+
+    # Check the foreign keys of the fields of http put requests in batch by get_post_lookup_items, it returns the list
+    # of the error responses of the fields, or None if their foreign keys are valid.
+    @classmethod
+    def check_put_foreign_keys(cls, list_fields, using='default'):
+        meta = cls.get_model_meta()
+        foreign_keys = dict((field.attname, (name, field)) for name, field in meta.relation_fields.items()
+                            if field.many_to_one or field.one_to_one)
+        list_data = [dict((foreign_keys[key][0], value) for key, value in fields.items() if key in foreign_keys)
+                     for fields in list_fields]
+        _, related_items = cls.get_post_lookup_items(list_data, check_pk=False, check_foreign_keys=True, using=using)
+        responses = []
+        for data in list_data:
+            res = None
+            for key, value in data.items():
+                field = meta.relation_fields[key]
+                if isinstance(value, list):
+                    res = cls.get_response_by_code(10 + SETTINGS.CODE_OFFSET, msg=(key,))
+                    break
+                if value is None:
+                    continue
+                related_item = related_items.get(key, {}).get(cls.get_lookup_key(field.target_field, value))
+                if related_item is None:
+                    related_item = field.related_model.objects.using(using).filter(
+                        **{field.target_field.name: value}).first()
+                if related_item is None:
+                    res = cls.get_response_by_code(9 + SETTINGS.CODE_OFFSET, msg=(key, value))
+                    break
+                if SETTINGS.MODEL_DELETE_FLAG and getattr(related_item, SETTINGS.MODEL_DELETE_FLAG, 0):
+                    res = cls.get_response_by_code(8 + SETTINGS.CODE_OFFSET, msg=(key, value))
+                    break
+            responses.append(res)
+        return responses
 
+    # Delete (or restore if "delete_flag" is False) the item (m, or the item of pk) by delete flag, and cascade to the
+    # items related to it by the reverse foreign keys (one_to_many_fields of ModelMeta) level by level. The items of a
+    # level are the ones related to the items of the upper level which are not deleted yet (or for restore, which are
+    # deleted with the same MODEL_MODIFIER, "user|delete time", as the item), they are read by one query per related
+    # model per LOOKUP_BATCH_SIZE items of the upper level, and written by "UPDATE ... WHERE pk IN (...)" in the same
+    # way, in one transaction. DATA of the response is the list of the dicts of the model names to the counts of the
+    # affected items of every level, from the item itself. If the model has no delete flag, the item is deleted by
+    # django (and the related items by their "on_delete").
     @classmethod
     def delete_related_models(cls, m=None, pk=None, delete_flag=True, user=None, modifier=None, delete_time=None,
                               using='default'):
@@ -883,7 +2406,7 @@ class BenchmarkModel(object):
                 m = cls.objects.using(using).get(pk=pk)
             except:
                 return cls.get_response_by_code(6 + SETTINGS.CODE_OFFSET, data={'model': cls.__name__, 'pk': pk})
-            if SETTINGS.MODEL_DELETE_FLAG and hasattr(m, SETTINGS.MODEL_DELETE_FLAG):
+            if cls.get_model_meta(model).has_delete_flag:
                 now_delete_flag = True if getattr(m, SETTINGS.MODEL_DELETE_FLAG) != 0 else False
                 if now_delete_flag == delete_flag:
                     return cls.get_response_by_code(7 + SETTINGS.CODE_OFFSET, data={'model': cls.__name__, 'pk': pk})
@@ -892,41 +2415,88 @@ class BenchmarkModel(object):
             if now_delete_flag == delete_flag:
                 return cls.get_response_by_code()
         m_modifier = cls.model_get_modifier(m)
-        # m_modify_time = cls.model_get_modify_time(m)
         if delete_flag is False:    # only restore the data with the same modifier and modify time (within 10 seconds)
             if m_modifier is None or (modifier is not None and modifier != m_modifier):
                 return cls.get_response_by_code()
         if not cls.model_has_delete_flag():    # 警告: 关联的表如果有 delete flag, 也会被删除
             m.delete(using=using)
             return cls.get_response_by_code()
-        else:
-            if cls.model_has_modifier() and user is not None:
-                if delete_flag:
-                    if delete_time is None:
-                        delete_time = str(datetime.datetime.now())
-                    setattr(m, SETTINGS.MODEL_MODIFIER, user + '|' + delete_time)
-                else:
-                    setattr(m, SETTINGS.MODEL_MODIFIER, user)
-            setattr(m, SETTINGS.MODEL_DELETE_FLAG, 1 if delete_flag else 0)
-            m.save(using=using)
-            res_data = []
-            for field in model._meta.get_fields():
-                if field.one_to_many:
-                    related_model = field.related_model
-                    remote_field_name_in_db = field.remote_field.attname    # name or attname or column
-                    query_set = related_model.objects.using(using).filter(**{remote_field_name_in_db: m.pk})
-                    for item in query_set:
-                        res = cls.delete_related_models(m=item, delete_flag=delete_flag, user=user, modifier=m_modifier,
-                                                        delete_time=delete_time, using=using)
-                        if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:    # code = 7
-                            res_data.append(res[SETTINGS.DATA])
-            if len(res_data) > 0:
-                return cls.get_response_by_code(11 + SETTINGS.CODE_OFFSET, data=res_data)
-        return cls.get_response_by_code()
-
-    @classmethod
-    def delete_model(cls, data, user=None, using='default'):
-        primary_key_name = cls._meta.pk.attname
+        new_modifier = None
+        if cls.model_has_modifier() and user is not None:
+            if delete_flag:
+                if delete_time is None:
+                    delete_time = str(datetime.datetime.now())
+                new_modifier = user + '|' + delete_time
+            else:
+                new_modifier = user
+        batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+        affected_counts = []
+        with transaction.atomic(using=using):
+            level = OrderedDict([(model, [m.pk])])    # the models to the primary keys of the items of the level
+            while len(level) > 0:
+                for level_model, pks in level.items():
+                    cls.update_delete_flags(level_model, pks, delete_flag, new_modifier, using=using)
+                affected_counts.append(OrderedDict((level_model.__name__, len(pks))
+                                                   for level_model, pks in level.items()))
+                next_level = OrderedDict()
+                for level_model, pks in level.items():
+                    for related_model, remote_field_name_in_db in cls.get_model_meta(level_model).one_to_many_fields:
+                        related_meta = cls.get_model_meta(related_model)
+                        if not related_meta.has_delete_flag:
+                            continue
+                        if delete_flag is False and not related_meta.has_modifier:
+                            continue
+                        related_pks = next_level.setdefault(related_model, [])
+                        for i in range(0, len(pks), batch_size):
+                            query_set = related_model.objects.using(using).filter(
+                                **{remote_field_name_in_db + '__in': pks[i:i + batch_size]})
+                            if delete_flag:
+                                query_set = query_set.filter(**{SETTINGS.MODEL_DELETE_FLAG: 0})
+                            else:
+                                query_set = query_set.filter(**{SETTINGS.MODEL_MODIFIER: m_modifier}).exclude(
+                                    **{SETTINGS.MODEL_DELETE_FLAG: 0})
+                            related_pks.extend(query_set.values_list('pk', flat=True))
+                level = OrderedDict((level_model, list(OrderedDict.fromkeys(pks)))
+                                    for level_model, pks in next_level.items() if len(pks) > 0)
+        clear_count_caches()    # "update" doesn't send the post_save signals
+        return cls.get_response_by_code(data=affected_counts)
+
+    # Set the delete flag (and MODEL_MODIFIER if "modifier" is not None, and the fields with "auto_now") of the items of
+    # the primary keys of the model, by one "UPDATE" per LOOKUP_BATCH_SIZE items.
+    @classmethod
+    def update_delete_flags(cls, model, pks, delete_flag, modifier=None, using='default'):
+        batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+        fields = {SETTINGS.MODEL_DELETE_FLAG: 1 if delete_flag else 0}
+        if modifier is not None and cls.get_model_meta(model).has_modifier:
+            fields[SETTINGS.MODEL_MODIFIER] = modifier
+        fields.update(cls.get_auto_now_values(model))
+        for i in range(0, len(pks), batch_size):
+            model.objects.using(using).filter(pk__in=pks[i:i + batch_size]).update(**fields)
+
+    # The dict of the primary keys to whether the items are deleted by delete flag (always False if the model has no
+    # delete flag), only for the items of the primary keys which exist. The items are queried by "pk__in" with at most
+    # LOOKUP_BATCH_SIZE primary keys in a query, and only their primary keys and delete flags are read.
+    @classmethod
+    def get_delete_flags(cls, pks, using='default'):
+        batch_size = getattr(SETTINGS, 'LOOKUP_BATCH_SIZE', 500)
+        has_delete_flag = cls.model_has_delete_flag()
+        pks = list(set(pks))
+        delete_flags = {}
+        for i in range(0, len(pks), batch_size):
+            query_set = cls.objects.using(using).filter(pk__in=pks[i:i + batch_size])
+            if has_delete_flag:
+                for pk, delete_flag in query_set.values_list('pk', SETTINGS.MODEL_DELETE_FLAG):
+                    delete_flags[pk] = False if delete_flag == 0 else True
+            else:
+                for pk in query_set.values_list('pk', flat=True):
+                    delete_flags[pk] = False
+        return delete_flags
+
+    @classmethod
+    def delete_model(cls, data, user=None, using='default', transaction_mode=None, transaction_chunk_size=None):
+        if transaction_mode is None:
+            transaction_mode = getattr(SETTINGS, 'TRANSACTION_MODE', None)
+        primary_key_name = cls.get_model_meta().pk_attname
         if primary_key_name in data.keys():
             if SETTINGS.MODEL_PRIMARY_KEY in data.keys():
                 data.pop(primary_key_name)
@@ -941,23 +2511,21 @@ class BenchmarkModel(object):
             if isinstance(data['pk'], list):
                 delete_multiple_data = True
                 pks = data['pk']
-                query_set = cls.objects.using(using).all()
-                all_pk = [_.pk for _ in query_set]
-                if cls.model_has_delete_flag():
-                    all_delete_flag = [False if getattr(_, SETTINGS.MODEL_DELETE_FLAG) == 0 else True for _ in query_set]
-                else:
-                    all_delete_flag = [False] * len(all_pk)
+                # only the items of the primary keys are queried, by one query per LOOKUP_BATCH_SIZE primary keys
+                lookup_keys = []
                 for pk in pks:
-                    if len(all_pk) > 0:
-                        pk_cls = type(all_pk[0])
-                        try:
-                            pk = pk_cls(pk)
-                        except ValueError:
-                            return cls.get_response_by_code(6 + SETTINGS.CODE_OFFSET, data={'pk': pk})
-                    if pk not in all_pk:
+                    try:
+                        lookup_keys.append(cls._meta.pk.to_python(pk))
+                    except django.core.exceptions.ValidationError:
+                        lookup_keys.append(None)
+                exist_delete_flags = cls.get_delete_flags([key for key in lookup_keys if key is not None], using=using)
+                for pk, lookup_key in zip(pks, lookup_keys):
+                    if lookup_key is None:
                         return cls.get_response_by_code(6 + SETTINGS.CODE_OFFSET, data={'pk': pk})
-                    elif all_delete_flag[all_pk.index(pk)] == delete_flag:
-                        return cls.get_response_by_code(7 + SETTINGS.CODE_OFFSET, data={'pk': pk})
+                    if lookup_key not in exist_delete_flags:
+                        return cls.get_response_by_code(6 + SETTINGS.CODE_OFFSET, data={'pk': lookup_key})
+                    elif exist_delete_flags[lookup_key] == delete_flag:
+                        return cls.get_response_by_code(7 + SETTINGS.CODE_OFFSET, data={'pk': lookup_key})
             else:
                 delete_multiple_data = False
                 pk = data['pk']
@@ -976,19 +2544,40 @@ class BenchmarkModel(object):
             failed = []
             msgs = []
             deleted_pks = []
-            for pk in pks:
-                res = cls.delete_related_models(pk=pk, delete_flag=delete_flag, user=user, using=using)
-                if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
-                    if res[SETTINGS.MSG] not in msgs:
-                        msgs.append(res[SETTINGS.MSG])
-                else:
-                    deleted_pks.append(pk)
-                total_count += 1
+            affected_counts = []    # the counts of the affected items of every level of the cascades by delete flag
+            with BatchTransaction(transaction_mode, using, transaction_chunk_size) as batch:
+                for pk in pks:
+                    if batch.is_chunk_full():    # commit the items before in the mode "chunk"
+                        batch.commit()
+                    batch.add_row()
+                    try:
+                        with batch.savepoint():
+                            res = cls.delete_related_models(pk=pk, delete_flag=delete_flag, user=user, using=using)
+                    except django.db.utils.DatabaseError as e:
+                        if batch.mode is None or not delete_multiple_data:
+                            raise
+                        res = cls.get_response_by_code(1 + SETTINGS.CODE_OFFSET, str(e))    # rolled back alone
+                        failed.append(pk)
+                    if res[SETTINGS.CODE] != SETTINGS.SUCCESS_CODE:
+                        if res[SETTINGS.MSG] not in msgs:
+                            msgs.append(res[SETTINGS.MSG])
+                    else:
+                        deleted_pks.append(pk)
+                        for index, level_counts in enumerate(res[SETTINGS.DATA]):
+                            if index == len(affected_counts):
+                                affected_counts.append(OrderedDict())
+                            for model_name, count in level_counts.items():
+                                affected_counts[index][model_name] = affected_counts[index].get(model_name, 0) + count
+                    total_count += 1
             if delete_multiple_data:
                 data = {SETTINGS.TOTAL_COUNT: total_count, SETTINGS.DELETED_COUNT: len(deleted_pks),
                         SETTINGS.FAILED_ITEMS: failed, SETTINGS.DELETED_PKS: deleted_pks}
+                if batch.mode is not None:
+                    data[SETTINGS.COMMIT_COUNT] = batch.commit_count
             else:
                 data = {SETTINGS.DELETED_PKS: deleted_pks[0]}
+            if cls.model_has_delete_flag():
+                data[SETTINGS.AFFECTED_COUNTS] = affected_counts
             if len(msgs) > 0:
                 return cls.get_response_by_code(26 + SETTINGS.CODE_OFFSET,
                                                 data=data,
@@ -0,0 +1,107 @@
+# -*- coding:utf-8 -*-
+
+from django.core.serializers.json import DjangoJSONEncoder
+import json
+import re
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# The json text which is already encoded, such as the value of MODEL_JSON_FIELD_NAMES in the database. It is written
+# into the rendered json as it is, without being parsed and dumped again.
+class RawJSON(object):
+    __slots__ = ('text', )
+
+    def __init__(self, text):
+        self.text = text
+
+    def __repr__(self):
+        return 'RawJSON(%r)' % self.text
+
+
+def reject_json_constant(name):
+    raise ValueError('%s is not valid json' % name)
+
+
+# whether the text is valid json (without NaN and Infinity), which can be written into the rendered json as RawJSON.
+# It is checked by orjson if it is installed, which is much faster than the json module
+def is_valid_json(text):
+    try:
+        if orjson is not None:
+            orjson.loads(text)
+        else:
+            json.loads(text, parse_constant=reject_json_constant)
+    except ValueError:
+        return False
+    return True
+
+
+RAW_JSON_TOKEN = '__benchmark_raw_json_%s_%d__'
+RAW_JSON_TOKEN_PATTERN = r'"__benchmark_raw_json_%s_(\d+)__"'
+
+
+# the encoder of the json module, the RawJSON objects are encoded as tokens firstly, and replaced by their text after.
+# The tokens carry a random nonce of every encoding, so a string of the data can't be taken as a token
+class BenchmarkJSONEncoder(DjangoJSONEncoder):
+    def __init__(self, *args, **kwargs):
+        super(BenchmarkJSONEncoder, self).__init__(*args, **kwargs)
+        self.raw_texts = []
+        self.nonce = None
+
+    def default(self, o):
+        if isinstance(o, RawJSON):
+            self.raw_texts.append(o.text)
+            return RAW_JSON_TOKEN % (self.nonce, len(self.raw_texts) - 1)
+        return super(BenchmarkJSONEncoder, self).default(o)
+
+    def encode(self, o):
+        while True:
+            self.raw_texts = []
+            self.nonce = uuid.uuid4().hex
+            content = super(BenchmarkJSONEncoder, self).encode(o)
+            if len(self.raw_texts) == 0:
+                return content
+            # every occurrence of the nonce should be a token, otherwise the data has it by chance, encode again
+            if content.count(self.nonce) == len(self.raw_texts):
+                break
+        return re.sub(RAW_JSON_TOKEN_PATTERN % self.nonce, lambda match: self.raw_texts[int(match.group(1))], content)
+
+
+def render_indent(data):
+    return BenchmarkJSONEncoder(indent=2).encode(data)
+
+
+# without any white space, it is encoded by the C encoder of the json module
+def render_compact(data):
+    return BenchmarkJSONEncoder(separators=(',', ':')).encode(data)
+
+
+def orjson_default(o):
+    if isinstance(o, RawJSON):
+        if hasattr(orjson, 'Fragment'):    # orjson >= 3.9
+            return orjson.Fragment(o.text)
+        return json.loads(o.text)
+    return DjangoJSONEncoder().default(o)
+
+
+# compact json by orjson if it is installed, otherwise same as render_compact
+def render_fast(data):
+    if orjson is None:
+        return render_compact(data)
+    return orjson.dumps(data, default=orjson_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+# the choices of JSON_RENDERER in benchmark_settings.py
+JSON_RENDERERS = {
+    'indent': render_indent,
+    'compact': render_compact,
+    'fast': render_fast,
+}
+
+
+def render_json(data, renderer='indent'):
+    return JSON_RENDERERS[renderer](data)
@@ -1,7 +1,7 @@
 # -*- coding:utf-8 -*-
-from django.http import JsonResponse
+from benchmark_django_rest_framework.benchmark_renderer import render_json
+from django.http import HttpResponse
 from rest_framework.response import Response
-import copy
 
 
 # The http response json data field names, you can modify them to fit in with your web site.
@@ -12,10 +12,16 @@ MSG = 'msg'        # the error message field name
 DATA = 'data'      # the data field name
 CREATED_COUNT = 'created_count'    # the field name of batch insert success count when data of http post request is a list
 DELETED_COUNT = 'deleted_count'    # the field name of batch delete success count when data of http delete request is a list
+UPDATED_COUNT = 'updated_count'    # the field name of batch update success count when http put request is many items
 CREATED_ITEMS = 'created'    # the field name of batch insert succeeded items
 DELETED_PKS = 'deleted'    # the field name of the primary keys of batch delete succeeded items
-FAILED_ITEMS = 'failed'    # the field name of batch insert or delete failed items
-TOTAL_COUNT = 'total_count'    # the field name of batch insert or delete total count in request
+UPDATED_PKS = 'updated'    # the field name of the primary keys of batch update succeeded items
+FAILED_ITEMS = 'failed'    # the field name of batch insert, update or delete failed items
+TOTAL_COUNT = 'total_count'    # the field name of batch insert, update or delete total count in request
+COMMIT_COUNT = 'commit_count'    # the field name of the count of committed transactions in batch insert, update, delete
+# the field name of the counts of the items deleted or restored by delete flag at every level of the cascades in http
+# delete response, a list of the dicts of model names to counts, from the level of the items in request
+AFFECTED_COUNTS = 'affected_counts'
 
 # DATA_STYLE is the style of DATA field for http get response.
 # If DATA_STYLE is "list": DATA is a list including every model instances of the filter result for the models in dict format.
@@ -28,7 +34,9 @@ TOTAL_COUNT = 'total_count'    # the field name of batch insert or delete total
 #        information.
 DATA_STYLE = 'dict'
 RESULT = 'result'
-COUNT = 'count'    # the count of items in result list
+# The count of items in result list. In http get requests, it is also the keyword to choose the count mode for this
+# request, see COUNT_MODE.
+COUNT = 'count'
 # If OFFSET and PAGE are in request parameters, the value of NEXT is the next page url.
 # Otherwise or no next page, the value is null.
 NEXT = 'next'
@@ -39,6 +47,26 @@ PREVIOUS = 'previous'
 # The type of http json response, choices are "rest_framework.response.Response" or "django.http.JsonResponse"
 JSON_RESPONSE_CLASS = 'django.http.JsonResponse'
 
+# How to render the json of "django.http.JsonResponse" (see benchmark_renderer.py). Choices are:
+# "indent": indent by 2 spaces, as the default.
+# "compact": without any white space, the response is smaller and it is faster to encode.
+# "fast": same as "compact", but encoded by orjson if it is installed.
+# It can be set in views by "json_renderer", and chosen by each request by the RENDERER keyword in the params, for
+# example "/employee?renderer=compact", or by the parameter of the media type in the http "Accept" header, for example
+# "Accept: application/json; renderer=compact".
+JSON_RENDERER = 'indent'
+
+# The keyword of the params of http requests to choose the JSON_RENDERER.
+RENDERER = 'renderer'
+
+# Whether the http get response of multiple items is a streaming http response. If True, the items are searched and
+# converted chunk by chunk (STREAM_CHUNK_SIZE items in a chunk) when the response is being sent, and the json is written
+# item by item, so the memory doesn't grow with the number of items, which is suitable for exporting large data. The
+# response json is the same as "django.http.JsonResponse" rendered by JSON_RENDERER whatever JSON_RESPONSE_CLASS is. It
+# can be set in views by "stream_response" and "stream_chunk_size".
+STREAM_RESPONSE = False
+STREAM_CHUNK_SIZE = 500
+
 # The http response json format
 # The error codes which smaller than 200 before added by CODE_OFFSET is defined by the framework.
 # It's not recommended to define the error codes by the any web site itself.
@@ -80,6 +108,16 @@ DICT_RESPONSE_BY_CODE = {
     '31': {MSG: 'redis data is not correct after processed, should be dict'},
     '32': {MSG: 'set redis data failed, the reason is: '},
     '33': {MSG: 'primary key is not valid'},
+    '34': {MSG: 'cursor is not valid'},
+    '35': {MSG: 'count mode is not valid, choices are "exact", "cached", "estimated" and "has_next"'},
+    '36': {MSG: 'json renderer is not valid, choices are "indent", "compact" and "fast"'},
+    '37': {MSG: 'batch insert by values of fields in request data in list failed: the count of the combinations of '
+                'the values (%s) is more than %s'},
+    '38': {MSG: 'batch update failed, the reasons are: '},
+    '39': {MSG: 'update failed: the data has been modified since the modify time in "If-Match" (%s)'},
+    '40': {MSG: 'the header "If-Match" (%s) is not a valid modify time'},
+    '41': {MSG: 'update failed: the fields %s of DICT_MODEL_UNIQUE cannot be set to the same values for the %s '
+                'items filtered by the request parameters'},    # only happend when MODEL_DELETE_FLAG is not None
     '100': {MSG: 'login failed'},
 }
 
@@ -101,10 +139,11 @@ for _code, _res in DICT_RESPONSE_BY_CODE.items():
 
 
 def GET_RESPONSE_BY_CODE(code=SUCCESS_CODE, msg=None, data=None, msg_append=None):
+    # the templates of the responses only have the code and the msg, so they are copied without deepcopy
     if code == SUCCESS_CODE:
-        res = copy.deepcopy(DICT_RESPONSE_BY_CODE[str(SUCCESS_CODE)])
+        res = dict(DICT_RESPONSE_BY_CODE[str(SUCCESS_CODE)])
     else:
-        res = copy.deepcopy(DICT_RESPONSE_BY_CODE[str(code)])
+        res = dict(DICT_RESPONSE_BY_CODE[str(code)])
     if msg:
         if isinstance(msg, str):
             res[MSG] = msg
@@ -121,7 +160,8 @@ def GET_RESPONSE_BY_CODE(code=SUCCESS_CODE, msg=None, data=None, msg_append=None
 
 def GET_HTTP_RESPONSE_BY_CODE(code=SUCCESS_CODE, msg=None, data=None):
     if JSON_RESPONSE_CLASS == "django.http.JsonResponse":
-        return JsonResponse(GET_RESPONSE_BY_CODE(code, msg, data), json_dumps_params={"indent": 2})
+        return HttpResponse(render_json(GET_RESPONSE_BY_CODE(code, msg, data), JSON_RENDERER),
+                            content_type='application/json')
     else:
         return Response(GET_RESPONSE_BY_CODE(code, msg, data))
 
@@ -156,9 +196,21 @@ ENABLE_SELECT_RELATED_IN_PARAMS = False
 # Whether enable SELECT_RELATED only enable for get one http get request.
 ONLY_ENABLE_SELECT_RELATED_FOR_GET_ONE = False
 
+# Whether load the to-many relations (reverse foreign key, many to many and reverse many to many) in SELECT_RELATED in
+# batch. If True, every to-many level is loaded by only one "IN" query for all the items of its upper level, and the
+# results are stitched into their upper items in memory. If False, every item of the upper level loads its related
+# items by one query.
+BATCH_SELECT_RELATED = True
+
+# The maximum number of the compiled select_related relation plans cached in memory. Each plan is compiled from the
+# primary model and the select_related values of a http get request, and reused by the following requests.
+RELATION_PLAN_CACHE_SIZE = 256
+
 # The keyword for filter the http get response data fields. If one request has several model field names to filter,
 # list them in a list. If the request need a black list for filter (default is white list), add "-" in the front of
 # the value of this parameter.
+# The fields filtered by VALUES and "values_fields" of the views are not read from the database ("only" or "values_list"
+# of the query set), and the relations filtered by them are not loaded.
 # 只支持一层, 但支持请求参数中用，用 values_fields, 支持多层
 VALUES = 'values'
 
@@ -184,6 +236,32 @@ PAGE = 'page'
 # The keyword of http get requests for the data order.
 ORDER_BY = 'order_by'
 
+# How to get the COUNT of the paginated http get response. It can be set in views by "count_mode", and in the params of
+# http get requests by COUNT keyword, for example "/employee?limit=10&page=3&count=has_next". Choices are:
+# "exact": search the count by the "COUNT(*)" of the filter, as the default.
+# "cached": the exact count is cached for COUNT_CACHE_TIMEOUT seconds, and the cache is cleared by every write of
+#           models (the signals of saving and deleting model instances).
+# "estimated": the number of rows estimated by the query planner, which is supported by postgresql and mysql, and it is
+#              same as "exact" for other databases.
+# "has_next": don't search the count, COUNT is null, NEXT is decided by searching one more item than LIMIT.
+# Except "exact", one more item than LIMIT is searched, so NEXT is always correct. In all the modes, if the page is the
+# last one, the count is known from the page without searching.
+COUNT_MODE = 'exact'
+
+# The seconds and the max size of the cache for the "cached" COUNT_MODE.
+COUNT_CACHE_TIMEOUT = 60
+COUNT_CACHE_SIZE = 1024
+
+# The keyword of the cursor of http get requests, for the keyset (cursor) pagination mode.
+# It is used with LIMIT keyword instead of PAGE or OFFSET keywords, the first page is requested with an empty cursor,
+# for example "/employee?limit=10&cursor=", and NEXT and PREVIOUS of the response data are urls carrying the cursors of
+# the adjacent pages. The cursor is opaque, it encodes the ORDER_BY value and primary key of the boundary item of the
+# page, so the next page is searched by a seek condition instead of an OFFSET scan, and the latency doesn't grow with
+# the page depth. The field of ORDER_BY should be a not null field of the primary model itself (not of the related
+# models) in this mode, and the primary key is used as a tiebreaker.
+# The pages of cursors are not counted whatever COUNT_MODE is, COUNT of the response data is null.
+CURSOR = 'cursor'
+
 # The keyword of django Q object for http get request to filter model.
 # For example, /employee?Q=[employee_name=EmployeeAX1$employee_id=1|employee_name=EmployeeAX2$employee_id=2,
 # department=1$employee_id=1|department=4$employee_id=8] is same as filter model:
@@ -267,7 +345,10 @@ MODEL_MODIFIER = 'modifier'
 MODEL_DELETE_FLAG = 'del_flag'             # 'delete flag'
 
 # If MODEL_DELETE_FLAG is not None, we cannot use "unique=True" or "unique_together" in models. And we should list
-# these unique restrictions. The framework can maintain the unique restrictions.
+# these unique restrictions. The framework can maintain the unique restrictions, the items of a http post or put request
+# in list are checked by one query per restriction (see BenchmarkModel.check_unique_together_in_batch). To let the
+# database also keep them, BenchmarkModel.create_unique_together_indexes can create the partial unique indexes on the
+# items not deleted (for postgresql and sqlite), for example in a migration by "RunPython".
 # 若 model 使用删除标记位, 无法使用唯一性约束, 需要定义唯一性约束的字段
 DICT_MODEL_UNIQUE = {
     # # For example, model name, fields in tuples just as they defined in "unique_together":
@@ -291,6 +372,13 @@ MODEL_JSON_FIELD_NAMES = (
     'employee_info',
 )
 
+# Whether write the json text of the fields in MODEL_JSON_FIELD_NAMES into the http get response as it is, without
+# loading it and dumping it again. It only works for the fields which haven't any rule in values_fields or rename_fields
+# for the keys in the json (such as "/employee_info/"), when JSON_RESPONSE_CLASS is "django.http.JsonResponse" and the
+# keys of the response are not converted by CONVERT_KEYS. The text is not indented by the "indent" JSON_RENDERER. It can
+# be set in views by "raw_json_fields".
+RAW_JSON_FIELDS = False
+
 # rename key names in request params
 RENAME_PARAMS = {}
 
@@ -309,6 +397,53 @@ HTTP_GET_CHECK_PARAMS = False
 # The configuration of whether omit un-editable fields from models in the http get response. The default value is False.
 OMIT_UN_EDITABLE_FIELDS = False
 
+# Whether read the items of the primary model in the http get response by "values_list" of the query set, when there is
+# no SELECT_RELATED in the request. The columns and converters of every model are computed only once, and the models
+# are not instantiated, so it is faster for the large responses. The response data is the same as False.
+READ_BY_VALUES_LIST = True
+
+# Whether insert the items of a http post request whose data is a list in batch, by "bulk_create" in one transaction
+# with chunks of BULK_CREATE_BATCH_SIZE items. The response is the same as inserting them one by one: if a chunk fails,
+# it is rolled back and its items are inserted one by one to report the failed items. The "save" method of the models
+# is not called and the post_save signals are not sent for the items inserted in batch. It can be set in views by
+# "bulk_create".
+BULK_CREATE = False
+BULK_CREATE_BATCH_SIZE = 1000
+
+# Before inserting the items of a http post request, the items of their primary keys and the related items of their
+# foreign keys are queried by "pk__in" (or "<target field>__in") for all the items at once instead of item by item,
+# with at most LOOKUP_BATCH_SIZE values in a query (sqlite limits the count of the params of a query to 999 by default).
+LOOKUP_BATCH_SIZE = 500
+
+# The max count of the items inserted for an item of the data of a http post request, whose values of fields in list are
+# expanded into the combinations of them (batch insert by values of fields in request data in list). The request with
+# more combinations is rejected before inserting any item. None means no limit.
+MAX_LIST_VALUES_COMBINATIONS = 10000
+
+# How the writes of http post, put and delete requests are committed. Choices are:
+# None: every row is committed by itself (the autocommit mode of django), as the default.
+# "request": all the rows of a request are written in one transaction.
+# "chunk": the rows are committed in transactions of TRANSACTION_CHUNK_SIZE rows (the items of the request data).
+# In "request" and "chunk", every row is written in a savepoint, so a failed row is rolled back alone and reported in
+# FAILED_ITEMS as before, and the response of batch insert or delete has COMMIT_COUNT. It can be set in views by
+# "transaction_mode" and "transaction_chunk_size". With BULK_CREATE, a chunk of "bulk_create" is not split, the rows are
+# committed before the chunk which makes the transaction have TRANSACTION_CHUNK_SIZE rows or more.
+TRANSACTION_MODE = None
+TRANSACTION_CHUNK_SIZE = 1000
+
+# Whether DATA of the response of a http put request of one item is the whole updated item (which reads its many to many
+# relations again). If it is False, DATA is only the primary key and MODEL_MODIFY_TIME of the item. It can be set in
+# views by "put_response_data".
+PUT_RESPONSE_DATA = True
+
+# A http put request of one item can have the header "If-Match" with MODEL_MODIFY_TIME of the item read before, then the
+# item is not updated if it has been modified since then. If PUT_CONDITIONAL_UPDATE is True, such a request is written
+# by one "UPDATE ... WHERE pk = ... AND MODEL_MODIFY_TIME = ..." without reading the item first (except the requests
+# with many to many fields, or with DICT_MODEL_UNIQUE to check when using MODEL_DELETE_FLAG). In this way, the "save"
+# method of the model is not called and the post_save signals are not sent. It can be set in views by
+# "put_conditional_update".
+PUT_CONDITIONAL_UPDATE = False
+
 # The configuration of whether to transform keys of the params or data of the request or response
 # between the style of python and java.
 # For example, convert employeeName to employee_name after BenchmarkApiView receive request.
@@ -319,6 +454,11 @@ CONVERT_KEYS = False
 # for convert keys from python style to java style.
 OMIT_UNDERLINES = True
 
+# When CONVERT_KEYS is True, the keys are converted by the tables built from the field names of the models and the
+# rename settings of the views when the views are initiated. The other keys are converted once and cached, this is the
+# max size of the cache.
+KEY_CONVERT_CACHE_SIZE = 4096
+
 # If DEBUG is True in settings.py, whether authentications for every APIs are needed.
 NEED_AUTHENTICATION_IN_DEBUG_MODE = True
 
@@ -328,7 +468,11 @@ REDIS_PORT = 6379
 REDIS_DB = 1
 
 # keywords of http get request in benchmark_settings
-KEYWORDS = {SELECT_RELATED, VALUES, OFFSET, LIMIT, PAGE, COUNT, ORDER_BY, Q, Q_OR, Q_AND}
+KEYWORDS = {SELECT_RELATED, VALUES, OFFSET, LIMIT, PAGE, CURSOR, COUNT, ORDER_BY, RENDERER, Q, Q_OR, Q_AND}
 
 # keywords of http get request in benchmark_settings which with value need to be converted
 KEYWORDS_WITH_VALUE_NEED_CONVERT = {SELECT_RELATED, VALUES, ORDER_BY}
+
+# The keys of the params in http get requests are validated as the lookup paths of the models once, and the results are
+# cached, this is the max size of the cache.
+LOOKUP_PATH_CACHE_SIZE = 4096